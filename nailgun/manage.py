@@ -45,6 +45,12 @@ def load_run_parsers(subparsers):
         action='store_true',
         help='run keep alive thread'
     )
+    run_parser.add_argument(
+        '-w', '--workers', dest='workers', action='store', type=int,
+        help='number of API worker processes, if it is more than 1 '
+             'RPC consumer and keep alive thread run in separate process',
+        default=1
+    )
     run_parser.add_argument(
         '-c', '--config', dest='config_file', action='store', type=str,
         help='custom config file', default=None
@@ -198,7 +204,7 @@ def action_run(params):
     if params.config_file:
         settings.update_from_file(params.config_file)
     from nailgun.wsgi import appstart
-    appstart(keepalive=params.keepalive)
+    appstart(keepalive=params.keepalive, workers=params.workers)
 
 
 if __name__ == "__main__":
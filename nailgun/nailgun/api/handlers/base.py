@@ -16,6 +16,7 @@
 
 from datetime import datetime
 from decorator import decorator
+import hashlib
 import json
 
 import web
@@ -23,6 +24,7 @@ import web
 from nailgun.api.serializers.base import BasicSerializer
 from nailgun.api.validators.base import BasicValidator
 from nailgun.db import db
+from nailgun.db.sqlalchemy.revisions import TableRevisions
 from nailgun.errors import errors
 from nailgun.logger import logger
 from nailgun import notifier
@@ -51,11 +53,30 @@ def forbid_client_caching(handler):
 
 @decorator
 def content_json(func, *args, **kwargs):
+    etag = None
+    if web.ctx.method == 'GET' and args and \
+            getattr(args[0], 'etag_tables', None):
+        # revisions are taken before rendering, so data changed
+        # during rendering will be rendered again on next request
+        etag = args[0].get_etag()
+        if etag_matches(etag):
+            raise web.notmodified()
+
     web.header('Content-Type', 'application/json')
     data = func(*args, **kwargs)
+    if etag:
+        web.header('ETag', etag)
     return build_json_response(data)
 
 
+def etag_matches(etag):
+    if_none_match = web.ctx.env.get('HTTP_IF_NONE_MATCH')
+    if not if_none_match:
+        return False
+    return if_none_match.strip() == '*' or etag in [
+        tag.strip() for tag in if_none_match.split(',')]
+
+
 def build_json_response(data):
     web.header('Content-Type', 'application/json')
     if type(data) in (dict, list):
@@ -68,6 +89,9 @@ class BaseHandler(object):
     serializer = BasicSerializer
 
     fields = []
+    # tables rendered by GET method, if specified then
+    # GET response has ETag which depends on revisions of these tables
+    etag_tables = ()
 
     @classmethod
     def render(cls, instance, fields=None):
@@ -76,6 +100,14 @@ class BaseHandler(object):
             fields=fields or cls.fields
         )
 
+    def get_etag(self):
+        return '"{0}"'.format(hashlib.md5(json.dumps([
+            TableRevisions.token,
+            self.__class__.__name__,
+            web.ctx.fullpath,
+            TableRevisions.get(*self.etag_tables)
+        ])).hexdigest())
+
     def checked_data(self, validate_method=None, **kwargs):
         try:
             data = kwargs.pop('data', web.data())
@@ -137,3 +169,90 @@ class BaseHandler(object):
             raise web.notfound('{0} not found'.format(model.__name__))
 
         return node_query
+
+    def get_int_param(self, user_data, name):
+        """:returns: non-negative integer value of request
+                     parameter or None if it isn't specified
+        :raises: web.badrequest
+        """
+        value = user_data.get(name)
+        if value is None or value == '':
+            return None
+        try:
+            value = int(value)
+        except ValueError:
+            value = -1
+        if value < 0:
+            raise web.badrequest("Invalid '{0}' value".format(name))
+        return value
+
+    def get_bool_param(self, user_data, name):
+        """:returns: boolean value of request parameter
+                     or None if it isn't specified
+        :raises: web.badrequest
+        """
+        value = user_data.get(name)
+        if value is None or value == '':
+            return None
+        if value.lower() in ('1', 'true'):
+            return True
+        if value.lower() in ('0', 'false'):
+            return False
+        raise web.badrequest("Invalid '{0}' value".format(name))
+
+    def get_list_param(self, user_data, name, allowed=None):
+        """:param allowed: allowed values if specified
+        :returns: list of comma separated values of request
+                  parameter or None if it isn't specified
+        :raises: web.badrequest
+        """
+        value = user_data.get(name)
+        if value is None:
+            return None
+        values = [v.strip() for v in value.split(',') if v.strip()]
+        if allowed is not None and not set(values) <= set(allowed):
+            raise web.badrequest("Invalid '{0}' value".format(name))
+        return values
+
+    def get_requested_fields(self, user_data, fields):
+        """Returns fields requested with 'fields' parameter
+        or all fields if it isn't specified
+
+        :param fields: all fields which can be rendered
+        :raises: web.badrequest
+        """
+        requested = self.get_list_param(user_data, 'fields')
+        if not requested:
+            return fields
+        unknown = set(requested) - set(fields)
+        if unknown:
+            raise web.badrequest("Unknown fields: {0}".format(
+                ", ".join(sorted(unknown))))
+        return tuple(f for f in fields if f in requested)
+
+    def paginate(self, query, model, user_data):
+        """Applies pagination parameters to query:
+
+        - *limit* - max number of objects
+        - *offset* - number of objects to skip
+        - *marker* - id of last object of previous page
+
+        Objects are ordered by id. If limit is specified, total
+        number of objects is returned in X-Total-Count header.
+
+        :raises: web.badrequest
+        """
+        limit = self.get_int_param(user_data, 'limit')
+        offset = self.get_int_param(user_data, 'offset')
+        marker = self.get_int_param(user_data, 'marker')
+
+        if limit is not None:
+            web.header('X-Total-Count', str(query.count()))
+        query = query.order_by(model.id)
+        if marker is not None:
+            query = query.filter(model.id > marker)
+        if offset:
+            query = query.offset(offset)
+        if limit is not None:
+            query = query.limit(limit)
+        return query
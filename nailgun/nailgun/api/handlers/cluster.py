@@ -88,24 +88,21 @@ class ClusterHandler(BaseHandler):
                 #for deletion and addition by set().
                 new_nodes = db().query(Node).filter(
                     Node.id.in_(value)
-                )
-                nodes_to_remove = [n for n in cluster.nodes
-                                   if n not in new_nodes]
-                nodes_to_add = [n for n in new_nodes
-                                if n not in cluster.nodes]
+                ).all() if value else []
+                nodes_to_remove = sorted(
+                    set(cluster.nodes) - set(new_nodes), key=lambda n: n.id)
+                nodes_to_add = sorted(
+                    set(new_nodes) - set(cluster.nodes), key=lambda n: n.id)
                 for node in nodes_to_add:
                     if not node.online:
                         raise web.badrequest(
                             "Can not add offline node to cluster")
                 map(cluster.nodes.remove, nodes_to_remove)
                 map(cluster.nodes.append, nodes_to_add)
-                for node in nodes_to_remove:
-                    network_manager.clear_assigned_networks(node)
-                    network_manager.clear_all_allowed_networks(node.id)
-                for node in nodes_to_add:
-                    network_manager.allow_network_assignment_to_all_interfaces(
-                        node)
-                    network_manager.assign_networks_by_default(node)
+                network_manager.clear_networks_of_nodes(
+                    nodes_to_remove + nodes_to_add)
+                network_manager.assign_networks_to_nodes(
+                    cluster, nodes_to_add)
             else:
                 setattr(cluster, key, value)
         db().commit()
@@ -139,6 +136,7 @@ class ClusterCollectionHandler(BaseHandler):
     """
 
     validator = ClusterValidator
+    etag_tables = ('clusters', 'cluster_changes')
 
     @content_json
     def GET(self):
@@ -196,11 +194,9 @@ class ClusterCollectionHandler(BaseHandler):
                     Node.id.in_(data['nodes'])
                 ).all()
                 map(cluster.nodes.append, nodes)
+                netmanager.clear_networks_of_nodes(nodes)
+                netmanager.assign_networks_to_nodes(cluster, nodes)
                 db().commit()
-                for node in nodes:
-                    netmanager.allow_network_assignment_to_all_interfaces(
-                        node)
-                    netmanager.assign_networks_by_default(node)
 
             raise web.webapi.created(json.dumps(
                 ClusterHandler.render(cluster),
@@ -18,6 +18,7 @@
 Handlers dealing with logs
 """
 
+import calendar
 from itertools import dropwhile
 import json
 import logging
@@ -33,6 +34,7 @@ from nailgun.api.handlers.tasks import TaskHandler
 from nailgun.db import db
 from nailgun.db.sqlalchemy.models import Node
 from nailgun.db.sqlalchemy.models import RedHatAccount
+from nailgun.logindex.index import get_log_index
 from nailgun.settings import settings
 from nailgun.task.manager import DumpTaskManager
 
@@ -181,13 +183,12 @@ class LogEntryCollectionHandler(BaseHandler):
             allowed_levels = [l for l in dropwhile(lambda l: l != level,
                                                    log_config['levels'])]
         try:
-            regexp = re.compile(log_config['regexp'])
+            index = get_log_index(log_file, log_config)
         except re.error as e:
             logger.error('Invalid regular expression for file %r: %s',
                          log_config['id'], e)
             raise web.internalerror("Invalid regular expression in config")
 
-        entries = []
         to_byte = None
         try:
             to_byte = int(user_data.get('to', 0))
@@ -224,67 +225,40 @@ class LogEntryCollectionHandler(BaseHandler):
                 )
             ]
 
-        has_more = False
-        with open(log_file, 'r') as f:
-            f.seek(0, 2)
-            # we need to calculate current position manually instead of using
-            # tell() because read_backwards uses buffering
-            pos = f.tell()
-            multilinebuf = []
-            for line in read_backwards(f):
-                pos -= len(line)
-                if not truncate_log and pos < to_byte:
-                    has_more = pos > 0
-                    break
-                entry = line.rstrip('\n')
-                if not len(entry):
-                    continue
-                if 'skip_regexp' in log_config and \
-                        re.match(log_config['skip_regexp'], entry):
-                    continue
-                m = regexp.match(entry)
-                if m is None:
-                    if log_config.get('multiline'):
-                        #  Add next multiline part to last entry if it exist.
-                        multilinebuf.append(entry)
-                    else:
-                        logger.debug("Unable to parse log entry '%s' from %s",
-                                     entry, log_file)
-                    continue
-                entry_text = m.group('text')
-                if len(multilinebuf):
-                    multilinebuf.reverse()
-                    entry_text += '\n' + '\n'.join(multilinebuf)
-                    multilinebuf = []
-                entry_level = m.group('level').upper() or 'INFO'
-                if level and not (entry_level in allowed_levels):
-                    continue
-                try:
-                    entry_date = time.strptime(m.group('date'),
-                                               log_config['date_format'])
-                except ValueError:
-                    logger.debug("Unable to parse date from log entry."
-                                 " Date format: %r, date part of entry: %r",
-                                 log_config['date_format'],
-                                 m.group('date'))
-                    continue
-
-                for regex, replace in regs:
-                    entry_text = regex.sub(replace, entry_text)
-
-                entries.append([
-                    time.strftime(settings.UI_LOG_DATE_FORMAT, entry_date),
-                    entry_level,
-                    entry_text
-                ])
-                if truncate_log and len(entries) >= max_entries:
-                    has_more = True
-                    break
+        entries = []
+        with index.lock:
+            found, total = index.find(
+                to_byte=0 if truncate_log else to_byte,
+                levels=allowed_levels if level else None,
+                date_after=date_after and calendar.timegm(date_after),
+                date_before=date_before and calendar.timegm(date_before),
+                limit=max_entries if truncate_log else None
+            )
+            if truncate_log:
+                has_more = total > len(found)
+            else:
+                has_more = to_byte > 0 and index.starts and \
+                    index.starts[0] < to_byte
+            indexed_size = index.size
+
+            with open(log_file, 'r') as f:
+                for num in found:
+                    entry = index.read(f, num)
+                    if entry is None:
+                        continue
+                    entry_date, entry_level, entry_text = entry
+                    for regex, replace in regs:
+                        entry_text = regex.sub(replace, entry_text)
+                    entries.append([
+                        time.strftime(settings.UI_LOG_DATE_FORMAT, entry_date),
+                        entry_level,
+                        entry_text
+                    ])
 
         return {
             'entries': entries,
-            'to': log_file_size,
-            'has_more': has_more,
+            'to': indexed_size,
+            'has_more': bool(has_more),
         }
 
 
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+
+#    Copyright 2013 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Handlers of metrics of nailgun process
+"""
+
+from nailgun.api.handlers.base import BaseHandler
+from nailgun.api.handlers.base import content_json
+from nailgun.db.sqlalchemy.statements import StatementsStats
+from nailgun.rpc.threaded import RPCKombuThread
+
+
+class MetricsHandler(BaseHandler):
+    """Metrics handler
+    """
+
+    @content_json
+    def GET(self):
+        """Stats are collected by the process which serves request.
+        When API is served by several worker processes, RPC consumer
+        runs in separate services process, so RPC workers list is
+        empty.
+
+        :returns: Stats of SQL statements and database connections
+                  pool, stats of RPC workers.
+        :http: * 200 (OK)
+        """
+        rpc_thread = RPCKombuThread.current
+        return {
+            'database': StatementsStats.stats(),
+            'rpc_workers': rpc_thread.stats() if rpc_thread else []
+        }
@@ -19,9 +19,11 @@ Handlers dealing with nodes
 """
 
 from datetime import datetime
+from itertools import groupby
 import json
 import traceback
 
+from sqlalchemy.orm import defer
 from sqlalchemy.orm import joinedload
 
 import web
@@ -32,10 +34,12 @@ from nailgun.api.validators.network import NetAssignmentValidator
 from nailgun.api.validators.node import NodeValidator
 from nailgun.db import db
 from nailgun.db.sqlalchemy.models import Cluster
+from nailgun.db.sqlalchemy.models import ClusterChanges
 from nailgun.db.sqlalchemy.models import NetworkGroup
 from nailgun.db.sqlalchemy.models import Node
 from nailgun.db.sqlalchemy.models import NodeAttributes
 from nailgun.db.sqlalchemy.models import NodeNICInterface
+from nailgun.db.sqlalchemy.models import Role
 from nailgun.logger import logger
 from nailgun.network.manager import NetworkManager
 from nailgun.network.topology import TopoChecker
@@ -161,22 +165,37 @@ class NodeCollectionHandler(BaseHandler):
               'pending_addition', 'pending_deletion', 'os_platform',
               'error_type', 'online', 'cluster')
 
+    # fields which can't be updated by agent reports fast path
+    agent_forbidden_fields = ('cluster_id', 'roles', 'pending_roles',
+                              'pending_addition', 'pending_deletion')
+    # fields which can be updated by bulk membership updates
+    membership_fields = ('id', 'cluster_id', 'roles', 'pending_roles',
+                         'pending_addition', 'pending_deletion')
+
     validator = NodeValidator
+    etag_tables = ('nodes', 'node_roles', 'pending_node_roles', 'roles',
+                   'clusters', 'node_nic_interfaces', 'net_assignments',
+                   'ip_addrs', 'network_groups')
 
     @classmethod
     def render(cls, nodes, fields=None):
+        fields = fields or cls.fields + ('network_data',)
+        node_fields = [f for f in fields if f != 'network_data']
+        networks = None
+        if 'network_data' in fields:
+            networks = NetworkManager.get_nodes_networks(nodes)
+
         json_list = []
-        network_manager = NetworkManager
-        ips_mapped = network_manager.get_grouped_ips_by_node()
-        networks_grouped = network_manager.get_networks_grouped_by_cluster()
         for node in nodes:
+            if networks is not None and node.id not in networks:
+                # error is already logged by network manager
+                continue
             try:
-                json_data = BaseHandler.render(node, fields=cls.fields)
-
-                json_data['network_data'] = network_manager.\
-                    get_node_networks_optimized(
-                        node, ips_mapped.get(node.id, []),
-                        networks_grouped.get(node.cluster_id, []))
+                json_data = {}
+                if node_fields:
+                    json_data = BaseHandler.render(node, fields=node_fields)
+                if networks is not None:
+                    json_data['network_data'] = networks[node.id]
                 json_list.append(json_data)
             except Exception:
                 logger.error(traceback.format_exc())
@@ -184,28 +203,58 @@ class NodeCollectionHandler(BaseHandler):
 
     @content_json
     def GET(self):
-        """May receive cluster_id parameter to filter list
-        of nodes
+        """May receive following parameters to filter list of nodes:
+
+        - *cluster_id* - id of cluster, empty for unallocated nodes
+        - *status* - comma separated list of statuses
+        - *online* - true or false
+        - *roles* - comma separated list of roles, node should
+          have at least one of them
+        - *pending_addition* - true or false
+        - *pending_deletion* - true or false
+        - *fields* - comma separated list of fields to render
+        - *limit*, *offset*, *marker* - pagination parameters
 
         :returns: Collection of JSONized Node objects.
         :http: * 200 (OK)
+               * 400 (invalid parameters)
         """
         user_data = web.input(cluster_id=None)
-        nodes = db().query(Node).options(
-            joinedload('cluster'),
-            joinedload('interfaces'),
-            joinedload('interfaces.assigned_networks_list'),
-            joinedload('role_list'),
-            joinedload('pending_role_list'))
+        fields = self.get_requested_fields(
+            user_data, self.fields + ('network_data',))
+
+        options = [joinedload('cluster')]
+        if 'network_data' in fields:
+            options.extend([
+                joinedload('interfaces'),
+                joinedload('interfaces.assigned_networks_list')])
+        if 'roles' in fields:
+            options.append(joinedload('role_list'))
+        if 'pending_roles' in fields:
+            options.append(joinedload('pending_role_list'))
+        if 'meta' not in fields:
+            options.append(defer('meta'))
+        nodes = db().query(Node).options(*options)
+
         if user_data.cluster_id == '':
-            nodes = nodes.filter_by(
-                cluster_id=None).all()
+            nodes = nodes.filter_by(cluster_id=None)
         elif user_data.cluster_id:
-            nodes = nodes.filter_by(
-                cluster_id=user_data.cluster_id).all()
-        else:
-            nodes = nodes.all()
-        return self.render(nodes)
+            nodes = nodes.filter_by(cluster_id=user_data.cluster_id)
+
+        statuses = self.get_list_param(
+            user_data, 'status', Node.NODE_STATUSES)
+        if statuses:
+            nodes = nodes.filter(Node.status.in_(statuses))
+        roles = self.get_list_param(user_data, 'roles')
+        if roles:
+            nodes = nodes.filter(Node.role_list.any(Role.name.in_(roles)))
+        for flag in ('online', 'pending_addition', 'pending_deletion'):
+            value = self.get_bool_param(user_data, flag)
+            if value is not None:
+                nodes = nodes.filter(getattr(Node, flag) == value)
+
+        nodes = self.paginate(nodes, Node, user_data)
+        return self.render(nodes.all(), fields=fields)
 
     @content_json
     def POST(self):
@@ -325,13 +374,31 @@ class NodeCollectionHandler(BaseHandler):
         """
         data = self.checked_data(self.validator.validate_collection_update)
 
+        # notifications of nodes are summarized per request
+        with notifier.batch():
+            if self.is_agent_reports(data):
+                nodes_updated = self.update_from_agent(data)
+            elif self.is_membership_update(data):
+                nodes_updated = self.update_membership(data)
+            else:
+                nodes_updated = self.update_nodes(data)
+
+        return self.render(self.get_updated_nodes(nodes_updated))
+
+    @classmethod
+    def update_nodes(cls, data):
+        """Applies any changes of nodes node by node
+
+        :param data: list of validated nodes data
+        :returns: list of updated nodes IDs
+        """
         q = db().query(Node)
         nodes_updated = []
         for nd in data:
             node = None
             if nd.get("mac"):
                 node = q.filter_by(mac=nd["mac"]).first() \
-                    or self.validator.validate_existent_node_mac_update(nd)
+                    or cls.validator.validate_existent_node_mac_update(nd)
             else:
                 node = q.get(nd["id"])
 
@@ -343,7 +410,9 @@ class NodeCollectionHandler(BaseHandler):
                     msg = u"Node '{0}' is back online".format(
                         node.human_readable_name)
                     logger.info(msg)
-                    notifier.notify("discover", msg, node_id=node.id)
+                    notifier.notify(
+                        "discover", msg, node_id=node.id,
+                        summary=u"{0} nodes are back online")
                 db().commit()
 
             old_cluster_id = node.cluster_id
@@ -386,37 +455,8 @@ class NodeCollectionHandler(BaseHandler):
                 node.attributes.volumes = \
                     node.volume_manager.gen_volumes_info()
                 db().commit()
-            if not node.status in ('provisioning', 'deploying'):
-                variants = (
-                    "disks" in node.meta and
-                    len(node.meta["disks"]) != len(
-                        filter(
-                            lambda d: d["type"] == "disk",
-                            node.attributes.volumes
-                        )
-                    ),
-                    regenerate_volumes
-                )
-                if any(variants):
-                    try:
-                        node.attributes.volumes = \
-                            node.volume_manager.gen_volumes_info()
-                        if node.cluster:
-                            node.cluster.add_pending_changes(
-                                "disks",
-                                node_id=node.id
-                            )
-                    except Exception as exc:
-                        msg = (
-                            "Failed to generate volumes "
-                            "info for node '{0}': '{1}'"
-                        ).format(
-                            node.name or data.get("mac") or data.get("id"),
-                            str(exc) or "see logs for details"
-                        )
-                        logger.warning(traceback.format_exc())
-                        notifier.notify("error", msg, node_id=node.id)
-
+            if node.status not in ('provisioning', 'deploying'):
+                cls.update_volumes(node, force=regenerate_volumes)
                 db().commit()
 
             network_manager = NetworkManager
@@ -438,13 +478,300 @@ class NodeCollectionHandler(BaseHandler):
                         node
                     )
 
+        return nodes_updated
+
+    @classmethod
+    def get_updated_nodes(cls, nodes_ids):
         # we need eagerload everything that is used in render
-        nodes = db().query(Node).options(
+        return db().query(Node).options(
             joinedload('cluster'),
             joinedload('interfaces'),
             joinedload('interfaces.assigned_networks_list')).\
-            filter(Node.id.in_(nodes_updated)).all()
-        return self.render(nodes)
+            filter(Node.id.in_(nodes_ids)).all()
+
+    @classmethod
+    def is_agent_reports(cls, data):
+        """Checks if all nodes data came from nailgun-agent and
+        doesn't change cluster membership or roles
+        """
+        return bool(data) and all(
+            nd.get("is_agent") and
+            not set(nd) & set(cls.agent_forbidden_fields)
+            for nd in data
+        )
+
+    @classmethod
+    def update_from_agent(cls, data):
+        """Applies batch of nailgun-agent reports in one transaction.
+
+        All nodes are resolved with one query, interfaces and
+        volumes are processed only for nodes which reported
+        meta different from the previous report.
+
+        :param data: list of validated agent reports
+        :returns: list of updated nodes IDs
+        """
+        macs = [nd["mac"].lower() for nd in data if nd.get("mac")]
+        nodes_by_mac = {}
+        if macs:
+            nodes_by_mac = dict(
+                (node.mac, node) for node in db().query(Node).options(
+                    joinedload('attributes')
+                ).filter(Node.mac.in_(macs))
+            )
+
+        now = datetime.now()
+        nodes_updated = []
+        nodes_back_online = []
+        for nd in data:
+            nd.pop("is_agent")
+            if nd.get("mac"):
+                node = nodes_by_mac.get(nd["mac"].lower()) \
+                    or cls.validator.validate_existent_node_mac_update(nd)
+            else:
+                node = db().query(Node).get(nd["id"])
+
+            node.timestamp = now
+            if not node.online:
+                node.online = True
+                nodes_back_online.append(node)
+
+            meta_changed = False
+            if "meta" in nd:
+                meta = nd.pop("meta")
+                meta_hash = Node.calc_meta_hash(meta)
+                if meta_hash != node.meta_hash:
+                    node.update_meta(meta)
+                    node.meta_hash = meta_hash
+                    meta_changed = True
+
+            for key, value in nd.iteritems():
+                if (key, value) == ("status", "discover") \
+                        and node.status in ('provisioning', 'error'):
+                    # We don't update provisioning and error back to discover
+                    logger.debug(
+                        "Node has provisioning or error status - "
+                        "status not updated by agent")
+                    continue
+                # don't update node ID
+                if key != "id":
+                    setattr(node, key, value)
+
+            if not node.attributes:
+                node.attributes = NodeAttributes()
+            if not node.attributes.volumes:
+                node.attributes.volumes = \
+                    node.volume_manager.gen_volumes_info()
+            elif meta_changed:
+                cls.update_volumes(node)
+
+            if meta_changed:
+                NetworkManager.update_interfaces_info(node)
+
+            nodes_updated.append(node.id)
+
+        db().commit()
+
+        for node in nodes_back_online:
+            msg = u"Node '{0}' is back online".format(
+                node.human_readable_name)
+            logger.info(msg)
+            notifier.notify(
+                "discover", msg, node_id=node.id,
+                summary=u"{0} nodes are back online")
+
+        return nodes_updated
+
+    @classmethod
+    def update_volumes(cls, node, force=False, add_disks_change=None):
+        """Regenerates node volumes if disks count in meta
+        differs from disks count in volumes info or if regeneration
+        is forced (roles or cluster of node are changed)
+
+        :param node: node which volumes are regenerated
+        :param force: regenerate volumes even if disks count is the same
+        :param add_disks_change: callable which takes node and registers
+            "disks" change of its cluster; by default change is added
+            to cluster at once
+        """
+        if node.status in ('provisioning', 'deploying'):
+            return
+
+        if not force:
+            if "disks" not in node.meta:
+                return
+            disks = filter(
+                lambda d: d["type"] == "disk", node.attributes.volumes)
+            if len(node.meta["disks"]) == len(disks):
+                return
+
+        try:
+            node.attributes.volumes = node.volume_manager.gen_volumes_info()
+            if node.cluster:
+                if add_disks_change:
+                    add_disks_change(node)
+                else:
+                    node.cluster.add_pending_changes(
+                        "disks", node_id=node.id)
+        except Exception as exc:
+            msg = (
+                "Failed to generate volumes "
+                "info for node '{0}': '{1}'"
+            ).format(
+                node.human_readable_name,
+                str(exc) or "see logs for details"
+            )
+            logger.warning(traceback.format_exc())
+            notifier.notify(
+                "error", msg, node_id=node.id,
+                summary=u"Failed to generate volumes info for {0} nodes")
+
+    @classmethod
+    def is_membership_update(cls, data):
+        """Checks if nodes data only changes cluster membership
+        and roles of nodes given by IDs
+        """
+        return bool(data) and all(
+            nd.get("id") and set(nd) <= set(cls.membership_fields)
+            for nd in data
+        )
+
+    @classmethod
+    def update_membership(cls, data):
+        """Applies cluster membership and roles changes of batch
+        of nodes in one transaction.
+
+        Nodes, clusters and roles are loaded with a few queries,
+        volumes of nodes with the same hardware and roles are generated
+        once, networks of nodes which changed cluster are reassigned
+        for all nodes of cluster at once.
+
+        :param data: list of validated nodes data
+        :returns: list of updated nodes IDs
+        """
+        nodes_by_id = dict(
+            (node.id, node) for node in db().query(Node).options(
+                joinedload('attributes'),
+                joinedload('role_list'),
+                joinedload('pending_role_list'),
+                joinedload('interfaces')
+            ).filter(Node.id.in_([int(nd["id"]) for nd in data]))
+        )
+
+        clusters_ids = set(
+            nd["cluster_id"] for nd in data if nd.get("cluster_id"))
+        clusters_ids.update(
+            node.cluster_id for node in nodes_by_id.itervalues()
+            if node.cluster_id)
+        clusters = {}
+        roles = {}
+        if clusters_ids:
+            clusters = dict(
+                (cluster.id, cluster) for cluster in
+                db().query(Cluster).filter(Cluster.id.in_(clusters_ids)))
+            releases_ids = set(c.release_id for c in clusters.itervalues())
+            for role in db().query(Role).filter(
+                    Role.release_id.in_(releases_ids)).order_by(Role.id):
+                roles.setdefault(role.release_id, []).append(role)
+
+        def get_roles(node, names):
+            if not node.cluster:
+                logger.warning(
+                    u"Attempting to assign roles to node "
+                    u"'{0}' which isn't added to cluster".format(
+                        node.name or node.id))
+                return None
+            return [role for role in roles.get(node.cluster.release_id, [])
+                    if role.name in names]
+
+        nodes_updated = []
+        clear_changes = []
+        disks_changed = []
+        moved_nodes = []
+        for nd in data:
+            node = nodes_by_id[int(nd["id"])]
+            old_cluster_id = cluster_id = node.cluster_id
+
+            if nd.get("pending_roles") == [] and node.cluster:
+                clear_changes.append(node.id)
+
+            if "cluster_id" in nd:
+                if nd["cluster_id"] is None and node.cluster:
+                    clear_changes.append(node.id)
+                    node.role_list = []
+                    node.pending_role_list = []
+                # relationship is set, because cluster_id is changed
+                # only on flush
+                cluster_id = nd["cluster_id"]
+                node.cluster = clusters.get(cluster_id)
+
+            regenerate_volumes = any((
+                'roles' in nd and
+                set(nd['roles']) != set(node.roles),
+                'pending_roles' in nd and
+                set(nd['pending_roles']) != set(node.pending_roles),
+                cluster_id != old_cluster_id
+            ))
+
+            for key, value in nd.iteritems():
+                if key == "roles":
+                    value = get_roles(node, value)
+                    if value is not None:
+                        node.role_list = value
+                elif key == "pending_roles":
+                    value = get_roles(node, value)
+                    if value is not None:
+                        node.pending_role_list = value
+                elif key not in ("id", "cluster_id"):
+                    setattr(node, key, value)
+
+            if not node.attributes:
+                node.attributes = NodeAttributes()
+            if not node.attributes.volumes:
+                node.attributes.volumes = \
+                    node.volume_manager.gen_volumes_info()
+            cls.update_volumes(
+                node,
+                force=regenerate_volumes,
+                add_disks_change=disks_changed.append
+            )
+
+            if cluster_id != old_cluster_id:
+                moved_nodes.append(node)
+            nodes_updated.append(node.id)
+
+        if clear_changes:
+            db().query(ClusterChanges).filter(
+                ClusterChanges.node_id.in_(clear_changes)
+            ).delete(synchronize_session='fetch')
+
+        if disks_changed:
+            # node can have "disks" change of cluster it's moved from
+            pending = set(db().query(
+                ClusterChanges.cluster_id,
+                ClusterChanges.node_id
+            ).filter_by(name='disks').filter(
+                ClusterChanges.node_id.in_([n.id for n in disks_changed])))
+            changes = [
+                {'cluster_id': changed.cluster.id,
+                 'node_id': changed.id,
+                 'name': 'disks'}
+                for changed in set(disks_changed)
+                if (changed.cluster.id, changed.id) not in pending]
+            if changes:
+                db().execute(ClusterChanges.__table__.insert(), changes)
+
+        NetworkManager.clear_networks_of_nodes(moved_nodes)
+        moved_nodes = sorted(
+            (node for node in moved_nodes if node.cluster),
+            key=lambda node: node.cluster.id)
+        for cluster, cluster_nodes in groupby(
+                moved_nodes, lambda node: node.cluster):
+            cluster.network_manager.assign_networks_to_nodes(
+                cluster, list(cluster_nodes))
+
+        db().commit()
+        return nodes_updated
 
 
 class NodeNICsHandler(BaseHandler):
@@ -39,7 +39,8 @@ class NotificationHandler(BaseHandler):
         "message",
         "status",
         "node_id",
-        "task_id"
+        "task_id",
+        "parent_id"
     )
     model = Notification
     validator = NotificationValidator
@@ -87,15 +88,21 @@ class NotificationHandler(BaseHandler):
 class NotificationCollectionHandler(BaseHandler):
 
     validator = NotificationValidator
+    etag_tables = ('notifications',)
 
     @content_json
     def GET(self):
         """:returns: Collection of JSONized Notification objects.
+        Notifications summarized by other notification are returned
+        only if ID of summary is given as parent_id.
         :http: * 200 (OK)
         """
-        user_data = web.input(limit=settings.MAX_ITEMS_PER_PAGE)
+        user_data = web.input(limit=settings.MAX_ITEMS_PER_PAGE,
+                              parent_id=None)
         limit = user_data.limit
-        query = db().query(Notification).limit(limit)
+        query = db().query(Notification).filter_by(
+            parent_id=user_data.parent_id
+        ).limit(limit)
         notifications = query.all()
         return map(
             NotificationHandler.render,
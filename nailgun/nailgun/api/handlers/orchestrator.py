@@ -73,7 +73,7 @@ class DefaultOrchestratorInfo(NodesFilterMixin, BaseHandler):
         """
         cluster = self.get_object_or_404(Cluster, cluster_id)
         nodes = self.get_nodes(cluster)
-        return self._serializer.serialize(cluster, nodes)
+        return self._serializer.serialize(cluster, nodes, parallel=True)
 
 
 class OrchestratorInfo(BaseHandler):
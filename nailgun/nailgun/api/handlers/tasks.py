@@ -14,6 +14,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from sqlalchemy.orm import defer
+from sqlalchemy.orm import joinedload
 import web
 
 from nailgun.api.handlers.base import BaseHandler
@@ -48,7 +50,11 @@ class TaskHandler(BaseHandler):
         :http: * 200 (OK)
                * 404 (task not found in db)
         """
-        task = self.get_object_or_404(Task, task_id)
+        # task is polled while it's changed by other threads,
+        # so it's reloaded even if it's already in session
+        task = db().query(Task).populate_existing().get(task_id)
+        if not task:
+            raise web.notfound('Task not found')
         return self.render(task)
 
     def DELETE(self, task_id):
@@ -74,25 +80,49 @@ class TaskCollectionHandler(BaseHandler):
     """Task collection handler
     """
 
+    etag_tables = ('tasks',)
+
     @content_json
     def GET(self):
-        """May receive cluster_id parameter to filter list
-        of tasks
+        """May receive following parameters to filter list of tasks:
+
+        - *cluster_id* - id of cluster, empty for tasks without cluster
+        - *status* - comma separated list of statuses
+        - *name* - comma separated list of names
+        - *fields* - comma separated list of fields to render
+        - *limit*, *offset*, *marker* - pagination parameters
 
         :returns: Collection of JSONized Task objects.
         :http: * 200 (OK)
-               * 404 (task not found in db)
+               * 400 (invalid parameters)
         """
         user_data = web.input(cluster_id=None)
+        fields = self.get_requested_fields(user_data, TaskHandler.fields)
+
+        # cache isn't loaded at all, it's deferred in model
+        options = []
+        if 'result' not in fields:
+            options.append(defer('result'))
+        if 'cluster' in fields:
+            options.append(joinedload('cluster'))
+        tasks = db().query(Task).options(*options)
+
         if user_data.cluster_id == '':
-            tasks = db().query(Task).filter_by(
-                cluster_id=None).all()
+            tasks = tasks.filter_by(cluster_id=None)
         elif user_data.cluster_id:
-            tasks = db().query(Task).filter_by(
-                cluster_id=user_data.cluster_id).all()
-        else:
-            tasks = db().query(Task).all()
-        return map(
-            TaskHandler.render,
-            tasks
-        )
+            tasks = tasks.filter_by(cluster_id=user_data.cluster_id)
+
+        statuses = self.get_list_param(
+            user_data, 'status', Task.TASK_STATUSES)
+        if statuses:
+            tasks = tasks.filter(Task.status.in_(statuses))
+        names = self.get_list_param(
+            user_data, 'name', Task.TASK_NAMES)
+        if names:
+            tasks = tasks.filter(Task.name.in_(names))
+
+        tasks = self.paginate(tasks, Task, user_data)
+        return [
+            TaskHandler.render(task, fields=fields)
+            for task in tasks.all()
+        ]
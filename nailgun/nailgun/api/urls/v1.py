@@ -35,6 +35,8 @@ from nailgun.api.handlers.logs import LogPackageHandler
 from nailgun.api.handlers.logs import LogSourceByNodeCollectionHandler
 from nailgun.api.handlers.logs import LogSourceCollectionHandler
 
+from nailgun.api.handlers.metrics import MetricsHandler
+
 from nailgun.api.handlers.network_configuration \
     import NeutronNetworkConfigurationHandler
 from nailgun.api.handlers.network_configuration \
@@ -171,6 +173,9 @@ urls = (
     r'/version/?$',
     VersionHandler,
 
+    r'/metrics/?$',
+    MetricsHandler,
+
     r'/plugins/?$',
     PluginCollectionHandler,
     r'/plugins/(?P<plugin_id>\d+)/?$',
@@ -17,6 +17,7 @@ from nailgun.api.validators.base import BasicValidator
 from nailgun.api.validators.json_schema.disks \
     import disks_simple_format_schema
 from nailgun.db import db
+from nailgun.db.sqlalchemy.models import Cluster
 from nailgun.db.sqlalchemy.models import Node
 from nailgun.errors import errors
 
@@ -144,6 +145,34 @@ class NodeValidator(BasicValidator):
                     [n['mac'] for n in data['meta']['interfaces']])).first()
                 return existent_node
 
+    @classmethod
+    def get_existent_macs(cls, macs):
+        """Returns set of MACs from given list which
+        belong to nodes in database
+        """
+        if not macs:
+            return set()
+        return set(mac for (mac,) in db().query(Node.mac).filter(
+            Node.mac.in_([mac.lower() for mac in macs])
+        ))
+
+    @classmethod
+    def get_existent_ids(cls, column, ids):
+        """Returns set of IDs from given list which
+        are present in given column of database table
+        """
+        int_ids = set()
+        for obj_id in ids:
+            try:
+                int_ids.add(int(obj_id))
+            except (TypeError, ValueError):
+                continue
+        if not int_ids:
+            return set()
+        return set(obj_id for (obj_id,) in db().query(column).filter(
+            column.in_(int_ids)
+        ))
+
     @classmethod
     def validate_roles(cls, data, node):
         if 'roles' in data:
@@ -179,7 +208,20 @@ class NodeValidator(BasicValidator):
                 log_message=True
             )
 
-        q = db().query(Node)
+        # resolve all MACs and IDs with one query instead of one query
+        # per node
+        macs_in_db = cls.get_existent_macs(
+            [nd["mac"] for nd in d if isinstance(nd, dict) and nd.get("mac")]
+        )
+        ids_in_db = cls.get_existent_ids(
+            Node.id,
+            [nd["id"] for nd in d if isinstance(nd, dict) and nd.get("id")]
+        )
+        clusters_in_db = cls.get_existent_ids(
+            Cluster.id,
+            [nd["cluster_id"] for nd in d
+             if isinstance(nd, dict) and nd.get("cluster_id") is not None]
+        )
         for nd in d:
             if not nd.get("mac") and not nd.get("id"):
                 raise errors.InvalidData(
@@ -193,7 +235,7 @@ class NodeValidator(BasicValidator):
                 )
             else:
                 if nd.get("mac"):
-                    existent_node = q.filter_by(mac=nd["mac"]).first() \
+                    existent_node = nd["mac"].lower() in macs_in_db \
                         or cls.validate_existent_node_mac_update(nd)
                     if not existent_node:
                         raise errors.InvalidData(
@@ -201,7 +243,10 @@ class NodeValidator(BasicValidator):
                             log_message=True
                         )
                 if nd.get("id"):
-                    existent_node = q.get(nd["id"])
+                    try:
+                        existent_node = int(nd["id"]) in ids_in_db
+                    except (TypeError, ValueError):
+                        existent_node = False
                     if not existent_node:
                         raise errors.InvalidData(
                             "Invalid ID specified",
@@ -209,6 +254,16 @@ class NodeValidator(BasicValidator):
                         )
                 if 'roles' in nd:
                     cls.validate_roles(nd, existent_node)
+            if nd.get("cluster_id") is not None:
+                try:
+                    nd["cluster_id"] = int(nd["cluster_id"])
+                except (TypeError, ValueError):
+                    pass
+                if nd["cluster_id"] not in clusters_in_db:
+                    raise errors.InvalidData(
+                        "Invalid cluster ID specified",
+                        log_message=True
+                    )
             if 'meta' in nd:
                 nd['meta'] = MetaValidator.validate_update(nd['meta'])
         return d
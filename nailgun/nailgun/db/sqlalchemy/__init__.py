@@ -19,6 +19,8 @@
 import contextlib
 from sqlalchemy.orm import scoped_session, sessionmaker
 from sqlalchemy import create_engine
+from sqlalchemy import event
+from sqlalchemy import exc
 from sqlalchemy.orm.query import Query
 
 from nailgun.settings import settings
@@ -28,14 +30,41 @@ db_str = "{engine}://{user}:{passwd}@{host}:{port}/{name}".format(
     **settings.DATABASE)
 
 
-engine = create_engine(db_str, client_encoding='utf8')
+pool_settings = settings.DATABASE_POOL or {}
+
+engine = create_engine(
+    db_str,
+    client_encoding='utf8',
+    pool_size=int(pool_settings.get('pool_size', 5)),
+    max_overflow=int(pool_settings.get('max_overflow', 10)),
+    pool_timeout=int(pool_settings.get('pool_timeout', 30)),
+    pool_recycle=int(pool_settings.get('pool_recycle', -1))
+)
+
+
+def ping_connection(dbapi_connection, connection_record, connection_proxy):
+    """Checks connection taken from pool, broken connection
+    is replaced by pool with new one
+    """
+    try:
+        cursor = dbapi_connection.cursor()
+        cursor.execute("SELECT 1")
+        cursor.close()
+    except Exception:
+        raise exc.DisconnectionError()
+
+
+if int(pool_settings.get('pre_ping', 0)):
+    event.listen(engine.pool, 'checkout', ping_connection)
 
 
 class NoCacheQuery(Query):
-    """Override for common Query class.
-    Needed for automatic refreshing objects
-    from database during every query for evading
-    problems with multiple sessions
+    """Query which refreshes objects already loaded in session
+    from database. Session doesn't use it by default, because it's
+    committed (and so expired) after every request and RPC message;
+    it's for places where objects could be changed by other threads
+    during one transaction. Query.populate_existing() does the same
+    for one query.
     """
     def __init__(self, *args, **kwargs):
         self._populate_existing = True
@@ -46,8 +75,7 @@ db = scoped_session(
     sessionmaker(
         autoflush=True,
         autocommit=False,
-        bind=engine,
-        query_cls=NoCacheQuery
+        bind=engine
     )
 )
 
@@ -59,8 +87,9 @@ def load_db_driver(handler):
         db().rollback()
         raise
     finally:
+        # all objects of session are expired on commit,
+        # so they are loaded again by the next request
         db().commit()
-        db().expire_all()
 
 
 def syncdb():
@@ -25,10 +25,12 @@ from sqlalchemy import Enum
 from sqlalchemy import ForeignKey
 from sqlalchemy import Integer
 from sqlalchemy import Unicode
+from sqlalchemy.orm import deferred
 from sqlalchemy.orm import relationship, backref
 
 from nailgun.db import db
 from nailgun.db.sqlalchemy.models.base import Base
+from nailgun.db.sqlalchemy.models.fields import CompressedJSON
 from nailgun.db.sqlalchemy.models.fields import JSON
 from nailgun.db.sqlalchemy.models.release import Release
 from nailgun.logger import logger
@@ -125,8 +127,10 @@ class Cluster(Base):
         "8.8.8.8",
         "8.8.4.4"
     ])
-    replaced_deployment_info = Column(JSON, default={})
-    replaced_provisioning_info = Column(JSON, default={})
+    replaced_deployment_info = deferred(
+        Column(CompressedJSON, default={}))
+    replaced_provisioning_info = deferred(
+        Column(CompressedJSON, default={}))
     is_customized = Column(Boolean, default=False)
 
     neutron_config = relationship("NeutronConfig",
@@ -14,10 +14,33 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import base64
+import importlib
 import json
+import zlib
 
 import sqlalchemy.types as types
 
+from nailgun.logger import logger
+from nailgun.settings import settings
+
+
+def get_json_codec(name=None):
+    """Returns module which is used for encoding and decoding of
+    JSON columns. It's set by JSON_CODEC in settings, module should
+    provide dumps and loads compatible with json module of stdlib.
+    """
+    name = name or settings.JSON_CODEC or 'json'
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        logger.warning(
+            u'Cannot import JSON codec "{0}", json is used'.format(name))
+        return json
+
+
+codec = get_json_codec()
+
 
 class JSON(types.TypeDecorator):
 
@@ -25,15 +48,44 @@ class JSON(types.TypeDecorator):
 
     def process_bind_param(self, value, dialect):
         if value is not None:
-            value = json.dumps(value)
+            value = codec.dumps(value)
         return value
 
     def process_result_value(self, value, dialect):
         if value is not None:
-            value = json.loads(value)
+            value = codec.loads(value)
         return value
 
 
+class CompressedJSON(JSON):
+    """JSON which is compressed if it's bigger than min_size bytes.
+
+    Compressed value is stored as base64 with prefix which can't
+    start JSON document, so values stored as plain JSON are read
+    as usual.
+    """
+
+    prefix = 'zlib:'
+
+    def __init__(self, min_size=4096, *args, **kwargs):
+        super(CompressedJSON, self).__init__(*args, **kwargs)
+        self.min_size = min_size
+
+    def process_bind_param(self, value, dialect):
+        value = super(CompressedJSON, self).process_bind_param(
+            value, dialect)
+        if value is not None and len(value) >= self.min_size:
+            value = self.prefix + base64.b64encode(zlib.compress(value))
+        return value
+
+    def process_result_value(self, value, dialect):
+        if value is not None and value.startswith(self.prefix):
+            value = zlib.decompress(
+                base64.b64decode(value[len(self.prefix):]))
+        return super(CompressedJSON, self).process_result_value(
+            value, dialect)
+
+
 class LowercaseString(types.TypeDecorator):
 
     impl = types.String
@@ -14,6 +14,9 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import hashlib
+import json
+
 from sqlalchemy import Boolean
 from sqlalchemy import Column
 from sqlalchemy import DateTime
@@ -23,6 +26,7 @@ from sqlalchemy import Integer
 from sqlalchemy import String
 from sqlalchemy import Unicode
 from sqlalchemy import UniqueConstraint
+from sqlalchemy import event
 from sqlalchemy.orm import relationship, backref
 
 from nailgun.db import db
@@ -79,7 +83,7 @@ class Node(Base):
         'deletion'
     )
     id = Column(Integer, primary_key=True)
-    cluster_id = Column(Integer, ForeignKey('clusters.id'))
+    cluster_id = Column(Integer, ForeignKey('clusters.id'), index=True)
     name = Column(Unicode(100))
     status = Column(
         Enum(*NODE_STATUSES, name='node_status'),
@@ -87,6 +91,9 @@ class Node(Base):
         default='discover'
     )
     meta = Column(JSON, default={})
+    # hash of the raw meta reported by agent, is used to skip
+    # interfaces and volumes processing if hardware didn't change
+    meta_hash = Column(String(32))
     mac = Column(LowercaseString(17), nullable=False, unique=True)
     ip = Column(String(15))
     fqdn = Column(String(255))
@@ -211,21 +218,7 @@ class Node(Base):
         :raises: errors.CanNotFindInterface
         """
         from nailgun.network.manager import NetworkManager
-
-        admin_ng = NetworkManager.get_admin_network_group()
-        for interface in self.interfaces:
-            if admin_ng in interface.assigned_networks_list:
-                return interface
-
-        for interface in self.interfaces:
-            ip_addr = interface.ip_addr
-            if NetworkManager.is_ip_belongs_to_admin_subnet(ip_addr):
-                return interface
-
-        logger.warning(u'Cannot find admin interface for node '
-                       'return first interface: "%s"' %
-                       self.full_name)
-        return self.interfaces[0]
+        return NetworkManager.get_admin_interface(self)
 
     def _check_interface_has_required_params(self, iface):
         return bool(iface.get('name') and iface.get('mac'))
@@ -239,6 +232,10 @@ class Node(Base):
             iface[param] = val
         return iface
 
+    @staticmethod
+    def calc_meta_hash(data):
+        return hashlib.md5(json.dumps(data, sort_keys=True)).hexdigest()
+
     def update_meta(self, data):
         # helper for basic checking meta before updation
         result = []
@@ -272,6 +269,12 @@ class Node(Base):
         self.meta = data
 
 
+@event.listens_for(Node.meta, 'set')
+def reset_meta_hash(node, value, oldvalue, initiator):
+    # meta was changed not by agent report - hash isn't valid anymore
+    node.meta_hash = None
+
+
 class NodeAttributes(Base):
     __tablename__ = 'node_attributes'
     id = Column(Integer, primary_key=True)
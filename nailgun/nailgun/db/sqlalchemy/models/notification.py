@@ -57,3 +57,8 @@ class Notification(Base):
         default='unread'
     )
     datetime = Column(DateTime, nullable=False)
+    # notification which summarizes this one and similar notifications
+    parent_id = Column(
+        Integer,
+        ForeignKey('notifications.id', ondelete='CASCADE')
+    )
@@ -20,6 +20,7 @@ from sqlalchemy import Integer
 from sqlalchemy import String
 from sqlalchemy import Unicode
 from sqlalchemy import UniqueConstraint
+from sqlalchemy import event
 
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql.expression import not_
@@ -28,6 +29,7 @@ from nailgun.db import db
 from nailgun.db.sqlalchemy.models.base import Base
 from nailgun.db.sqlalchemy.models.fields import JSON
 from nailgun.db.sqlalchemy.models.node import Role
+from nailgun.volumes.cache import VolumeLayoutCache
 
 
 class Release(Base):
@@ -81,3 +83,9 @@ class Release(Base):
                     Role(name=role, release=self)
                 )
                 added_roles.append(role)
+
+
+@event.listens_for(Release.volumes_metadata, 'set')
+def clear_volume_layouts(release, value, oldvalue, initiator):
+    # layouts generated with old volumes aren't needed anymore
+    VolumeLayoutCache.clear()
@@ -23,10 +23,12 @@ from sqlalchemy import ForeignKey
 from sqlalchemy import Integer
 from sqlalchemy import String
 from sqlalchemy import Text
+from sqlalchemy.orm import deferred
 from sqlalchemy.orm import relationship, backref
 
 from nailgun.db import db
 from nailgun.db.sqlalchemy.models.base import Base
+from nailgun.db.sqlalchemy.models.fields import CompressedJSON
 from nailgun.db.sqlalchemy.models.fields import JSON
 
 
@@ -90,7 +92,9 @@ class Task(Base):
         default='running'
     )
     progress = Column(Integer, default=0)
-    cache = Column(JSON, default={})
+    # message sent to orchestrator, it's big for large clusters,
+    # so it's compressed and loaded only when it's accessed
+    cache = deferred(Column(CompressedJSON, default={}))
     result = Column(JSON, default={})
     parent_id = Column(Integer, ForeignKey('tasks.id'))
     subtasks = relationship(
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+
+#    Copyright 2013 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import multiprocessing
+import uuid
+
+from sqlalchemy import event
+from sqlalchemy.sql.expression import Update
+from sqlalchemy.sql.expression import UpdateBase
+
+from nailgun.db.sqlalchemy import engine
+# metadata is filled, because package of models imports all of them
+from nailgun.db.sqlalchemy.models.base import Base
+
+
+class TableRevisions(object):
+    """Revision counters of database tables.
+
+    Counter of table is increased by every INSERT, UPDATE or DELETE
+    statement executed through engine (by ORM flush, by Query bulk
+    operations and by core statements) and once more when transaction
+    is finished, so data read before commit isn't considered actual.
+
+    Counters are kept in shared memory, so they are shared by
+    processes forked after import of this module. Token identifies
+    counters, because they start from zero after restart.
+    """
+
+    # changes of these columns don't change revision of table
+    ignored_columns = {
+        'nodes': set(['timestamp'])
+    }
+
+    tables = sorted(Base.metadata.tables)
+    counters = multiprocessing.Array('l', len(tables))
+    token = uuid.uuid4().hex
+
+    @classmethod
+    def bump(cls, table_name):
+        try:
+            i = cls.tables.index(table_name)
+        except ValueError:
+            return
+        with cls.counters.get_lock():
+            cls.counters[i] += 1
+
+    @classmethod
+    def get(cls, *table_names):
+        """Returns tuple of revisions of given tables
+        """
+        return tuple(
+            cls.counters[cls.tables.index(name)] for name in table_names
+        )
+
+    @classmethod
+    def is_changing(cls, statement, multiparams, params):
+        """Checks if statement changes not only ignored columns
+        """
+        ignored = cls.ignored_columns.get(statement.table.name)
+        if not ignored or not isinstance(statement, Update):
+            return True
+
+        if statement.parameters:
+            keys = [getattr(k, 'key', k) for k in statement.parameters]
+        else:
+            values = multiparams[0] if multiparams else params
+            if isinstance(values, (list, tuple)):
+                values = values[0] if values else {}
+            keys = values.keys() if isinstance(values, dict) else []
+        # the rest of parameters are used in WHERE clause
+        columns = set(keys) & set(statement.table.c.keys())
+        return not columns or not columns <= ignored
+
+
+@event.listens_for(engine, 'after_execute')
+def table_changed(conn, clauseelement, multiparams, params, result):
+    if not isinstance(clauseelement, UpdateBase) or \
+            not TableRevisions.is_changing(clauseelement, multiparams, params):
+        return
+    table_name = clauseelement.table.name
+    TableRevisions.bump(table_name)
+    if conn.closed:
+        # statement executed by engine is committed
+        # and its connection is closed already
+        TableRevisions.bump(table_name)
+        return
+    conn.info.setdefault('changed_tables', set()).add(table_name)
+
+
+@event.listens_for(engine, 'commit')
+@event.listens_for(engine, 'rollback')
+def transaction_finished(conn):
+    for table_name in conn.info.pop('changed_tables', ()):
+        TableRevisions.bump(table_name)
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+
+#    Copyright 2013 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import threading
+import time
+
+from sqlalchemy import event
+
+from nailgun.db.sqlalchemy import engine
+from nailgun.logger import logger
+from nailgun.settings import settings
+
+
+class StatementsStats(object):
+    """Number and execution time of SQL statements.
+
+    Totals are counted for all threads of process. Counters of
+    current request (or other unit of work) are kept per thread,
+    they are reset by start().
+    """
+
+    _local = threading.local()
+    _lock = threading.Lock()
+
+    count = 0
+    time = 0.0
+    slow_count = 0
+
+    @classmethod
+    def start(cls):
+        cls._local.count = 0
+        cls._local.time = 0.0
+
+    @classmethod
+    def current(cls):
+        """Returns number and time of statements
+        executed by thread since start()
+        """
+        return getattr(cls._local, 'count', 0), \
+            getattr(cls._local, 'time', 0.0)
+
+    @classmethod
+    def add(cls, statement, parameters, duration):
+        cls._local.count = getattr(cls._local, 'count', 0) + 1
+        cls._local.time = getattr(cls._local, 'time', 0.0) + duration
+
+        threshold = float(
+            (settings.DATABASE_METRICS or {}).get('slow_statement_time', 0))
+        is_slow = threshold and duration >= threshold
+        with cls._lock:
+            cls.count += 1
+            cls.time += duration
+            if is_slow:
+                cls.slow_count += 1
+
+        if is_slow:
+            logger.warning(
+                u"Slow SQL statement (%.3f s): %s %r",
+                duration, statement, parameters)
+
+    @classmethod
+    def stats(cls):
+        pool = engine.pool
+        return {
+            'statements': cls.count,
+            'statements_time': round(cls.time, 3),
+            'slow_statements': cls.slow_count,
+            'pool': {
+                'size': pool.size(),
+                'checked_in': pool.checkedin(),
+                'checked_out': pool.checkedout(),
+                'overflow': pool.overflow()
+            }
+        }
+
+
+@event.listens_for(engine, 'before_cursor_execute')
+def before_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany):
+    # statements of one connection aren't executed concurrently,
+    # value left by failed statement is replaced by the next one
+    conn.info['statement_started'] = time.time()
+
+
+@event.listens_for(engine, 'after_cursor_execute')
+def after_cursor_execute(conn, cursor, statement, parameters, context,
+                         executemany):
+    started = conn.info.pop('statement_started', None)
+    if started is None:
+        return
+    StatementsStats.add(statement, parameters, time.time() - started)
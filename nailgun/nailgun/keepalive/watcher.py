@@ -17,16 +17,16 @@
 from datetime import datetime
 from datetime import timedelta
 from itertools import repeat
-from sqlalchemy.sql import not_
+from sqlalchemy import and_
+from sqlalchemy import func
 import threading
 import time
 import traceback
 
-from nailgun import notifier
-
 from nailgun.db import db
 from nailgun.db.sqlalchemy.models import Node
 from nailgun.logger import logger
+from nailgun import notifier
 from nailgun.settings import settings
 
 
@@ -37,10 +37,19 @@ class KeepAliveThread(threading.Thread):
         self.stop_status_checking = threading.Event()
         self.interval = interval or settings.KEEPALIVE['interval']
         self.timeout = timeout or settings.KEEPALIVE['timeout']
+        # nodes can't go offline before this moment,
+        # so there is no need to check them in database
+        self.next_expiration = None
+        # but database is checked at least once per timeout anyway,
+        # in case if timestamps were changed not by agent
+        self.last_check = None
 
     def reset_nodes_timestamp(self):
-        db().query(Node).update({'timestamp': datetime.now()})
+        db().query(Node).filter_by(
+            online=True
+        ).update({'timestamp': datetime.now()})
         db().commit()
+        self.next_expiration = None
 
     def join(self, timeout=None):
         self.stop_status_checking.set()
@@ -66,20 +75,59 @@ class KeepAliveThread(threading.Thread):
             if self.stop_status_checking.isSet():
                 break
 
+    def need_check(self, now):
+        """Agent reports can only move node timestamps forward,
+        so if earliest possible expiration isn't reached yet
+        there is nothing to check.
+        """
+        if self.next_expiration is None or self.last_check is None:
+            return True
+        return now >= self.next_expiration or \
+            now - self.last_check >= timedelta(seconds=self.timeout)
+
     def update_status_nodes(self):
-        to_update = db().query(Node).filter(
-            not_(Node.status == 'provisioning')
-        ).filter(
-            datetime.now() > (Node.timestamp + timedelta(seconds=self.timeout))
-        ).filter_by(
-            online=True
-        )
-        for node_db in to_update:
-            notifier.notify(
-                "error",
-                u"Node '{0}' has gone away".format(
-                    node_db.human_readable_name),
-                node_id=node_db.id
+        now = datetime.now()
+        if not self.need_check(now):
+            return
+
+        expired = now - timedelta(seconds=self.timeout)
+        nodes = Node.__table__
+        gone_nodes = db().execute(
+            nodes.update().where(
+                and_(
+                    True == nodes.c.online,
+                    nodes.c.status != 'provisioning',
+                    nodes.c.timestamp < expired
+                )
+            ).values(
+                online=False
+            ).returning(
+                nodes.c.id,
+                nodes.c.name,
+                nodes.c.mac
             )
-        to_update.update({"online": False})
+        ).fetchall()
+
+        if gone_nodes:
+            with notifier.batch():
+                for node in gone_nodes:
+                    notifier.notify(
+                        "error",
+                        u"Node '{0}' has gone away".format(
+                            node.name or node.mac),
+                        node_id=node.id,
+                        summary=u"{0} nodes have gone away")
+            logger.info(
+                u"Nodes went offline: %s",
+                u", ".join(node.name or node.mac for node in gone_nodes))
+
+        # provisioning nodes are taken into account too
+        # because they can change status without agent report
+        oldest = db().query(func.min(Node.timestamp)).filter_by(
+            online=True
+        ).scalar()
         db().commit()
+
+        self.last_check = now
+        self.next_expiration = (oldest or now) + \
+            timedelta(seconds=self.timeout)
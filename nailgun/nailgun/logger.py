@@ -15,7 +15,13 @@
 #    under the License.
 
 import logging
+import os
+import Queue
+import random
+import re
 import sys
+import threading
+import time
 
 from logging.handlers import WatchedFileHandler
 from StringIO import StringIO
@@ -46,14 +52,73 @@ def make_api_logger():
     # we import logger module in settings
     from nailgun.settings import settings
 
+    access_log = settings.ACCESS_LOG or {}
     logger = logging.getLogger("nailgun-api")
     log_file = WatchedFileHandler(settings.API_LOG)
     log_file.setFormatter(formatter)
-    logger.setLevel(logging.DEBUG)
-    logger.addHandler(log_file)
+    logger.setLevel(
+        getattr(logging, access_log.get('level', 'DEBUG').upper()))
+    logger.addHandler(
+        BufferedHandler(log_file, int(access_log.get('buffer_size', 0))))
     return logger
 
 
+class BufferedHandler(logging.Handler):
+    """Handler which puts records in queue and returns at once,
+    records are formatted and written by target handler in background
+    thread. Records are dropped when queue is full.
+    """
+
+    def __init__(self, target, capacity=0):
+        logging.Handler.__init__(self)
+        self.target = target
+        self.capacity = capacity
+        self.dropped = 0
+        self.pid = None
+        self.queue = None
+        self.writer_lock = threading.Lock()
+
+    def _start_writer(self):
+        # threads aren't copied to forked process, so every process
+        # starts its own writer
+        with self.writer_lock:
+            if self.pid == os.getpid():
+                return
+            self.queue = Queue.Queue(self.capacity)
+            writer = threading.Thread(target=self._write, args=(self.queue,))
+            writer.daemon = True
+            writer.start()
+            self.pid = os.getpid()
+
+    def _write(self, queue):
+        while True:
+            record = queue.get()
+            try:
+                self.target.handle(record)
+            finally:
+                queue.task_done()
+
+    def emit(self, record):
+        if self.pid != os.getpid():
+            self._start_writer()
+        try:
+            self.queue.put_nowait(record)
+        except Queue.Full:
+            self.dropped += 1
+
+    def flush(self):
+        """Waits until records emitted by this process are written
+        """
+        if self.pid == os.getpid():
+            self.queue.join()
+        self.target.flush()
+
+    def close(self):
+        self.flush()
+        self.target.close()
+        logging.Handler.close(self)
+
+
 logger = make_nailgun_logger()
 
 
@@ -68,53 +133,155 @@ class WriteLogger(logging.Logger, object):
             self.logger(message)
 
 
+class PeekedInput(object):
+    """Stream of request body, beginning of which is already read
+    """
+
+    def __init__(self, head, rest):
+        self.head = StringIO(head)
+        self.rest = rest
+
+    def read(self, size=-1):
+        data = self.head.read(size)
+        if size < 0:
+            return data + self.rest.read()
+        if len(data) < size:
+            data += self.rest.read(size - len(data))
+        return data
+
+    def readline(self, size=-1):
+        line = self.head.readline(size)
+        if line.endswith('\n') or 0 <= size <= len(line):
+            return line
+        if size < 0:
+            return line + self.rest.readline()
+        return line + self.rest.readline(size - len(line))
+
+    def __iter__(self):
+        return iter(self.readline, '')
+
+
+class LoggedResponse(object):
+    """Response of application, which counts sent bytes and calls
+    callback with their number when response is closed
+    """
+
+    def __init__(self, result, on_close):
+        self.result = result
+        self.on_close = on_close
+        self.size = 0
+
+    def __iter__(self):
+        for chunk in self.result:
+            self.size += len(chunk)
+            yield chunk
+
+    def close(self):
+        try:
+            if hasattr(self.result, 'close'):
+                self.result.close()
+        finally:
+            self.on_close(self.size)
+
+
 class HTTPLoggerMiddleware(object):
+    """Writes one record to API log for every request when response
+    is sent. Successful requests are logged with DEBUG level, failed
+    ones with ERROR level. Only part of successful requests to routes
+    given in ACCESS_LOG sampling setting are logged.
+    """
+
     def __init__(self, application):
+        # Circular import dependency problem
+        # we import logger module in settings
+        from nailgun.db.sqlalchemy.statements import StatementsStats
+        from nailgun.settings import settings
+
+        access_log = settings.ACCESS_LOG or {}
         self.application = application
         self.api_logger = make_api_logger()
+        self.statements_stats = StatementsStats
+        self.body_size = int(access_log.get('body_size', 0))
+        self.sampling = [
+            (re.compile(route), float(rate))
+            for route, rate in (access_log.get('sampling') or {}).items()
+        ]
 
     def __call__(self, env, start_response):
         env['wsgi.errors'] = WriteLogger(self.api_logger.error)
-        self.__logging_request(env)
+        started = time.time()
+        self.statements_stats.start()
+
+        sampled = self.__is_sampled(env)
+        body = ''
+        if sampled and self.api_logger.isEnabledFor(logging.DEBUG):
+            body = self.__peek_body(env)
+
+        response = {'status': SERVER_ERROR_MSG}
 
         def start_response_with_logging(status, headers, *args):
-            self.__logging_response(env, status)
+            response['status'] = status
             return start_response(status, headers, *args)
 
-        return self.application(env, start_response_with_logging)
+        def log_request(size):
+            self.__logging_request(
+                env, sampled, response['status'], size,
+                time.time() - started, body)
 
-    def __logging_response(self, env, response_code):
-        response_info = "Response code '%s' for %s %s from %s:%s" % (
-            response_code,
-            env['REQUEST_METHOD'],
-            env['REQUEST_URI'],
-            self.__get_remote_ip(env),
-            env['REMOTE_PORT'],
-        )
+        try:
+            result = self.application(env, start_response_with_logging)
+        except Exception:
+            log_request(0)
+            raise
+        return LoggedResponse(result, log_request)
 
-        if response_code == SERVER_ERROR_MSG:
-            self.api_logger.error(response_info)
-        else:
-            self.api_logger.debug(response_info)
+    def __is_sampled(self, env):
+        route = '%s %s' % (env['REQUEST_METHOD'], env.get('PATH_INFO', ''))
+        for regexp, rate in self.sampling:
+            if regexp.search(route):
+                return random.random() < rate
+        return True
 
-    def __logging_request(self, env):
-        length = int(env.get('CONTENT_LENGTH', 0))
-        body = ''
+    def __peek_body(self, env):
+        length = int(env.get('CONTENT_LENGTH') or 0)
+        if not length or not self.body_size:
+            return ''
+
+        head = env['wsgi.input'].read(min(length, self.body_size))
+        env['wsgi.input'] = PeekedInput(head, env['wsgi.input'])
+        if length > len(head):
+            return '%s... (%s bytes)' % (head, length)
+        return head
 
-        if length != 0:
-            body = env['wsgi.input'].read(length)
-            env['wsgi.input'] = StringIO(body)
+    def __logging_request(
+            self, env, sampled, response_code, size, duration, body):
+        if response_code.startswith('5'):
+            level = logging.ERROR
+        elif sampled:
+            level = logging.DEBUG
+        else:
+            return
+        if not self.api_logger.isEnabledFor(level):
+            return
 
-        request_info = "Request %s %s from %s:%s %s" % (
+        statements, statements_time = self.statements_stats.current()
+        # arguments are formatted by writer of log
+        self.api_logger.log(
+            level,
+            "Response code '%s' for %s %s from %s:%s, %s bytes in %.3f s "
+            "(%s SQL statements in %.3f s) %s",
+            response_code,
             env['REQUEST_METHOD'],
             env['REQUEST_URI'],
             self.__get_remote_ip(env),
             env['REMOTE_PORT'],
+            size,
+            duration,
+            statements,
+            statements_time,
             body
         )
 
-        self.api_logger.debug(request_info)
-
     def __get_remote_ip(self, env):
         if 'HTTP_X_REAL_IP' in env:
             return env['HTTP_X_REAL_IP']
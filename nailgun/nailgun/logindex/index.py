@@ -0,0 +1,406 @@
+# -*- coding: utf-8 -*-
+
+#    Copyright 2013 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from array import array
+from bisect import bisect_left
+from bisect import bisect_right
+import calendar
+from collections import OrderedDict
+import fcntl
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+from nailgun.logger import logger
+from nailgun.settings import settings
+
+
+class LogIndex(object):
+    """Index of log file entries.
+
+    For every entry of log file index keeps byte offsets of its
+    first and last line, timestamp and level. Entries of every level
+    are also kept as separate list, so entries can be selected by
+    position in file, by date and by level with binary search,
+    without reading and parsing the whole file.
+
+    Index is updated incrementally: only lines added to log file
+    since last update are parsed. If file was rotated or truncated
+    index is built from scratch.
+
+    If index_dir is given, index is stored there as a set of binary
+    files (one per column) and shared between processes.
+    """
+
+    version = 1
+    # number of bytes at the beginning of file
+    # used to check that file was not replaced
+    head_size = 256
+    columns = (
+        ('starts', 'l'),
+        ('ends', 'l'),
+        ('times', 'd'),
+        ('levels', 'h'),
+    )
+
+    def __init__(self, log_file, log_config, index_dir=None):
+        self.log_file = log_file
+        self.log_config = log_config
+        self.regexp = re.compile(log_config['regexp'])
+        self.skip_regexp = None
+        if log_config.get('skip_regexp'):
+            self.skip_regexp = re.compile(log_config['skip_regexp'])
+        self.multiline = bool(log_config.get('multiline'))
+        self.lock = threading.RLock()
+        self.path = None
+        if index_dir:
+            self.path = os.path.join(
+                index_dir, self.signature(log_file, log_config))
+        self.reset()
+
+    @classmethod
+    def signature(cls, log_file, log_config):
+        """Index depends on file and on the way it is parsed
+        """
+        return hashlib.sha1(json.dumps([
+            cls.version,
+            log_file,
+            log_config['regexp'],
+            log_config.get('skip_regexp'),
+            log_config['date_format'],
+            bool(log_config.get('multiline'))
+        ])).hexdigest()
+
+    def reset(self):
+        for name, typecode in self.columns:
+            setattr(self, name, array(typecode))
+        self.level_names = []
+        self.by_level = {}
+        # inode and [length, hash] of the beginning of indexed file
+        self.inode = None
+        self.head = None
+        # number of items of every array written to storage
+        self.saved_counts = {}
+        # offset of first not parsed byte
+        self.size = 0
+        # parsing is continued from here, last entry
+        # can be continued by next lines in multiline logs
+        self.resume_from = 0
+        self.open_entry = False
+
+    def __len__(self):
+        return len(self.starts)
+
+    def _read_head(self, f, size):
+        f.seek(0)
+        return [size, hashlib.md5(f.read(size)).hexdigest()]
+
+    def _same_file(self, f, stat):
+        if self.head is None or self.inode != stat.st_ino or \
+                stat.st_size < self.size:
+            return False
+        return self._read_head(f, self.head[0]) == self.head
+
+    def _parse_date(self, date):
+        if date != self._last_date:
+            self._last_time = calendar.timegm(
+                time.strptime(date, self.log_config['date_format']))
+            self._last_date = date
+        return self._last_time
+
+    def _level_id(self, level):
+        try:
+            return self.level_names.index(level)
+        except ValueError:
+            self.level_names.append(level)
+            self.by_level[len(self.level_names) - 1] = array('l')
+            return len(self.level_names) - 1
+
+    def _append(self, entry):
+        start, end, entry_time, level_id = entry
+        self.by_level[level_id].append(len(self.starts))
+        self.starts.append(start)
+        self.ends.append(end)
+        self.times.append(entry_time)
+        self.levels.append(level_id)
+
+    def _pop(self):
+        self.by_level[self.levels.pop()].pop()
+        self.starts.pop()
+        self.ends.pop()
+        self.times.pop()
+
+    def _parse(self, f):
+        if self.open_entry:
+            # it will be parsed again with lines added after it
+            self._pop()
+            self.open_entry = False
+
+        self._last_date = None
+        offset = self.resume_from
+        f.seek(offset)
+        # entry which can be continued by next lines,
+        # None for entry with invalid date
+        entry = None
+        entry_start = None
+
+        for line in f:
+            if not line.endswith('\n'):
+                # line is being written right now
+                break
+            line_start = offset
+            offset += len(line)
+
+            text = line.rstrip('\n')
+            if not text or \
+                    self.skip_regexp and self.skip_regexp.match(text):
+                continue
+            m = self.regexp.match(text)
+            if m is None:
+                if self.multiline and entry:
+                    entry[1] = offset
+                continue
+
+            if entry:
+                self._append(entry)
+            try:
+                entry = [
+                    line_start,
+                    offset,
+                    self._parse_date(m.group('date')),
+                    self._level_id(m.group('level').upper() or 'INFO')
+                ]
+            except ValueError:
+                entry = None
+            entry_start = line_start
+
+            if not self.multiline:
+                if entry:
+                    self._append(entry)
+                entry = None
+                entry_start = None
+
+        self.size = offset
+        if entry_start is None:
+            self.resume_from = offset
+        else:
+            self.resume_from = entry_start
+            if entry:
+                self._append(entry)
+                self.open_entry = True
+
+    def update(self):
+        """Indexes lines added to log file since last update
+        """
+        with self.lock:
+            lock_file = self._lock_storage()
+            try:
+                self._load()
+                with open(self.log_file, 'r') as f:
+                    stat = os.fstat(f.fileno())
+                    if not self._same_file(f, stat):
+                        self.reset()
+                        self.inode = stat.st_ino
+                    if stat.st_size > self.size:
+                        self._parse(f)
+                        self.head = self._read_head(
+                            f, min(self.size, self.head_size))
+                        self._save()
+            finally:
+                if lock_file:
+                    lock_file.close()
+
+    def find(self, to_byte=0, levels=None, date_after=None,
+             date_before=None, limit=None):
+        """Finds entries which start at or after to_byte offset
+        and fit into (date_after, date_before) interval.
+        Entries are supposed to be sorted by date in log file.
+
+        :param levels: list of allowed levels, all levels if None
+        :param date_after: time in seconds since the epoch (UTC)
+        :param date_before: time in seconds since the epoch (UTC)
+        :param limit: max number of entries to return
+        :returns: list of entry numbers (newest first) and
+                  number of matched entries
+        """
+        lo = bisect_left(self.starts, to_byte)
+        hi = len(self)
+        if date_after is not None:
+            lo = max(lo, bisect_right(self.times, date_after))
+        if date_before is not None:
+            hi = min(hi, bisect_left(self.times, date_before))
+        if lo >= hi:
+            return [], 0
+
+        if levels is None:
+            total = hi - lo
+            found = xrange(hi - 1, max(lo, hi - (limit or total)) - 1, -1)
+            return list(found), total
+
+        total = 0
+        found = []
+        for level in levels:
+            if level not in self.level_names:
+                continue
+            entries = self.by_level[self.level_names.index(level)]
+            first = bisect_left(entries, lo)
+            last = bisect_left(entries, hi)
+            total += last - first
+            if limit:
+                first = max(first, last - limit)
+            found.extend(entries[first:last])
+        found.sort(reverse=True)
+        return found[:limit], total
+
+    def read(self, f, num):
+        """Reads entry from opened log file
+
+        :returns: date (struct_time), level and text of entry
+        """
+        f.seek(self.starts[num])
+        lines = f.read(self.ends[num] - self.starts[num]).split('\n')
+        m = self.regexp.match(lines[0])
+        if m is None:
+            # file was changed after indexing
+            return None
+        text = [m.group('text')]
+        for line in lines[1:]:
+            if line and not (
+                    self.skip_regexp and self.skip_regexp.match(line)):
+                text.append(line)
+        return (
+            time.strptime(m.group('date'), self.log_config['date_format']),
+            self.level_names[self.levels[num]],
+            '\n'.join(text)
+        )
+
+    def _lock_storage(self):
+        if not self.path:
+            return None
+        try:
+            if not os.path.isdir(self.path):
+                os.makedirs(self.path)
+            lock_file = open(os.path.join(self.path, 'lock'), 'a')
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            return lock_file
+        except (IOError, OSError) as exc:
+            logger.warning(
+                u"Unable to use log index directory %s, "
+                u"log index is kept in memory only: %s", self.path, exc)
+            self.path = None
+            return None
+
+    def _arrays(self):
+        arrays = [(name, getattr(self, name)) for name, _ in self.columns]
+        arrays.extend(
+            ('level-{0}'.format(level_id), entries)
+            for level_id, entries in self.by_level.iteritems()
+        )
+        return arrays
+
+    def _read_meta(self):
+        try:
+            with open(os.path.join(self.path, 'meta.json')) as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            return None
+
+    def _load(self):
+        """Loads index from storage if it was updated
+        by another process
+        """
+        if not self.path:
+            return
+        meta = self._read_meta()
+        if not meta or meta['counts'] == self.saved_counts and \
+                meta['inode'] == self.inode and meta['head'] == self.head:
+            return
+
+        self.reset()
+        for level_id in xrange(len(meta['level_names'])):
+            self.by_level[level_id] = array('l')
+        try:
+            for name, items in self._arrays():
+                with open(os.path.join(self.path, name), 'rb') as f:
+                    items.fromfile(f, meta['counts'][name])
+        except (IOError, EOFError, KeyError):
+            logger.warning(u"Log index %s is broken, rebuilding", self.path)
+            self.reset()
+            return
+        for key in ('inode', 'head', 'resume_from', 'level_names'):
+            setattr(self, key, meta[key])
+        self.saved_counts = meta['counts']
+        # entry which was not finished when index was saved
+        # is not stored, so it's parsed again from resume_from
+        self.size = self.resume_from
+
+    def _save(self):
+        if not self.path:
+            return
+        counts = {}
+        try:
+            for name, items in self._arrays():
+                count = len(items)
+                if self.open_entry and (
+                        name in dict(self.columns) or
+                        name == 'level-{0}'.format(self.levels[-1])):
+                    count -= 1
+                saved = self.saved_counts.get(name, 0)
+                with open(os.path.join(self.path, name), 'ab') as f:
+                    f.truncate(saved * items.itemsize)
+                    items[saved:count].tofile(f)
+                counts[name] = count
+
+            tmp_meta = os.path.join(self.path, 'meta.json.tmp')
+            with open(tmp_meta, 'w') as f:
+                json.dump({
+                    'log_file': self.log_file,
+                    'inode': self.inode,
+                    'head': self.head,
+                    'resume_from': self.resume_from,
+                    'level_names': self.level_names,
+                    'counts': counts
+                }, f)
+            os.rename(tmp_meta, os.path.join(self.path, 'meta.json'))
+            self.saved_counts = counts
+        except (IOError, OSError) as exc:
+            logger.warning(u"Unable to save log index %s: %s",
+                           self.path, exc)
+
+
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def get_log_index(log_file, log_config):
+    """Returns up to date index of log file.
+
+    Recently used indexes are cached in memory.
+    """
+    key = LogIndex.signature(log_file, log_config)
+    with _indexes_lock:
+        index = _indexes.pop(key, None)
+        if index is None:
+            index = LogIndex(
+                log_file, log_config, settings.LOG_INDEX.get('dir'))
+        _indexes[key] = index
+        while len(_indexes) > settings.LOG_INDEX['cache_size']:
+            _indexes.popitem(last=False)
+    index.update()
+    return index
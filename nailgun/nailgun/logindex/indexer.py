@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+
+#    Copyright 2013 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from itertools import repeat
+import os
+import threading
+import time
+import traceback
+
+from nailgun.logger import logger
+from nailgun.logindex.index import get_log_index
+from nailgun.settings import settings
+
+
+class LogIndexerThread(threading.Thread):
+    """Keeps indexes of log files up to date, so log
+    entries handler has to index only lines added
+    since last pass of indexer.
+    """
+
+    def __init__(self, interval=None):
+        super(LogIndexerThread, self).__init__()
+        self.stop_indexing = threading.Event()
+        self.interval = interval or settings.LOG_INDEX['interval']
+
+    def join(self, timeout=None):
+        self.stop_indexing.set()
+        super(LogIndexerThread, self).join(timeout)
+
+    def sleep(self, interval=None):
+        map(
+            lambda i: not self.stop_indexing.isSet() and time.sleep(i),
+            repeat(1, interval or self.interval)
+        )
+
+    def run(self):
+        while not self.stop_indexing.isSet():
+            try:
+                self.update_indexes()
+            except Exception:
+                logger.error(traceback.format_exc())
+            self.sleep()
+
+    @classmethod
+    def log_files(cls):
+        """Yields (log file, log config) for every log file
+        which can be shown in UI
+        """
+        for log_config in settings.LOGS:
+            if log_config.get('fake') and not settings.FAKE_TASKS:
+                continue
+            if log_config.get('remote') and not log_config.get('fake'):
+                if not os.path.isdir(log_config['base']):
+                    continue
+                for node_dir in os.listdir(log_config['base']):
+                    yield os.path.join(
+                        log_config['base'], node_dir, log_config['path']
+                    ), log_config
+            else:
+                yield log_config['path'], log_config
+
+    def update_indexes(self):
+        for log_file, log_config in self.log_files():
+            if self.stop_indexing.isSet():
+                break
+            if not os.path.isfile(log_file):
+                continue
+            try:
+                get_log_index(log_file, log_config)
+            except Exception as exc:
+                logger.warning(u"Unable to index log file %s: %s",
+                               log_file, exc)
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+
+#    Copyright 2013 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from nailgun.db.sqlalchemy.revisions import TableRevisions
+
+
+class NetworkDataCache(object):
+    """Cache of rendered network data of nodes.
+
+    Cached data is valid while revisions of tables with IP addresses,
+    interfaces and network groups aren't changed.
+    """
+
+    tables = ('ip_addrs', 'net_assignments', 'network_groups',
+              'node_nic_interfaces')
+
+    cache = {}
+
+    @classmethod
+    def key(cls, node):
+        """Returns key of node network data. Key should be taken
+        before loading data from database, so data changed
+        after it isn't cached as valid.
+        """
+        return (
+            TableRevisions.get(*cls.tables),
+            node.cluster_id,
+            node.cluster and node.cluster.net_manager
+        )
+
+    @classmethod
+    def get(cls, node_id, key):
+        cached = cls.cache.get(node_id)
+        if cached and cached[0] == key:
+            return cached[1]
+        return None
+
+    @classmethod
+    def set(cls, node_id, key, network_data):
+        cls.cache[node_id] = (key, network_data)
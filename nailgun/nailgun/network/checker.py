@@ -15,20 +15,84 @@
 #    under the License.
 
 
+from collections import defaultdict
+import heapq
 from itertools import combinations
-from itertools import product
 
 import netaddr
+from sqlalchemy.orm import defer
+from sqlalchemy.orm import joinedload
 
 from nailgun.api.serializers.network_configuration \
     import NetworkConfigurationSerializer
+from nailgun.db import db
 from nailgun.db.sqlalchemy.models import NetworkGroup
+from nailgun.db.sqlalchemy.models import Node
 from nailgun.errors import errors
 from nailgun.logger import logger
 from nailgun.network.manager import NetworkManager
 from nailgun.task.helpers import TaskHelper
 
 
+def ip_ranges_intervals(ip_ranges):
+    """Converts IP ranges given by first and last addresses
+    to intervals of integers
+    """
+    return [
+        (ip_range.first, ip_range.last) for ip_range in
+        (netaddr.IPRange(first, last) for first, last in ip_ranges)
+    ]
+
+
+def cidr_interval(cidr):
+    cidr = netaddr.IPNetwork(cidr).cidr
+    return cidr.first, cidr.last
+
+
+def intersecting_pairs(intervals):
+    """Finds intersecting intervals by sweep over intervals sorted
+    by their start, so only overlapping intervals are compared.
+
+    :param intervals: list of (first, last) pairs of integers
+    :returns: sorted list of pairs (i, j), i < j, of indexes
+        of intersecting intervals
+    """
+    pairs = []
+    # heap of (last, index) of intervals which are started
+    started = []
+    for i in sorted(xrange(len(intervals)), key=lambda i: intervals[i]):
+        first, last = intervals[i]
+        while started and started[0][0] < first:
+            heapq.heappop(started)
+        pairs.extend((min(i, j), max(i, j)) for _, j in started)
+        heapq.heappush(started, (last, i))
+    return sorted(pairs)
+
+
+def ranges_pairs_to_check(intervals, address=None):
+    """Returns pairs of intervals, which intersect or one of which
+    contains given address, in order of itertools.combinations.
+
+    :returns: list of (i, j, is_intersection, has_address)
+    """
+    intersections = set(intersecting_pairs(intervals))
+    with_address = set(
+        i for i, (first, last) in enumerate(intervals)
+        if address is not None and first <= address <= last)
+
+    pairs = set(intersections)
+    for i in with_address:
+        pairs.update(
+            (min(i, j), max(i, j))
+            for j in xrange(len(intervals)) if i != j)
+
+    return [
+        (i, j, (i, j) in intersections,
+         i in with_address or j in with_address)
+        for i, j in sorted(pairs)
+    ]
+
+
 class NetworkCheck(object):
 
     def __init__(self, task, data):
@@ -64,6 +128,26 @@ class NetworkCheck(object):
 
         self.result = []
         self.err_msgs = []
+        self._nodes = None
+
+    @property
+    def nodes(self):
+        """Nodes of cluster with their interfaces and networks
+        assigned to them, they are loaded once for all checks
+        """
+        if self._nodes is None:
+            self._nodes = db().query(Node).filter_by(
+                cluster_id=self.cluster.id
+            ).options(
+                joinedload('interfaces'),
+                joinedload('interfaces.assigned_networks_list'),
+                defer('meta')
+            ).order_by(Node.id).all()
+        return self._nodes
+
+    @property
+    def interfaces(self):
+        return [iface for node in self.nodes for iface in node.interfaces]
 
     def expose_error_messages(self):
         TaskHelper.expose_network_check_error_messages(
@@ -83,17 +167,12 @@ class NetworkCheck(object):
             logger.info(
                 "Untagged networks found, "
                 "checking intersection between them...")
-            interfaces = []
-            for node in self.cluster.nodes:
-                for iface in node.interfaces:
-                    interfaces.append(iface)
+            # network name is changed for Admin on UI
+            names = dict((ng['id'], ng['name']) for ng in self.networks)
             found_intersection = []
 
-            for iface in interfaces:
-                # network name is changed for Admin on UI
-                nets = [[ng['name'] for ng in self.networks
-                         if n.id == ng['id']][0]
-                        for n in iface.assigned_networks_list]
+            for iface in self.interfaces:
+                nets = [names[n.id] for n in iface.assigned_networks_list]
                 crossed_nets = set(nets) & untagged_nets
                 if len(crossed_nets) > 1 and crossed_nets != pub_flt:
                     err_net_names = ['"{0}"'.format(i)
@@ -120,7 +199,7 @@ class NetworkCheck(object):
         """check public and floating are on the same interface (nova-net)
         """
         err_nodes = []
-        for node in self.cluster.nodes:
+        for node in self.nodes:
             pr_fl_nic = []
             for nic in node.interfaces:
                 pr_fl_nic += [nic.id for n in nic.assigned_networks_list
@@ -141,30 +220,48 @@ class NetworkCheck(object):
         """check intersection of networks address spaces for all networks
         (nova-net)
         """
-        def addr_space(ng, ng_pair):
-            if ng['name'] == 'floating':
-                return [netaddr.IPRange(v[0], v[1])
-                        for v in ng['ip_ranges']]
-            elif ng['name'] == 'public':
-                if ng_pair['name'] == 'floating':
-                    return [netaddr.IPRange(v[0], v[1])
-                            for v in ng['ip_ranges']]
-            return [netaddr.IPNetwork(ng['cidr']).cidr]
-
-        for ngs in combinations(self.networks, 2):
-            for addrs in product(addr_space(ngs[0], ngs[1]),
-                                 addr_space(ngs[1], ngs[0])):
-                if self.net_man.is_range_intersection(addrs[0], addrs[1]):
-                    self.err_msgs.append(
-                        u"Address space intersection between "
-                        "networks:\n{0}.".format(
-                            ", ".join([ngs[0]['name'], ngs[1]['name']])
-                        )
+        # address space of network is a list of intervals, public
+        # network is compared with floating network by IP ranges
+        # and with the rest of networks by CIDR
+        spaces = []
+        for i, ng in enumerate(self.networks):
+            if ng['name'] in ('floating', 'public'):
+                spaces.extend(
+                    (interval, i, 'ip_ranges') for interval
+                    in ip_ranges_intervals(ng['ip_ranges']))
+            if ng['name'] != 'floating':
+                spaces.append((cidr_interval(ng['cidr']), i, 'cidr'))
+
+        def is_compared(space, ng_pair):
+            if self.networks[space[1]]['name'] != 'public':
+                return True
+            return (space[2] == 'ip_ranges') == \
+                (ng_pair['name'] == 'floating')
+
+        intersections = defaultdict(int)
+        for i, j in intersecting_pairs([space[0] for space in spaces]):
+            space1, space2 = sorted([spaces[i], spaces[j]],
+                                    key=lambda space: space[1])
+            ng1, ng2 = self.networks[space1[1]], self.networks[space2[1]]
+            if ng1 is not ng2 and is_compared(space1, ng2) and \
+                    is_compared(space2, ng1):
+                intersections[(space1[1], space2[1])] += 1
+
+        # errors are reported in order of pairs of networks
+        # for every pair of intersecting address spaces
+        for i, j in sorted(intersections):
+            ngs = self.networks[i], self.networks[j]
+            for _ in xrange(intersections[(i, j)]):
+                self.err_msgs.append(
+                    u"Address space intersection between "
+                    "networks:\n{0}.".format(
+                        ", ".join([ngs[0]['name'], ngs[1]['name']])
                     )
-                    self.result.append({
-                        "ids": [int(ngs[0]["id"]), int(ngs[1]["id"])],
-                        "errors": ["cidr", "ip_ranges"]
-                    })
+                )
+                self.result.append({
+                    "ids": [int(ngs[0]["id"]), int(ngs[1]["id"])],
+                    "errors": ["cidr", "ip_ranges"]
+                })
         self.expose_error_messages()
 
     def check_public_floating_ranges_intersection(self):
@@ -190,17 +287,17 @@ class NetworkCheck(object):
         pub_ranges_err = False
         for ng in self.networks:
             if ng['name'] in ['public', 'floating']:
-                nets = [netaddr.IPRange(v[0], v[1])
-                        for v in ng['ip_ranges']]
-                for npair in combinations(nets, 2):
-                    if self.net_man.is_range_intersection(npair[0], npair[1]):
+                nets = ip_ranges_intervals(ng['ip_ranges'])
+                for _, _, is_intersection, has_gw in \
+                        ranges_pairs_to_check(nets, int(pub_gw)):
+                    if is_intersection:
                         self.err_msgs.append(
                             u"Address space intersection between ranges "
                             "of {0} network.".format(ng['name'])
                         )
                         self.result.append({"ids": [int(ng["id"])],
                                             "errors": ["ip_ranges"]})
-                    if pub_gw in npair[0] or pub_gw in npair[1]:
+                    if has_gw:
                         self.err_msgs.append(
                             u"Address intersection between "
                             u"public gateway and IP range "
@@ -211,8 +308,10 @@ class NetworkCheck(object):
                                                        "ip_ranges"]})
                 # Check that Public IP ranges are in Public CIDR
                 if ng['name'] == 'public':
-                    for net in nets:
-                        if net not in pub_cidr and not pub_ranges_err:
+                    for first, last in nets:
+                        if not (pub_cidr.first <= first and
+                                last <= pub_cidr.last) and \
+                                not pub_ranges_err:
                             pub_ranges_err = True
                             self.err_msgs.append(
                                 u"Public gateway and public ranges "
@@ -389,21 +488,21 @@ class NetworkCheck(object):
 
         # check intersection of address ranges
         # between all networks
-        for ngs in combinations(self.networks, 2):
-            if ngs[0].get('cidr') and ngs[1].get('cidr'):
-                cidr1 = netaddr.IPNetwork(ngs[0]['cidr'])
-                cidr2 = netaddr.IPNetwork(ngs[1]['cidr'])
-                if self.net_man.is_cidr_intersection(cidr1, cidr2):
-                    self.err_msgs.append(
-                        u"Address space intersection "
-                        u"between networks:\n{0}".format(
-                            ", ".join([ngs[0]['name'], ngs[1]['name']])
-                        )
-                    )
-                    self.result.append({
-                        "ids": [int(ngs[0]["id"]), int(ngs[1]["id"])],
-                        "errors": ["cidr"]
-                    })
+        # (CIDRs intersect only if one of them contains another)
+        with_cidr = [ng for ng in self.networks if ng.get('cidr')]
+        for i, j in intersecting_pairs(
+                [cidr_interval(ng['cidr']) for ng in with_cidr]):
+            ngs = with_cidr[i], with_cidr[j]
+            self.err_msgs.append(
+                u"Address space intersection "
+                u"between networks:\n{0}".format(
+                    ", ".join([ngs[0]['name'], ngs[1]['name']])
+                )
+            )
+            self.result.append({
+                "ids": [int(ngs[0]["id"]), int(ngs[1]["id"])],
+                "errors": ["cidr"]
+            })
         self.expose_error_messages()
 
         # check Floating Start and Stop IPs belong to Public CIDR
@@ -428,12 +527,13 @@ class NetworkCheck(object):
 
         # Check intersection of networks address spaces inside
         # Public network
-        ranges = [netaddr.IPRange(v[0], v[1])
-                  for v in public['ip_ranges']] + [fl_ip_range]
+        fl_interval = fl_ip_range.first, fl_ip_range.last
+        ranges = ip_ranges_intervals(public['ip_ranges']) + [fl_interval]
         public_gw = netaddr.IPAddress(public['gateway'])
-        for npair in combinations(ranges, 2):
-            if self.net_man.is_range_intersection(npair[0], npair[1]):
-                if fl_ip_range in npair:
+        for i, j, is_intersection, has_gw in \
+                ranges_pairs_to_check(ranges, int(public_gw)):
+            if is_intersection:
+                if fl_interval in (ranges[i], ranges[j]):
                     self.err_msgs.append(
                         u"Address space intersection between ranges "
                         u"of public and external network."
@@ -445,7 +545,7 @@ class NetworkCheck(object):
                     )
                 self.result.append({"ids": [int(public["id"])],
                                     "errors": ["ip_ranges"]})
-            if public_gw in npair[0] or public_gw in npair[1]:
+            if has_gw:
                 self.err_msgs.append(
                     u"Address intersection between public gateway "
                     u"and IP range of public network."
@@ -455,8 +555,9 @@ class NetworkCheck(object):
         self.expose_error_messages()
 
         # Check that Public IP ranges are in Public CIDR
-        for net in ranges:
-            if net not in public_cidr:
+        for first, last in ranges:
+            if not (public_cidr.first <= first and
+                    last <= public_cidr.last):
                 self.err_msgs.append(
                     u"Public gateway and public ranges "
                     u"are not in one CIDR."
@@ -534,13 +635,11 @@ class NetworkCheck(object):
         # check if there any networks
         # on the same interface as private network (for vlan)
         if self.cluster.net_segment_type == 'vlan':
-            private_interfaces = []
-            # there should be shorter method to do this !
-            for node in self.cluster.nodes:
-                for iface in node.interfaces:
-                    for anet in iface.assigned_networks_list:
-                        if anet.name == 'private':
-                            private_interfaces.append(iface)
+            private_interfaces = [
+                iface for iface in self.interfaces
+                if any(anet.name == 'private'
+                       for anet in iface.assigned_networks_list)
+            ]
             found_intersection = []
 
             all_roles = set(n["id"] for n in self.networks
@@ -578,13 +677,9 @@ class NetworkCheck(object):
             logger.info(
                 "Untagged networks found, "
                 "checking intersection between them...")
-            interfaces = []
-            for node in self.cluster.nodes:
-                for iface in node.interfaces:
-                    interfaces.append(iface)
             found_intersection = []
 
-            for iface in interfaces:
+            for iface in self.interfaces:
                 nets = dict(
                     (n.id, n.name)
                     for n in iface.assigned_networks_list)
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+
+#    Copyright 2013 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from bisect import bisect_left
+from bisect import bisect_right
+
+from netaddr import IPAddress
+
+from nailgun.db import db
+from nailgun.db.sqlalchemy.models import IPAddr
+from nailgun.errors import errors
+
+
+class IPPool(object):
+    """In-memory index of IP addresses of Network Group.
+
+    Ranges of Network Group are kept as sorted list of integer
+    intervals and used addresses as sorted list of integers,
+    so free addresses are taken by walking gaps between used
+    addresses instead of checking every address in database.
+
+    Addresses are taken in ascending order, so every call of take()
+    continues walking from the address after the last taken one and
+    all calls together walk used addresses once.
+    """
+
+    def __init__(self, network_group, used_ips=None):
+        """:param network_group: NetworkGroup object.
+        :param used_ips: iterable of already used IP addresses,
+                         loaded from database with one query if None.
+        """
+        self.ranges = self._merge_ranges(
+            (int(IPAddress(r.first)), int(IPAddress(r.last)))
+            for r in network_group.ip_ranges
+        )
+        if used_ips is None:
+            used_ips = (ip for (ip,) in db().query(IPAddr.ip_addr))
+        used = set(
+            int(IPAddress(ip)) for ip in used_ips if ip
+        )
+        if network_group.gateway:
+            used.add(int(IPAddress(network_group.gateway)))
+        self.used = sorted(ip for ip in used if self._in_ranges(ip))
+        # addresses lower than this are used or taken
+        self.next_ip = self.ranges[0][0] if self.ranges else 0
+
+    @classmethod
+    def _merge_ranges(cls, ranges):
+        """Returns sorted list of disjoint intervals
+        """
+        merged = []
+        for first, last in sorted(ranges):
+            if merged and first <= merged[-1][1] + 1:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], last))
+            else:
+                merged.append((first, last))
+        return merged
+
+    def _in_ranges(self, ip):
+        i = bisect_right(self.ranges, (ip, ip)) - 1
+        # range which starts exactly at ip goes after (ip, ip)
+        for first, last in self.ranges[max(i, 0):i + 2]:
+            if first <= ip <= last:
+                return True
+        return False
+
+    def __contains__(self, ip_addr):
+        """Checks if IP address belongs to ranges of Network Group
+        """
+        return self._in_ranges(int(IPAddress(ip_addr)))
+
+    def take(self, num=1):
+        """Returns list of num free IP addresses and marks
+        them as used in the pool.
+
+        :raises: errors.OutOfIPs
+        """
+        free_ips = []
+        for first, last in self.ranges:
+            if last < self.next_ip:
+                continue
+            ip = max(first, self.next_ip)
+            i = bisect_left(self.used, ip)
+            while ip <= last and len(free_ips) < num:
+                if i < len(self.used) and self.used[i] == ip:
+                    ip += 1
+                    i += 1
+                    continue
+                gap_end = last
+                if i < len(self.used):
+                    gap_end = min(last, self.used[i] - 1)
+                count = min(gap_end - ip + 1, num - len(free_ips))
+                free_ips.extend(xrange(ip, ip + count))
+                ip += count
+            if len(free_ips) == num:
+                break
+
+        if len(free_ips) < num:
+            raise errors.OutOfIPs()
+
+        # taken addresses are lower than next one,
+        # so they aren't added to used addresses
+        if free_ips:
+            self.next_ip = free_ips[-1] + 1
+        return [str(IPAddress(free_ip)) for free_ip in free_ips]
@@ -17,9 +17,8 @@
 from collections import defaultdict
 from itertools import chain
 from itertools import groupby
-from itertools import ifilter
-from itertools import imap
 from itertools import islice
+import traceback
 
 from netaddr import AddrFormatError
 from netaddr import IPAddress
@@ -27,9 +26,11 @@ from netaddr import IPNetwork
 from netaddr import IPRange
 
 from sqlalchemy.orm import joinedload
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlalchemy.sql import not_
 
 from nailgun.db import db
+from nailgun.db.sqlalchemy.models import AllowedNetworks
 from nailgun.db.sqlalchemy.models import Cluster
 from nailgun.db.sqlalchemy.models import IPAddr
 from nailgun.db.sqlalchemy.models import IPAddrRange
@@ -39,10 +40,15 @@ from nailgun.db.sqlalchemy.models import Node
 from nailgun.db.sqlalchemy.models import NodeNICInterface
 from nailgun.errors import errors
 from nailgun.logger import logger
+from nailgun.network.cache import NetworkDataCache
+from nailgun.network.ip_pool import IPPool
 
 
 class NetworkManager(object):
 
+    # {(name, cidr, netmask): params}, see get_network_params
+    _network_params = {}
+
     @classmethod
     def update_range_mask_from_cidr(cls, network_group, cidr):
         """Update network ranges for cidr
@@ -113,32 +119,63 @@ class NetworkManager(object):
         :type  num: int
         :returns: None
         """
-        admin_net_id = cls.get_admin_network_group_id()
-        node_admin_ips = db().query(IPAddr).filter_by(
-            node=node_id,
-            network=admin_net_id
-        ).all()
+        cls.assign_admin_ips_to_nodes({node_id: num})
+
+    @classmethod
+    def assign_admin_ips_to_nodes(cls, nodes_nums):
+        """Method for assigning admin IP addresses to bunch of nodes.
+        Used and free IPs are calculated once for all nodes and new
+        IPs are saved with one bulk insert.
+
+        :param nodes_nums: Mapping {node ID: number of IPs for node}.
+        :type  nodes_nums: dict
+        :returns: None
+        """
+        if not nodes_nums:
+            return
+
+        admin_net = cls.get_admin_network_group()
+        assigned = defaultdict(int)
+        for (node_id,) in db().query(IPAddr.node).filter(
+            IPAddr.network == admin_net.id
+        ).filter(
+            IPAddr.node.in_(nodes_nums.keys())
+        ):
+            assigned[node_id] += 1
+
+        lacking = sorted(
+            (node_id, num - assigned[node_id])
+            for node_id, num in nodes_nums.iteritems()
+            if assigned[node_id] < num
+        )
+        if not lacking:
+            return
 
-        if not node_admin_ips or len(node_admin_ips) < num:
-            admin_net = db().query(NetworkGroup).get(admin_net_id)
+        pool = IPPool(admin_net)
+        new_ips = []
+        for node_id, count in lacking:
             logger.debug(
                 u"Trying to assign admin ips: node=%s count=%s",
                 node_id,
-                num - len(node_admin_ips)
+                count
             )
-            free_ips = cls.get_free_ips(
-                admin_net.id,
-                num=num - len(node_admin_ips)
+            new_ips.extend(
+                {'node': node_id, 'ip_addr': ip, 'network': admin_net.id}
+                for ip in pool.take(count)
             )
-            logger.info(len(free_ips))
-            for ip in free_ips:
-                ip_db = IPAddr(
-                    node=node_id,
-                    ip_addr=ip,
-                    network=admin_net_id
-                )
-                db().add(ip_db)
-            db().commit()
+        cls._bulk_insert_ips(new_ips)
+
+    @classmethod
+    def _bulk_insert_ips(cls, ips):
+        """Saves IP addresses with one INSERT statement.
+
+        :param ips: List of dicts with IPAddr columns.
+        :type  ips: list
+        :returns: None
+        """
+        if ips:
+            db().execute(IPAddr.__table__.insert(), ips)
+        db().commit()
 
     @classmethod
     def assign_ips(cls, nodes_ids, network_name):
@@ -157,13 +194,13 @@ class NetworkManager(object):
         :returns: None
         :raises: Exception, errors.AssignIPError
         """
-        cluster_id = db().query(Node).get(nodes_ids[0]).cluster_id
-        for node_id in nodes_ids:
-            node = db().query(Node).get(node_id)
+        nodes = db().query(Node).filter(Node.id.in_(nodes_ids)).all()
+        cluster_id = [n for n in nodes if n.id == nodes_ids[0]][0].cluster_id
+        for node in nodes:
             if node.cluster_id != cluster_id:
                 raise Exception(
                     u"Node id='{0}' doesn't belong to cluster_id='{1}'".format(
-                        node_id,
+                        node.id,
                         cluster_id
                     )
                 )
@@ -178,31 +215,28 @@ class NetworkManager(object):
                 (network_name, cluster_id)
             )
 
+        pool = IPPool(network)
+        # nodes which already have an IP address inside network ranges
+        nodes_with_ip = set(
+            node_id for (node_id, ip_addr) in db().query(
+                IPAddr.node, IPAddr.ip_addr
+            ).filter(
+                IPAddr.network == network.id
+            ).filter(
+                IPAddr.node.in_(nodes_ids)
+            ) if ip_addr in pool
+        )
+
+        new_ips = []
         for node_id in nodes_ids:
-            node_ips = imap(
-                lambda i: i.ip_addr,
-                cls._get_ips_except_admin(
-                    node_id=node_id,
-                    network_id=network.id
-                )
-            )
-            # check if any of node_ips in required ranges
-
-            ip_already_assigned = False
-
-            for ip in node_ips:
-                if cls.check_ip_belongs_to_net(ip, network):
-                    logger.info(
-                        u"Node id='{0}' already has an IP address "
-                        "inside '{1}' network.".format(
-                            node_id,
-                            network.name
-                        )
+            if node_id in nodes_with_ip:
+                logger.info(
+                    u"Node id='{0}' already has an IP address "
+                    "inside '{1}' network.".format(
+                        node_id,
+                        network.name
                     )
-                    ip_already_assigned = True
-                    break
-
-            if ip_already_assigned:
+                )
                 continue
 
             # IP address has not been assigned, let's do it
@@ -212,14 +246,13 @@ class NetworkManager(object):
                     network_name
                 )
             )
-            free_ip = cls.get_free_ips(network.id)[0]
-            ip_db = IPAddr(
-                network=network.id,
-                node=node_id,
-                ip_addr=free_ip
-            )
-            db().add(ip_db)
-            db().commit()
+            new_ips.append({
+                'network': network.id,
+                'node': node_id,
+                'ip_addr': pool.take()[0]
+            })
+            nodes_with_ip.add(node_id)
+        cls._bulk_insert_ips(new_ips)
 
     @classmethod
     def assign_vip(cls, cluster_id, network_name):
@@ -260,9 +293,10 @@ class NetworkManager(object):
             not_(IPAddr.network == admin_net_id)
         ).all()]
         # check if any of used_ips in required cidr: network.cidr
+        pool = IPPool(network)
         ips_belongs_to_net = False
         for ip in cluster_ips:
-            if cls.check_ip_belongs_to_net(ip, network):
+            if ip in pool:
                 ips_belongs_to_net = True
                 break
 
@@ -270,7 +304,7 @@ class NetworkManager(object):
             vip = cluster_ips[0]
         else:
             # IP address has not been assigned, let's do it
-            vip = cls.get_free_ips(network.id)[0]
+            vip = pool.take()[0]
             ne_db = IPAddr(network=network.id, ip_addr=vip)
             db().add(ne_db)
             db().commit()
@@ -310,44 +344,23 @@ class NetworkManager(object):
                 return True
         return False
 
-    @classmethod
-    def _iter_free_ips(cls, network_group):
-        """Represents iterator over free IP addresses
-        in all ranges for given Network Group
-        """
-        for ip_addr in ifilter(
-            lambda ip: db().query(IPAddr).filter_by(
-                ip_addr=str(ip)
-            ).first() is None and not str(ip) == network_group.gateway,
-            chain(*[
-                IPRange(ir.first, ir.last)
-                for ir in network_group.ip_ranges
-            ])
-        ):
-            yield ip_addr
-
     @classmethod
     def get_free_ips(cls, network_group_id, num=1):
         """Returns list of free IP addresses for given Network Group
         """
         ng = db().query(NetworkGroup).get(network_group_id)
-        free_ips = []
-        for ip in cls._iter_free_ips(ng):
-            free_ips.append(str(ip))
-            if len(free_ips) == num:
-                break
-        if len(free_ips) < num:
-            raise errors.OutOfIPs()
-        return free_ips
+        return IPPool(ng).take(num)
 
     @classmethod
-    def _get_ips_except_admin(cls, node_id=None,
-                              network_id=None, joined=False):
+    def _get_ips_except_admin(cls, node_id=None, network_id=None,
+                              joined=False, node_ids=None):
         """Method for receiving IP addresses for node or network
         excluding Admin Network IP address.
 
         :param node_id: Node database ID.
         :type  node_id: int
+        :param node_ids: List of Node database IDs.
+        :type  node_ids: list
         :param network_id: Network database ID.
         :type  network_id: int
         :returns: List of free IP addresses as SQLAlchemy objects.
@@ -357,6 +370,8 @@ class NetworkManager(object):
             ips = ips.options(joinedload('network_data'))
         if node_id:
             ips = ips.filter_by(node=node_id)
+        if node_ids is not None:
+            ips = ips.filter(IPAddr.node.in_(node_ids or [None]))
         if network_id:
             ips = ips.filter_by(network=network_id)
         try:
@@ -386,12 +401,20 @@ class NetworkManager(object):
         db().commit()
 
     @classmethod
-    def get_default_networks_assignment(cls, node):
+    def get_default_networks_assignment(cls, node, admin_ng=None,
+                                        cluster_ngs=None):
         """Return default Networks-to-NICs assignment for given node based on
         networks metadata and get_allowed_nic_networkgroups() results
+
+        :param admin_ng: admin NetworkGroup, it's loaded if not given
+        :param cluster_ngs: network groups of cluster of node ordered
+                            by id, they are loaded if not given
         """
         nics = []
-        ngs = node.cluster.network_groups + [cls.get_admin_network_group()]
+        admin_ng = admin_ng or cls.get_admin_network_group()
+        if cluster_ngs is None:
+            cluster_ngs = node.cluster.network_groups
+        ngs = cluster_ngs + [admin_ng]
         ngs_by_id = dict((ng.id, ng) for ng in ngs)
         # sort Network Groups ids by map_priority (0 for admin having no meta)
         to_assign_ids = list(zip(*sorted(
@@ -407,7 +430,9 @@ class NetworkManager(object):
             }
             allowed_ngs = cls.get_allowed_nic_networkgroups(
                 node,
-                nic
+                nic,
+                admin_ng,
+                cluster_ngs
             )
             nic_dict['allowed_networks'] = [{'id': ng.id, 'name': ng.name}
                                             for ng in allowed_ngs]
@@ -474,6 +499,57 @@ class NetworkManager(object):
                         NetworkGroup.id.in_(ng_ids)))
         db().commit()
 
+    @classmethod
+    def clear_networks_of_nodes(cls, nodes):
+        """Removes assigned and allowed networks of interfaces of nodes
+        with two statements. Doesn't commit.
+        """
+        interfaces = list(chain.from_iterable(
+            node.interfaces for node in nodes))
+        if not interfaces:
+            return
+        interfaces_ids = [nic.id for nic in interfaces]
+        for model in (NetworkAssignment, AllowedNetworks):
+            db().query(model).filter(
+                model.interface_id.in_(interfaces_ids)
+            ).delete(synchronize_session=False)
+        for nic in interfaces:
+            set_committed_value(nic, 'assigned_networks_list', [])
+            set_committed_value(nic, 'allowed_networks_list', [])
+
+    @classmethod
+    def assign_networks_to_nodes(cls, cluster, nodes):
+        """Assigns networks by default and allows all networks of
+        cluster on interfaces of nodes like assign_networks_by_default
+        and allow_network_assignment_to_all_interfaces do. Network
+        groups are loaded once and all assignments are inserted with
+        two statements. Nodes shouldn't have assigned and allowed
+        networks. Doesn't commit.
+        """
+        admin_ng = cls.get_admin_network_group()
+        cluster_ngs = db().query(NetworkGroup).filter_by(
+            cluster_id=cluster.id
+        ).order_by(NetworkGroup.id).all()
+
+        assigned = []
+        allowed = []
+        for node in nodes:
+            for nic in cls.get_default_networks_assignment(
+                    node, admin_ng, cluster_ngs):
+                assigned.extend(
+                    {'interface_id': nic['id'], 'network_id': ng['id']}
+                    for ng in nic.get('assigned_networks', []))
+            for nic in node.interfaces:
+                allowed.extend(
+                    {'interface_id': nic.id, 'network_id': ng.id}
+                    for ng in cls.get_allowed_nic_networkgroups(
+                        node, nic, admin_ng, cluster_ngs))
+
+        if assigned:
+            db().execute(NetworkAssignment.__table__.insert(), assigned)
+        if allowed:
+            db().execute(AllowedNetworks.__table__.insert(), allowed)
+
     @classmethod
     def get_cluster_networkgroups_by_node(cls, node):
         """Method for receiving cluster network groups by node.
@@ -505,25 +581,14 @@ class NetworkManager(object):
             net = db().query(NetworkGroup).get(ip.network)
             interface = cls._get_interface_by_network_name(
                 node_db.id, net.name)
-
-            if net.name == 'public':
-                # Get prefix from netmask instead of cidr
-                # for public network
-
-                # Convert netmask to prefix
-                prefix = str(IPNetwork(
-                    '0.0.0.0/' + net.netmask).prefixlen)
-                netmask = net.netmask
-            else:
-                prefix = str(IPNetwork(net.cidr).prefixlen)
-                netmask = str(IPNetwork(net.cidr).netmask)
+            params = cls.get_network_params(net)
 
             network_data.append({
                 'name': net.name,
                 'vlan': net.vlan_start,
-                'ip': ip.ip_addr + '/' + prefix,
-                'netmask': netmask,
-                'brd': str(IPNetwork(net.cidr).broadcast),
+                'ip': ip.ip_addr + '/' + params['prefix'],
+                'netmask': params['netmask'],
+                'brd': params['brd'],
                 'gateway': net.gateway,
                 'dev': interface.name})
             network_ids.append(net.id)
@@ -547,69 +612,97 @@ class NetworkManager(object):
         return response
 
     @classmethod
-    def get_grouped_ips_by_node(cls):
+    def get_grouped_ips_by_node(cls, node_ids=None):
         """returns {node.id: generator([IPAddr1, IPAddr2])}
+
+        :param node_ids: load IPs of these nodes only if specified
         """
-        ips_db = cls._get_ips_except_admin(joined=True)
+        ips_db = cls._get_ips_except_admin(joined=True, node_ids=node_ids)
         return cls.group_by_key_and_history(ips_db, lambda ip: ip.node)
 
     @classmethod
-    def get_networks_grouped_by_cluster(cls):
-        networks = db().query(NetworkGroup).order_by(NetworkGroup.id).all()
+    def get_networks_grouped_by_cluster(cls, cluster_ids=None):
+        """:param cluster_ids: load networks of these clusters
+        only if specified
+        """
+        networks = db().query(NetworkGroup).order_by(NetworkGroup.id)
+        if cluster_ids is not None:
+            networks = networks.filter(
+                NetworkGroup.cluster_id.in_(cluster_ids or [None]))
         return cls.group_by_key_and_history(
-            networks,
+            networks.all(),
             lambda net: net.cluster_id)
 
     @classmethod
-    def get_node_networks_optimized(cls, node_db, ips_db, networks):
+    def get_network_params(cls, net):
+        """Returns prefix, netmask and broadcast address of network.
+        Result is memoized, because netaddr parsing is rather slow
+        and network data is rendered for every node very often.
+        """
+        key = (net.name, net.cidr, net.netmask)
+        if key not in cls._network_params:
+            cidr = IPNetwork(net.cidr)
+            if net.name == 'public':
+                # Get prefix from netmask instead of cidr
+                # for public network
+                params = {
+                    'prefix': str(IPNetwork(
+                        '0.0.0.0/' + net.netmask).prefixlen),
+                    'netmask': net.netmask
+                }
+            else:
+                params = {
+                    'prefix': str(cidr.prefixlen),
+                    'netmask': str(cidr.netmask)
+                }
+            params['brd'] = str(cidr.broadcast)
+            cls._network_params[key] = params
+        return cls._network_params[key]
+
+    @classmethod
+    def get_node_networks_optimized(cls, node_db, ips_db, networks,
+                                    admin_ng=None):
         """Method for receiving data for a given node with db data provided
         as input
         @nodes_db - List of Node instances
         @ips_db - generator([IPAddr1, IPAddr2])
+        @admin_ng - admin NetworkGroup, it's loaded if not given
         """
         cluster_db = node_db.cluster
         if cluster_db is None:
             # Node doesn't belong to any cluster, so it should not have nets
             return []
 
+        interfaces = cls._get_interfaces_by_network_name(node_db)
+
+        def get_interface(network_name):
+            if network_name not in interfaces:
+                raise errors.CanNotFindInterface(
+                    u'Cannot find interface by name "{0}" for node: '
+                    '{1}'.format(network_name, node_db.full_name))
+            return interfaces[network_name]
+
         network_data = []
-        network_ids = []
+        network_ids = set()
         for ip in ips_db:
             net = ip.network_data
-            interface = cls._get_interface_by_network_name(
-                node_db,
-                net.name
-            )
-
-            # Get prefix from netmask instead of cidr
-            # for public network
-            if net.name == 'public':
-
-                # Convert netmask to prefix
-                prefix = str(IPNetwork(
-                    '0.0.0.0/' + net.netmask).prefixlen)
-                netmask = net.netmask
-            else:
-                prefix = str(IPNetwork(net.cidr).prefixlen)
-                netmask = str(IPNetwork(net.cidr).netmask)
+            interface = get_interface(net.name)
+            params = cls.get_network_params(net)
 
             network_data.append({
                 'name': net.name,
                 'vlan': net.vlan_start,
-                'ip': ip.ip_addr + '/' + prefix,
-                'netmask': netmask,
-                'brd': str(IPNetwork(net.cidr).broadcast),
+                'ip': ip.ip_addr + '/' + params['prefix'],
+                'netmask': params['netmask'],
+                'brd': params['brd'],
                 'gateway': net.gateway,
                 'dev': interface.name})
-            network_ids.append(net.id)
+            network_ids.add(net.id)
 
         nets_wo_ips = [n for n in networks if n.id not in network_ids]
 
         for net in nets_wo_ips:
-            interface = cls._get_interface_by_network_name(
-                node_db,
-                net.name
-            )
+            interface = get_interface(net.name)
 
             if net.name == 'fixed' and cluster_db.net_manager == 'VlanManager':
                 continue
@@ -618,10 +711,54 @@ class NetworkManager(object):
                 'vlan': net.vlan_start,
                 'dev': interface.name})
 
-        network_data.append(cls._get_admin_network(node_db))
+        network_data.append(cls._get_admin_network(node_db, admin_ng))
 
         return network_data
 
+    @classmethod
+    def get_nodes_networks(cls, nodes):
+        """Returns network data for given nodes using cache,
+        network data of not cached nodes is loaded with two queries.
+
+        :param nodes: list of Node objects
+        :returns: {node.id: network data}
+        """
+        keys = dict(
+            (node.id, NetworkDataCache.key(node))
+            for node in nodes if node.cluster_id
+        )
+        result = {}
+        not_cached = []
+        for node in nodes:
+            if not node.cluster_id:
+                result[node.id] = []
+                continue
+            network_data = NetworkDataCache.get(node.id, keys[node.id])
+            if network_data is None:
+                not_cached.append(node)
+            else:
+                result[node.id] = network_data
+        if not not_cached:
+            return result
+
+        ips_mapped = cls.get_grouped_ips_by_node(
+            [node.id for node in not_cached])
+        networks_grouped = cls.get_networks_grouped_by_cluster(
+            set(node.cluster_id for node in not_cached))
+        admin_ng = cls.get_admin_network_group()
+        for node in not_cached:
+            try:
+                network_data = cls.get_node_networks_optimized(
+                    node, ips_mapped.get(node.id, []),
+                    networks_grouped.get(node.cluster_id, []),
+                    admin_ng)
+            except Exception:
+                logger.error(traceback.format_exc())
+                continue
+            NetworkDataCache.set(node.id, keys[node.id], network_data)
+            result[node.id] = network_data
+        return result
+
     @classmethod
     def _add_networks_wo_ips(cls, cluster_db, network_ids, node_db):
         add_net_data = []
@@ -725,8 +862,8 @@ class NetworkManager(object):
                 'includes to admin subnet "%s"' % node.full_name)
 
     @classmethod
-    def is_ip_belongs_to_admin_subnet(cls, ip_addr):
-        admin_cidr = cls.get_admin_network_group().cidr
+    def is_ip_belongs_to_admin_subnet(cls, ip_addr, admin_ng=None):
+        admin_cidr = (admin_ng or cls.get_admin_network_group()).cidr
         if ip_addr and IPAddress(ip_addr) in IPNetwork(admin_cidr):
             return True
         return False
@@ -787,15 +924,20 @@ class NetworkManager(object):
         return []
 
     @classmethod
-    def get_admin_ips_for_interfaces(cls, node):
+    def get_admin_ips_for_interfaces(cls, node, admin_ips=None):
         """Returns mapping admin {"inteface name" => "admin ip"}
+
+        :param admin_ips: admin IP addresses of node ordered by id,
+                          they are loaded if not given
         """
-        admin_net_id = cls.get_admin_network_group_id()
-        admin_ips = set([
-            i.ip_addr for i in db().query(IPAddr).
-            order_by(IPAddr.id).
-            filter_by(node=node.id).
-            filter_by(network=admin_net_id)])
+        if admin_ips is None:
+            admin_net_id = cls.get_admin_network_group_id()
+            admin_ips = [
+                i.ip_addr for i in db().query(IPAddr).
+                order_by(IPAddr.id).
+                filter_by(node=node.id).
+                filter_by(network=admin_net_id)]
+        admin_ips = set(admin_ips)
 
         interfaces_names = sorted(set([
             interface.name for interface in node.interfaces]))
@@ -803,13 +945,46 @@ class NetworkManager(object):
         return dict(zip(interfaces_names, admin_ips))
 
     @classmethod
-    def _get_admin_network(cls, node):
+    def _get_admin_network(cls, node, admin_ng=None):
         """Returns dict with admin network."""
         return {
             'name': 'admin',
-            'dev': node.admin_interface.name
+            'dev': cls.get_admin_interface(node, admin_ng).name
         }
 
+    @classmethod
+    def get_admin_interface(cls, node, admin_ng=None):
+        """Iterate over interfaces, if admin subnet include
+        ip address of current interface then return this interface.
+
+        :param admin_ng: admin NetworkGroup, it's loaded if not given
+        :raises: errors.CanNotFindInterface
+        """
+        admin_ng = admin_ng or cls.get_admin_network_group()
+        for interface in node.interfaces:
+            if admin_ng in interface.assigned_networks_list:
+                return interface
+
+        for interface in node.interfaces:
+            ip_addr = interface.ip_addr
+            if cls.is_ip_belongs_to_admin_subnet(ip_addr, admin_ng):
+                return interface
+
+        logger.warning(u'Cannot find admin interface for node '
+                       'return first interface: "%s"' %
+                       node.full_name)
+        return node.interfaces[0]
+
+    @classmethod
+    def _get_interfaces_by_network_name(cls, node):
+        """Returns {network name: interface} for node
+        """
+        interfaces = {}
+        for interface in node.interfaces:
+            for network in interface.assigned_networks_list:
+                interfaces.setdefault(network.name, interface)
+        return interfaces
+
     @classmethod
     def _get_interface_by_network_name(cls, node, network_name):
         """Return network device which has appointed
@@ -111,12 +111,20 @@ class NeutronManager(NetworkManager):
         return {}
 
     @classmethod
-    def get_allowed_nic_networkgroups(cls, node, nic):
+    def get_allowed_nic_networkgroups(cls, node, nic, admin_ng=None,
+                                      cluster_ngs=None):
         """Get all allowed network groups
+
+        :param admin_ng: admin NetworkGroup, it's loaded if not given
+        :param cluster_ngs: network groups of cluster of node ordered
+                            by id, they are loaded if not given
         """
-        if nic == node.admin_interface:
-            return [cls.get_admin_network_group()]
-        return cls.get_all_cluster_networkgroups(node)
+        admin_ng = admin_ng or cls.get_admin_network_group()
+        if nic == cls.get_admin_interface(node, admin_ng):
+            return [admin_ng]
+        if cluster_ngs is None:
+            return cls.get_all_cluster_networkgroups(node)
+        return list(cluster_ngs)
 
     @classmethod
     def allow_network_assignment_to_all_interfaces(cls, node):
@@ -63,12 +63,21 @@ class NovaNetworkManager(NetworkManager):
         db().commit()
 
     @classmethod
-    def get_allowed_nic_networkgroups(cls, node, nic):
+    def get_allowed_nic_networkgroups(cls, node, nic, admin_ng=None,
+                                      cluster_ngs=None):
         """Get all allowed network groups
+
+        :param admin_ng: admin NetworkGroup, it's loaded if not given
+        :param cluster_ngs: network groups of cluster of node ordered
+                            by id, they are loaded if not given
         """
-        ngs = cls.get_all_cluster_networkgroups(node)
-        if nic == node.admin_interface:
-            ngs.append(cls.get_admin_network_group())
+        if cluster_ngs is None:
+            ngs = cls.get_all_cluster_networkgroups(node)
+        else:
+            ngs = list(cluster_ngs)
+        admin_ng = admin_ng or cls.get_admin_network_group()
+        if nic == cls.get_admin_interface(node, admin_ng):
+            ngs.append(admin_ng)
         return ngs
 
     @classmethod
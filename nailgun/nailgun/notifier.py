@@ -14,20 +14,52 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from contextlib import contextmanager
 from datetime import datetime
+from itertools import groupby
+import threading
+import traceback
 
 from nailgun.db import db
 from nailgun.db.sqlalchemy.models import Notification
 from nailgun.db.sqlalchemy.models import Task
 from nailgun.errors import errors
 from nailgun.logger import logger
+from nailgun.settings import settings
+
+
+_local = threading.local()
 
 
 def notify(topic, message,
-           cluster_id=None, node_id=None, task_uuid=None):
+           cluster_id=None, node_id=None, task_uuid=None, summary=None):
+    """Creates notification.
+
+    If it's called inside of batch(), notification is buffered and
+    written when batch is finished.
+
+    :param summary: message of notification which replaces several
+                    buffered notifications with the same topic, cluster,
+                    task and summary, it's formatted with their count.
+                    These notifications are kept as its details.
+    """
     if topic == 'discover' and node_id is None:
         raise errors.CannotFindNodeIDForDiscovering(
             "No node id in discover notification")
+
+    buffered = getattr(_local, 'buffer', None)
+    if buffered is not None:
+        buffered.append({
+            'topic': topic,
+            'message': message,
+            'cluster_id': cluster_id,
+            'node_id': node_id,
+            'task_uuid': task_uuid,
+            'summary': summary,
+            'datetime': datetime.now()
+        })
+        return
+
     task = None
     if task_uuid:
         task = db().query(Task).filter_by(uuid=task_uuid).first()
@@ -54,3 +86,111 @@ def notify(topic, message,
         logger.info(
             "Notification: topic: %s message: %s" % (topic, message)
         )
+
+
+@contextmanager
+def batch():
+    """Buffers notifications created inside of block and writes
+    them when block is finished. Notifications of nodes with
+    the same summary are replaced by one notification. If block
+    raises exception, session is rolled back before notifications
+    are written.
+    """
+    if getattr(_local, 'buffer', None) is not None:
+        # nested batch is a part of outer one
+        yield
+        return
+
+    _local.buffer = []
+    try:
+        yield
+    except Exception:
+        db().rollback()
+        raise
+    finally:
+        buffered, _local.buffer = _local.buffer, None
+        if buffered:
+            try:
+                write_notifications(buffered)
+            except Exception:
+                logger.error(traceback.format_exc())
+                db().rollback()
+
+
+def _get_key(notification):
+    return (
+        notification['topic'],
+        notification['cluster_id'],
+        notification['task_uuid'],
+        notification['summary']
+    )
+
+
+def write_notifications(buffered):
+    """Writes buffered notifications. Notifications of nodes which
+    already exist for the same task are skipped like in notify.
+    """
+    tasks_ids = {}
+    uuids = set(n['task_uuid'] for n in buffered if n['task_uuid'])
+    if uuids:
+        tasks_ids = dict(db().query(Task.uuid, Task.id).filter(
+            Task.uuid.in_(uuids)))
+
+    existing = set()
+    nodes_ids = set(n['node_id'] for n in buffered if n['node_id'])
+    if tasks_ids and nodes_ids:
+        existing = set(db().query(
+            Notification.task_id,
+            Notification.node_id,
+            Notification.message
+        ).filter(
+            Notification.task_id.in_(tasks_ids.values()),
+            Notification.node_id.in_(nodes_ids)
+        ))
+
+    notifications = []
+    for n in buffered:
+        task_id = tasks_ids.get(n['task_uuid'])
+        key = (task_id, n['node_id'], n['message'])
+        if n['node_id'] and task_id:
+            if key in existing:
+                continue
+            existing.add(key)
+        notifications.append(dict(n, task_id=task_id))
+
+    min_count = (settings.NOTIFICATIONS or {}).get('min_aggregated', 2)
+    details = []
+    rows = []
+    for key, group in groupby(
+            sorted(notifications, key=_get_key), key=_get_key):
+        group = list(group)
+        summary = key[-1]
+        if summary is None or len(group) < min_count:
+            rows.extend(group)
+            continue
+
+        parent = Notification(
+            topic=group[0]['topic'],
+            message=summary.format(len(group)),
+            cluster_id=group[0]['cluster_id'],
+            task_id=group[0]['task_id'],
+            datetime=group[0]['datetime'])
+        db().add(parent)
+        db().flush()
+        details.extend(dict(n, parent_id=parent.id) for n in group)
+        logger.info(
+            "Notification: topic: %s message: %s",
+            parent.topic, parent.message)
+
+    for n in rows:
+        logger.info(
+            "Notification: topic: %s message: %s", n['topic'], n['message'])
+
+    columns = ('topic', 'message', 'cluster_id', 'node_id', 'task_id',
+               'datetime', 'parent_id')
+    rows = sorted(rows + details, key=lambda n: n['datetime'])
+    if rows:
+        db().execute(Notification.__table__.insert(), [
+            dict((c, n.get(c)) for c in columns) for n in rows
+        ])
+    db().commit()
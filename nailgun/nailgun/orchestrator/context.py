@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+
+#    Copyright 2013 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from collections import defaultdict
+
+from netaddr import IPNetwork
+from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import undefer
+
+from nailgun.db import db
+from nailgun.db.sqlalchemy.models import IPAddr
+from nailgun.db.sqlalchemy.models import NetworkGroup
+from nailgun.db.sqlalchemy.models import Node
+from nailgun.errors import errors
+from nailgun.network.manager import NetworkManager
+
+
+class SerializationContext(object):
+    """Data of cluster needed for deployment serialization.
+
+    Nodes of cluster with their roles, attributes, interfaces and
+    assigned networks, IP addresses of nodes and network groups are
+    loaded with a few queries when context is created, so
+    serialization of node doesn't hit database.
+    """
+
+    def __init__(self, cluster):
+        self.cluster = cluster
+        self.admin_ng = NetworkManager.get_admin_network_group()
+        self.network_groups = db().query(NetworkGroup).filter_by(
+            cluster_id=cluster.id
+        ).order_by(NetworkGroup.id).all()
+
+        self.nodes = db().query(Node).filter_by(
+            cluster_id=cluster.id
+        ).options(
+            joinedload('role_list'),
+            joinedload('pending_role_list'),
+            joinedload('attributes'),
+            joinedload('interfaces'),
+            joinedload('interfaces.assigned_networks_list'),
+            # nodes could be loaded in session without meta before,
+            # but serializers need meta of every node
+            undefer('meta')
+        ).order_by(Node.id).all()
+
+        self.ips = defaultdict(list)
+        self.admin_ips = defaultdict(list)
+        ips = db().query(IPAddr).join(Node).filter(
+            Node.cluster_id == cluster.id
+        ).options(joinedload('network_data')).order_by(IPAddr.id)
+        for ip in ips:
+            if ip.network == self.admin_ng.id:
+                self.admin_ips[ip.node].append(ip.ip_addr)
+            else:
+                self.ips[ip.node].append(ip)
+
+        self._network_data = {}
+        self._interfaces = {}
+        self._admin_interfaces = {}
+
+    @property
+    def nodes_not_for_deletion(self):
+        return [node for node in self.nodes if not node.pending_deletion]
+
+    def get_network_data(self, node):
+        """Returns the same data as node.network_data
+        """
+        if node.id not in self._network_data:
+            self._network_data[node.id] = \
+                NetworkManager.get_node_networks_optimized(
+                    node, self.ips[node.id], self.network_groups,
+                    self.admin_ng)
+        return self._network_data[node.id]
+
+    def get_network_by_netname(self, node, netname):
+        return filter(
+            lambda n: n['name'] == netname,
+            self.get_network_data(node))[0]
+
+    def get_interface_by_netname(self, node, netname):
+        if node.id not in self._interfaces:
+            self._interfaces[node.id] = \
+                NetworkManager._get_interfaces_by_network_name(node)
+        interface = self._interfaces[node.id].get(netname)
+        if interface is None:
+            raise errors.CanNotFindInterface(
+                u'Cannot find interface by name "{0}" for node: '
+                '{1}'.format(netname, node.full_name))
+        return interface
+
+    def get_admin_interface(self, node):
+        if node.id not in self._admin_interfaces:
+            self._admin_interfaces[node.id] = \
+                NetworkManager.get_admin_interface(node, self.admin_ng)
+        return self._admin_interfaces[node.id]
+
+    def get_admin_ip_w_prefix(self, node):
+        """Getting admin ip and assign prefix from admin network."""
+        admin_ip = NetworkManager.get_admin_ips_for_interfaces(
+            node, self.admin_ips[node.id]
+        )[self.get_admin_interface(node).name]
+        admin_ip = IPNetwork(admin_ip)
+
+        # Assign prefix from admin network
+        admin_ip.prefixlen = IPNetwork(self.admin_ng.cidr).prefixlen
+
+        return str(admin_ip)
+
+
+class Detached(object):
+    """Plain copy of attributes of database object,
+    it can be pickled and passed to other process
+    """
+
+    def __init__(self, **attrs):
+        self.__dict__.update(attrs)
+
+
+def detach_network_group(ng):
+    return Detached(
+        id=ng.id,
+        name=ng.name,
+        vlan_start=ng.vlan_start,
+        cidr=ng.cidr,
+        netmask=ng.netmask,
+        gateway=ng.gateway)
+
+
+def detach_cluster(cluster):
+    neutron_config = None
+    if cluster.neutron_config:
+        neutron_config = Detached(L2=cluster.neutron_config.L2)
+    return Detached(
+        id=cluster.id,
+        mode=cluster.mode,
+        net_provider=cluster.net_provider,
+        net_manager=cluster.net_manager,
+        net_segment_type=cluster.net_segment_type,
+        attributes=Detached(editable=cluster.attributes.editable),
+        neutron_config=neutron_config)
+
+
+def detach_node(node, cluster):
+    return Detached(
+        id=node.id,
+        uid=node.uid,
+        name=node.name,
+        full_name=node.full_name,
+        mac=node.mac,
+        ip=node.ip,
+        fqdn=node.fqdn,
+        status=node.status,
+        online=node.online,
+        meta=node.meta,
+        roles=node.roles,
+        pending_roles=node.pending_roles,
+        # keeps order of roles as it's in node
+        all_roles=list(node.all_roles),
+        attributes=Detached(volumes=node.attributes.volumes),
+        interfaces=[
+            Detached(
+                id=iface.id,
+                name=iface.name,
+                mac=iface.mac,
+                ip_addr=iface.ip_addr,
+                assigned_networks_list=map(
+                    detach_network_group, iface.assigned_networks_list))
+            for iface in node.interfaces
+        ],
+        cluster=cluster)
+
+
+class DetachedSerializationContext(SerializationContext):
+    """Serialization context of given nodes which doesn't use
+    database. Nodes, cluster and results of all lookups are copied
+    from context, so it can be passed to other process together
+    with detached nodes.
+    """
+
+    def __init__(self, context, nodes, with_network_data=True):
+        self.cluster = detach_cluster(context.cluster)
+        self.admin_ng = detach_network_group(context.admin_ng)
+        self.network_groups = map(
+            detach_network_group, context.network_groups)
+        self.nodes = []
+        self.admin_ips = {}
+        self._network_data = {}
+        self._interfaces = {}
+        self._admin_interfaces = {}
+
+        for node in nodes:
+            detached = detach_node(node, self.cluster)
+            self.nodes.append(detached)
+            interfaces = dict(
+                (iface.id, iface) for iface in detached.interfaces)
+
+            self.admin_ips[node.id] = context.admin_ips[node.id]
+            self._interfaces[node.id] = dict(
+                (name, interfaces[iface.id]) for name, iface in
+                NetworkManager._get_interfaces_by_network_name(
+                    node).iteritems())
+            self._admin_interfaces[node.id] = \
+                interfaces[context.get_admin_interface(node).id]
+            if with_network_data:
+                self._network_data[node.id] = \
+                    context.get_network_data(node)
+
+        self._nodes_by_id = dict((node.id, node) for node in self.nodes)
+
+    def get_node(self, node_id):
+        return self._nodes_by_id[node_id]
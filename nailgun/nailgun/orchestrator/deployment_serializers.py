@@ -16,20 +16,23 @@
 
 """Deployment serializers for orchestrator"""
 
+from collections import defaultdict
 from copy import deepcopy
 
 from netaddr import IPNetwork
-from sqlalchemy import and_
 
 from nailgun.db import db
 from nailgun.db.sqlalchemy.models import NetworkGroup
-from nailgun.db.sqlalchemy.models import Node
 from nailgun.errors import errors
 from nailgun.logger import logger
 from nailgun.network.manager import NetworkManager
+from nailgun.orchestrator.context import DetachedSerializationContext
+from nailgun.orchestrator.context import SerializationContext
+from nailgun.orchestrator import parallel as parallel_serialization
 from nailgun.settings import settings
 from nailgun.task.helpers import TaskHelper
 from nailgun.utils import dict_merge
+from nailgun.utils import shared_dict_merge
 from nailgun.volumes import manager as VolumeManager
 
 
@@ -54,34 +57,33 @@ class Priority(object):
         return self.priority
 
 
-def get_nodes_not_for_deletion(cluster):
-    """All clusters nodes except nodes for deletion."""
-    return db().query(Node).filter(
-        and_(Node.cluster == cluster,
-             False == Node.pending_deletion)).order_by(Node.id)
-
-
 class DeploymentMultinodeSerializer(object):
 
     @classmethod
-    def serialize(cls, cluster, nodes):
+    def serialize(cls, cluster, nodes, parallel=False):
         """Method generates facts which
         through an orchestrator passes to puppet
+
+        :param parallel: serialize nodes in pool of processes
+                         if it's enabled in settings
         """
-        nodes = cls.serialize_nodes(nodes)
-        common_attrs = cls.get_common_attrs(cluster)
+        context = SerializationContext(cluster)
+        nodes = cls.serialize_nodes(nodes, context, parallel)
+        common_attrs = cls.get_common_attrs(cluster, context)
 
         cls.set_deployment_priorities(nodes)
 
-        return [dict_merge(node, common_attrs) for node in nodes]
+        # common attributes are shared by facts of all nodes
+        return [shared_dict_merge(node, common_attrs) for node in nodes]
 
     @classmethod
-    def get_common_attrs(cls, cluster):
+    def get_common_attrs(cls, cluster, context=None):
         """Cluster attributes."""
+        context = context or SerializationContext(cluster)
         attrs = cluster.attributes.merged_attrs_values()
         attrs['deployment_mode'] = cluster.mode
         attrs['deployment_id'] = cluster.id
-        attrs['nodes'] = cls.node_list(get_nodes_not_for_deletion(cluster))
+        attrs['nodes'] = cls.node_list(context.nodes_not_for_deletion)
 
         for node in attrs['nodes']:
             if node['role'] in 'cinder':
@@ -89,8 +91,8 @@ class DeploymentMultinodeSerializer(object):
 
         attrs = dict_merge(
             attrs,
-            cls.get_net_provider_serializer(cluster).get_common_attrs(cluster,
-                                                                      attrs))
+            cls.get_net_provider_serializer(cluster).get_common_attrs(
+                cluster, attrs, context))
 
         return attrs
 
@@ -132,23 +134,38 @@ class DeploymentMultinodeSerializer(object):
             n['priority'] = other_nodes_prior
 
     @classmethod
-    def serialize_nodes(cls, nodes):
+    def serialize_nodes(cls, nodes, context=None, parallel=False):
         """Serialize node for each role.
         For example if node has two roles then
         in orchestrator will be passed two serialized
         nodes.
         """
-        serialized_nodes = []
+        # nodes can be query, it shouldn't be executed twice
+        nodes = list(nodes)
+        nodes_roles = []
         for node in nodes:
+            context = context or SerializationContext(node.cluster)
             for role in node.all_roles:
-                serialized_nodes.append(cls.serialize_node(node, role))
-        return serialized_nodes
+                nodes_roles.append((node, role))
+
+        if parallel and nodes_roles and \
+                parallel_serialization.is_enabled(len(nodes_roles)):
+            context = DetachedSerializationContext(context, nodes)
+            return parallel_serialization.map_method(
+                cls, 'serialize_node',
+                [(context.get_node(node.id), role)
+                 for node, role in nodes_roles],
+                context)
+
+        return [cls.serialize_node(node, role, context)
+                for node, role in nodes_roles]
 
     @classmethod
-    def serialize_node(cls, node, role):
+    def serialize_node(cls, node, role, context=None):
         """Serialize node, then it will be
         merged with common attributes
         """
+        context = context or SerializationContext(node.cluster)
         node_attrs = {
             # Yes, uid is really should be a string
             'uid': node.uid,
@@ -165,7 +182,8 @@ class DeploymentMultinodeSerializer(object):
         }
 
         node_attrs.update(
-            cls.get_net_provider_serializer(node.cluster).get_node_attrs(node))
+            cls.get_net_provider_serializer(node.cluster).get_node_attrs(
+                node, context))
 
         return node_attrs
 
@@ -181,11 +199,11 @@ class DeploymentHASerializer(DeploymentMultinodeSerializer):
     """Serializer for ha mode."""
 
     @classmethod
-    def serialize(cls, cluster, nodes):
+    def serialize(cls, cluster, nodes, parallel=False):
         serialized_nodes = super(
             DeploymentHASerializer,
             cls
-        ).serialize(cluster, nodes)
+        ).serialize(cluster, nodes, parallel)
         cls.set_primary_controller(serialized_nodes)
 
         return serialized_nodes
@@ -231,13 +249,13 @@ class DeploymentHASerializer(DeploymentMultinodeSerializer):
         return node_list
 
     @classmethod
-    def get_common_attrs(cls, cluster):
+    def get_common_attrs(cls, cluster, context=None):
         """Common attributes for all facts
         """
         common_attrs = super(
             DeploymentHASerializer,
             cls
-        ).get_common_attrs(cluster)
+        ).get_common_attrs(cluster, context)
 
         for ng in cluster.network_groups:
             if ng.meta.get("assign_vip"):
@@ -303,39 +321,44 @@ class DeploymentHASerializer(DeploymentMultinodeSerializer):
 class NetworkDeploymentSerializer(object):
 
     @classmethod
-    def get_common_attrs(cls, cluster, attrs):
+    def get_common_attrs(cls, cluster, attrs, context=None):
         """Cluster network attributes."""
-        common = cls.network_provider_cluster_attrs(cluster)
+        context = context or SerializationContext(cluster)
+        common = cls.network_provider_cluster_attrs(cluster, context)
         common.update(cls.network_ranges(cluster))
         common.update({'master_ip': settings.MASTER_IP})
         common['nodes'] = deepcopy(attrs['nodes'])
 
+        nodes_by_uid = defaultdict(list)
+        for n in common['nodes']:
+            nodes_by_uid[n['uid']].append(n)
+
         # Addresses
-        for node in get_nodes_not_for_deletion(cluster):
-            netw_data = node.network_data
+        for node in context.nodes_not_for_deletion:
+            netw_data = context.get_network_data(node)
             addresses = {}
-            for net in node.cluster.network_groups:
+            for net in context.network_groups:
                 if net.meta.get('render_addr_mask'):
                     addresses.update(cls.get_addr_mask(
                         netw_data,
                         net.name,
                         net.meta.get('render_addr_mask')))
 
-            [n.update(addresses) for n in common['nodes']
-             if n['uid'] == str(node.uid)]
+            [n.update(addresses) for n in nodes_by_uid[node.uid]]
         return common
 
     @classmethod
-    def get_node_attrs(cls, node):
+    def get_node_attrs(cls, node, context=None):
         """Node network attributes."""
-        return cls.network_provider_node_attrs(node.cluster, node)
+        context = context or SerializationContext(node.cluster)
+        return cls.network_provider_node_attrs(node.cluster, node, context)
 
     @classmethod
-    def network_provider_cluster_attrs(cls, cluster):
+    def network_provider_cluster_attrs(cls, cluster, context):
         raise NotImplemented
 
     @classmethod
-    def network_provider_node_attrs(cls, cluster, node):
+    def network_provider_node_attrs(cls, cluster, node, context):
         raise NotImplemented
 
     @classmethod
@@ -389,31 +412,23 @@ class NetworkDeploymentSerializer(object):
         }
 
     @staticmethod
-    def get_admin_ip_w_prefix(node):
+    def get_admin_ip_w_prefix(node, context=None):
         """Getting admin ip and assign prefix from admin network."""
-        network_manager = NetworkManager
-        admin_ip = network_manager.get_admin_ips_for_interfaces(
-            node)[node.admin_interface.name]
-        admin_ip = IPNetwork(admin_ip)
-
-        # Assign prefix from admin network
-        admin_net = IPNetwork(network_manager.get_admin_network_group().cidr)
-        admin_ip.prefixlen = admin_net.prefixlen
-
-        return str(admin_ip)
+        context = context or SerializationContext(node.cluster)
+        return context.get_admin_ip_w_prefix(node)
 
 
 class NovaNetworkDeploymentSerializer(NetworkDeploymentSerializer):
 
     @classmethod
-    def network_provider_cluster_attrs(cls, cluster):
+    def network_provider_cluster_attrs(cls, cluster, context):
         return {'novanetwork_parameters': cls.novanetwork_attrs(cluster),
                 'dns_nameservers': cluster.dns_nameservers}
 
     @classmethod
-    def network_provider_node_attrs(cls, cluster, node):
-        network_data = node.network_data
-        interfaces = cls.configure_interfaces(node)
+    def network_provider_node_attrs(cls, cluster, node, context):
+        network_data = context.get_network_data(node)
+        interfaces = cls.configure_interfaces(node, context)
         cls.__add_hw_interfaces(interfaces, node.meta['interfaces'])
 
         # Interfaces assingment
@@ -421,7 +436,7 @@ class NovaNetworkDeploymentSerializer(NetworkDeploymentSerializer):
         attrs.update(cls.interfaces_list(network_data))
 
         if cluster.net_manager == 'VlanManager':
-            attrs.update(cls.add_vlan_interfaces(node))
+            attrs.update(cls.add_vlan_interfaces(node, context))
 
         return attrs
 
@@ -444,22 +459,22 @@ class NovaNetworkDeploymentSerializer(NetworkDeploymentSerializer):
         return attrs
 
     @classmethod
-    def add_vlan_interfaces(cls, node):
+    def add_vlan_interfaces(cls, node, context):
         """Assign fixed_interfaces and vlan_interface.
         They should be equal.
         """
-        fixed_interface = NetworkManager._get_interface_by_network_name(
-            node.id, 'fixed')
+        fixed_interface = context.get_interface_by_netname(node, 'fixed')
 
         attrs = {'fixed_interface': fixed_interface.name,
                  'vlan_interface': fixed_interface.name}
         return attrs
 
     @classmethod
-    def configure_interfaces(cls, node):
+    def configure_interfaces(cls, node, context=None):
         """Configure interfaces
         """
-        network_data = node.network_data
+        context = context or SerializationContext(node.cluster)
+        network_data = context.get_network_data(node)
         interfaces = {}
 
         for network in network_data:
@@ -481,7 +496,7 @@ class NovaNetworkDeploymentSerializer(NetworkDeploymentSerializer):
 
             # Add gateway for public
             if network_name == 'admin':
-                admin_ip_addr = cls.get_admin_ip_w_prefix(node)
+                admin_ip_addr = cls.get_admin_ip_w_prefix(node, context)
                 interface['ipaddr'].append(admin_ip_addr)
             elif network_name == 'public' and network.get('gateway'):
                 interface['gateway'] = network['gateway']
@@ -530,16 +545,16 @@ class NovaNetworkDeploymentSerializer(NetworkDeploymentSerializer):
 class NeutronNetworkDeploymentSerializer(NetworkDeploymentSerializer):
 
     @classmethod
-    def network_provider_cluster_attrs(cls, cluster):
+    def network_provider_cluster_attrs(cls, cluster, context):
         """Cluster attributes."""
         attrs = {'quantum': True,
                  'quantum_settings': cls.neutron_attrs(cluster)}
 
         if cluster.mode == 'multinode':
-            for node in cluster.nodes:
+            for node in context.nodes:
                 if cls._node_has_role_by_name(node, 'controller'):
-                    mgmt_cidr = NetworkManager.get_node_network_by_netname(
-                        node.id,
+                    mgmt_cidr = context.get_network_by_netname(
+                        node,
                         'management'
                     )['ip']
                     attrs['management_vip'] = mgmt_cidr.split('/')[0]
@@ -548,11 +563,12 @@ class NeutronNetworkDeploymentSerializer(NetworkDeploymentSerializer):
         return attrs
 
     @classmethod
-    def network_provider_node_attrs(cls, cluster, node):
+    def network_provider_node_attrs(cls, cluster, node, context):
         """Serialize node, then it will be
         merged with common attributes
         """
-        node_attrs = {'network_scheme': cls.generate_network_scheme(node)}
+        node_attrs = {
+            'network_scheme': cls.generate_network_scheme(node, context)}
 
         return node_attrs
 
@@ -568,10 +584,12 @@ class NeutronNetworkDeploymentSerializer(NetworkDeploymentSerializer):
         """
         attrs = {}
         neutron_config = cluster.neutron_config
-        attrs['L3'] = neutron_config.L3 or {
+        # config of cluster is copied, because it's changed below
+        # and cluster can be serialized again in the same session
+        attrs['L3'] = deepcopy(neutron_config.L3) or {
             'use_namespaces': True
         }
-        attrs['L2'] = neutron_config.L2
+        attrs['L2'] = deepcopy(neutron_config.L2)
         attrs['L2']['segmentation_type'] = neutron_config.segmentation_type
 
         join_range = lambda r: (":".join(map(str, r)) if r else None)
@@ -586,7 +604,8 @@ class NeutronNetworkDeploymentSerializer(NetworkDeploymentSerializer):
                 attrs['L2']['tunnel_id_ranges']
             )
 
-        attrs['predefined_networks'] = neutron_config.predefined_networks
+        attrs['predefined_networks'] = deepcopy(
+            neutron_config.predefined_networks)
 
         nets_l2_configs = {
             "net04_ext": {
@@ -640,7 +659,9 @@ class NeutronNetworkDeploymentSerializer(NetworkDeploymentSerializer):
         return attrs
 
     @classmethod
-    def generate_network_scheme(cls, node):
+    def generate_network_scheme(cls, node, context=None):
+        context = context or SerializationContext(node.cluster)
+        admin_interface = context.get_admin_interface(node)
 
         # Create a data structure and fill it with static values.
 
@@ -684,7 +705,7 @@ class NeutronNetworkDeploymentSerializer(NetworkDeploymentSerializer):
                 )
             }
 
-            if iface.name == node.admin_interface.name:
+            if iface.name == admin_interface.name:
                 # A physical interface for the FuelWeb admin network should
                 # not be used through bridge. Directly only.
                 continue
@@ -698,7 +719,6 @@ class NeutronNetworkDeploymentSerializer(NetworkDeploymentSerializer):
                 'name': iface.name
             })
 
-        nm = NetworkManager
         # Populate IP address information to endpoints.
         netgroup_mapping = [
             ('storage', 'br-storage'),
@@ -709,14 +729,14 @@ class NeutronNetworkDeploymentSerializer(NetworkDeploymentSerializer):
         for ngname, brname in netgroup_mapping:
             # Here we get a dict with network description for this particular
             # node with its assigned IPs and device names for each network.
-            netgroup = nm.get_node_network_by_netname(node.id, ngname)
+            netgroup = context.get_network_by_netname(node, ngname)
             attrs['endpoints'][brname]['IP'] = [netgroup['ip']]
             netgroups[ngname] = netgroup
         attrs['endpoints']['br-ex']['gateway'] = netgroups['public']['gateway']
 
         # Connect interface bridges to network bridges.
         for ngname, brname in netgroup_mapping:
-            netgroup = nm.get_node_network_by_netname(node.id, ngname)
+            netgroup = context.get_network_by_netname(node, ngname)
             if not netgroup['vlan']:
                 # Untagged network.
                 attrs['transformations'].append({
@@ -743,8 +763,8 @@ class NeutronNetworkDeploymentSerializer(NetworkDeploymentSerializer):
             attrs['transformations'].append({
                 'action': 'add-patch',
                 'bridges': [
-                    'br-%s' % nm.get_node_interface_by_netname(
-                        node.id,
+                    'br-%s' % context.get_interface_by_netname(
+                        node,
                         'private'
                     ).name,
                     'br-prv'
@@ -760,10 +780,10 @@ class NeutronNetworkDeploymentSerializer(NetworkDeploymentSerializer):
             )
 
         # Fill up all about fuelweb-admin network.
-        attrs['endpoints'][node.admin_interface.name] = {
-            "IP": [cls.get_admin_ip_w_prefix(node)]
+        attrs['endpoints'][admin_interface.name] = {
+            "IP": [cls.get_admin_ip_w_prefix(node, context)]
         }
-        attrs['roles']['fw-admin'] = node.admin_interface.name
+        attrs['roles']['fw-admin'] = admin_interface.name
 
         return attrs
 
@@ -800,7 +820,7 @@ class NeutronNetworkDeploymentSerializer(NetworkDeploymentSerializer):
         return iface_attrs
 
 
-def serialize(cluster, nodes):
+def serialize(cluster, nodes, parallel=False):
     """Serialization depends on deployment mode
     """
     TaskHelper.prepare_for_deployment(cluster.nodes)
@@ -810,4 +830,4 @@ def serialize(cluster, nodes):
     elif cluster.is_ha_mode:
         serializer = DeploymentHASerializer
 
-    return serializer.serialize(cluster, nodes)
+    return serializer.serialize(cluster, nodes, parallel)
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+
+#    Copyright 2013 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Pool of processes for serialization of nodes"""
+
+from itertools import chain
+import logging
+import multiprocessing
+import threading
+import traceback
+
+from nailgun.db.sqlalchemy import engine
+from nailgun.errors import default_messages
+from nailgun.errors import errors
+from nailgun.logger import logger
+from nailgun.settings import settings
+
+
+_pool = None
+_pool_lock = threading.Lock()
+# connections inherited from parent process, see _init_worker
+_parent_pool = None
+
+
+def get_processes_count():
+    processes = int((settings.SERIALIZATION or {}).get('processes', 1))
+    return processes or multiprocessing.cpu_count()
+
+
+def is_enabled(items_count):
+    """Checks if items should be processed in parallel
+    """
+    min_items = int((settings.SERIALIZATION or {}).get('min_items', 0))
+    return get_processes_count() > 1 and items_count >= min_items
+
+
+def _init_worker():
+    """Pool is forked from thread of multithreaded server, so worker
+    drops state of parent process it could share or find locked.
+    """
+    global _parent_pool
+    # engine.dispose() would close connections of parent process
+    # (and terminate their sessions on server), so pool is replaced
+    # and connections are kept referenced until exit of worker
+    _parent_pool = engine.pool
+    engine.pool = engine.pool.recreate()
+    # locks of logging could be held by other threads of parent
+    logging._lock = threading.RLock()
+    for ref in logging._handlerList:
+        handler = ref()
+        if handler is not None:
+            handler.createLock()
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = multiprocessing.Pool(
+                get_processes_count(), initializer=_init_worker)
+        return _pool
+
+
+def _call_chunk(task):
+    cls, method_name, chunk, args = task
+    method = getattr(cls, method_name)
+    try:
+        return True, [method(*(item + args)) for item in chunk]
+    except Exception as exc:
+        logger.error(traceback.format_exc())
+        # exceptions of nailgun can't be pickled,
+        # so they are raised again in parent process
+        return False, (exc.__class__.__name__, str(exc))
+
+
+def map_method(cls, method_name, items, *args):
+    """Calls class method for every item in pool of processes.
+
+    :param cls: class, it's passed to other processes by name
+    :param method_name: name of class method
+    :param items: list of tuples of arguments, they should be picklable
+    :param args: arguments passed to method after item
+    :returns: list of results in order of items
+    """
+    processes = get_processes_count()
+    # a few chunks for every process, so slow chunks
+    # don't keep other processes idle
+    chunk_size = max(1, len(items) // (processes * 4))
+    tasks = [
+        (cls, method_name, items[i:i + chunk_size], args)
+        for i in xrange(0, len(items), chunk_size)
+    ]
+
+    results = []
+    for success, result in get_pool().map(_call_chunk, tasks):
+        if not success:
+            exc_name, message = result
+            if exc_name in default_messages:
+                raise getattr(errors, exc_name)(message)
+            # errors would build new exception class for any name
+            raise errors.UnknownError(
+                u"{0}: {1}".format(exc_name, message))
+        results.append(result)
+    return list(chain.from_iterable(results))
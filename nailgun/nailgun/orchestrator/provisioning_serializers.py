@@ -18,6 +18,9 @@
 
 from nailgun.logger import logger
 from nailgun.network.manager import NetworkManager
+from nailgun.orchestrator.context import DetachedSerializationContext
+from nailgun.orchestrator.context import SerializationContext
+from nailgun.orchestrator import parallel as parallel_serialization
 from nailgun.settings import settings
 from nailgun.task.helpers import TaskHelper
 
@@ -26,11 +29,16 @@ class ProvisioningSerializer(object):
     """Provisioning serializer"""
 
     @classmethod
-    def serialize(cls, cluster, nodes):
-        """Serialize cluster for provisioning."""
+    def serialize(cls, cluster, nodes, parallel=False):
+        """Serialize cluster for provisioning.
+
+        :param parallel: serialize nodes in pool of processes
+                         if it's enabled in settings
+        """
 
         cluster_attrs = cluster.attributes.merged_attrs_values()
-        serialized_nodes = cls.serialize_nodes(cluster_attrs, nodes)
+        serialized_nodes = cls.serialize_nodes(
+            cluster_attrs, nodes, SerializationContext(cluster), parallel)
 
         return {
             'engine': {
@@ -40,18 +48,34 @@ class ProvisioningSerializer(object):
             'nodes': serialized_nodes}
 
     @classmethod
-    def serialize_nodes(cls, cluster_attrs, nodes):
+    def serialize_nodes(cls, cluster_attrs, nodes, context=None,
+                        parallel=False):
         """Serialize nodes."""
+        # nodes can be query, which doesn't have length
+        nodes = list(nodes)
+        if parallel and context and \
+                parallel_serialization.is_enabled(len(nodes)):
+            context = DetachedSerializationContext(
+                context, nodes, with_network_data=False)
+            return parallel_serialization.map_method(
+                cls, 'serialize_node',
+                [(cluster_attrs, context.get_node(node.id))
+                 for node in nodes],
+                context)
+
         serialized_nodes = []
         for node in nodes:
-            serialized_node = cls.serialize_node(cluster_attrs, node)
+            context = context or SerializationContext(node.cluster)
+            serialized_node = cls.serialize_node(cluster_attrs, node, context)
             serialized_nodes.append(serialized_node)
 
         return serialized_nodes
 
     @classmethod
-    def serialize_node(cls, cluster_attrs, node):
+    def serialize_node(cls, cluster_attrs, node, context=None):
         """Serialize a single node."""
+        context = context or SerializationContext(node.cluster)
+        admin_interface = context.get_admin_interface(node)
 
         serialized_node = {
             'uid': node.uid,
@@ -67,7 +91,7 @@ class ProvisioningSerializer(object):
             'name_servers_search': '\"%s\"' % settings.DNS_SEARCH,
             'netboot_enabled': '1',
             'kernel_options': {
-                'netcfg/choose_interface': node.admin_interface.mac,
+                'netcfg/choose_interface': admin_interface.mac,
                 'udevrules': cls.interfaces_mapping_for_udev(node)},
             'ks_meta': {
                 'ks_spaces': node.attributes.volumes,
@@ -85,17 +109,18 @@ class ProvisioningSerializer(object):
                 'mco_enable': 1,
                 'auth_key': "\"%s\"" % cluster_attrs.get('auth_key', '')}}
 
-        serialized_node.update(cls.serialize_interfaces(node))
+        serialized_node.update(cls.serialize_interfaces(node, context))
 
         return serialized_node
 
     @classmethod
-    def serialize_interfaces(cls, node):
+    def serialize_interfaces(cls, node, context=None):
+        context = context or SerializationContext(node.cluster)
         interfaces = {}
         interfaces_extra = {}
-        net_manager = NetworkManager
-        admin_ips = net_manager.get_admin_ips_for_interfaces(node)
-        admin_netmask = net_manager.get_admin_network_group().netmask
+        admin_ips = NetworkManager.get_admin_ips_for_interfaces(
+            node, context.admin_ips[node.id])
+        admin_netmask = context.admin_ng.netmask
 
         for interface in node.interfaces:
             name = interface.name
@@ -153,8 +178,8 @@ class ProvisioningSerializer(object):
         return settings.PATH_TO_SSH_KEY
 
 
-def serialize(cluster, nodes):
+def serialize(cluster, nodes, parallel=False):
     """Serialize cluster for provisioning."""
     TaskHelper.prepare_for_provisioning(nodes)
 
-    return ProvisioningSerializer.serialize(cluster, nodes)
+    return ProvisioningSerializer.serialize(cluster, nodes, parallel)
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+
+#    Copyright 2013 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Serving of API by pool of pre-forked processes"""
+
+import errno
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+import traceback
+
+from web.wsgiserver import CherryPyWSGIServer
+
+from nailgun.db.sqlalchemy import engine
+from nailgun.logger import logger
+
+
+class SharedSocketWSGIServer(CherryPyWSGIServer):
+    """WSGI server which accepts connections from listening socket
+    created before it's started, so several processes can accept
+    connections from one socket.
+    """
+
+    def __init__(self, sock, wsgi_app):
+        super(SharedSocketWSGIServer, self).__init__(
+            sock.getsockname(), wsgi_app, server_name='localhost',
+            # socket is listened again by server
+            request_queue_size=socket.SOMAXCONN)
+        self.shared_socket = sock
+
+    def bind(self, family, type, proto=0):
+        self.socket = self.shared_socket
+
+    def stop(self):
+        # socket is shared with other processes, so it isn't touched
+        # to interrupt accept(), accept() waits with timeout anyway
+        self.ready = False
+        self.socket = None
+        self.requests.stop(self.shutdown_timeout)
+
+
+class PreforkServer(object):
+    """Runs API in worker processes, which accept connections from
+    one listening socket, and background services (RPC consumer,
+    keepalive watcher, log indexer) in one separate process.
+
+    Master process only starts children, starts them again if they
+    exit and stops them on SIGTERM or SIGINT: children get SIGTERM,
+    finish current requests and exit; children which don't exit in
+    stop_timeout seconds are killed.
+    """
+
+    SERVICES = 'services'
+    WORKER = 'API worker'
+
+    def __init__(self, wsgifunc, address, workers, start_services,
+                 stop_services, stop_timeout=30):
+        """:param start_services: function starting threads of services,
+                                 it's called in services process
+        :param stop_services: function stopping them, it's called with
+                              result of start_services
+        """
+        self.wsgifunc = wsgifunc
+        self.address = address
+        self.workers = workers
+        self.start_services = start_services
+        self.stop_services = stop_services
+        self.stop_timeout = stop_timeout
+        self.socket = None
+        self.children = {}
+        self.stopping = False
+
+    def listen(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind(self.address)
+        sock.listen(socket.SOMAXCONN)
+        return sock
+
+    def run(self):
+        self.socket = self.listen()
+        print('http://%s:%d/' % self.address)
+        # connections opened by master can't be used by children
+        engine.dispose()
+
+        signal.signal(signal.SIGTERM, self.handle_stop)
+        signal.signal(signal.SIGINT, self.handle_stop)
+
+        # services are started first, so messages of orchestrator
+        # are consumed as soon as API can send tasks
+        self.spawn(self.SERVICES)
+        for _ in xrange(self.workers):
+            self.spawn(self.WORKER)
+        logger.info(
+            "Running WSGI app in %s worker processes...", self.workers)
+
+        while not self.stopping:
+            self.reap()
+            time.sleep(1)
+        self.stop()
+
+    def handle_stop(self, signum, frame):
+        self.stopping = True
+
+    def spawn(self, kind):
+        pid = os.fork()
+        if pid:
+            self.children[pid] = kind
+            return
+
+        # master decides when children should stop
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        code = 0
+        try:
+            if kind == self.SERVICES:
+                self.run_services()
+            else:
+                self.run_worker()
+        except Exception:
+            logger.error(traceback.format_exc())
+            code = 1
+        finally:
+            # os._exit doesn't flush buffered log handlers
+            logging.shutdown()
+            os._exit(code)
+
+    def run_services(self):
+        stopped = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *args: stopped.set())
+        services = self.start_services()
+        while not stopped.isSet():
+            stopped.wait(1)
+        self.stop_services(services)
+
+    def run_worker(self):
+        server = SharedSocketWSGIServer(self.socket, self.wsgifunc)
+        signal.signal(
+            signal.SIGTERM, lambda *args: setattr(server, 'ready', False))
+        server.start()
+        server.stop()
+
+    def reap(self, respawn=True):
+        """Collects exited children and starts them again
+        """
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except OSError as exc:
+                if exc.errno == errno.EINTR:
+                    continue
+                break
+            if not pid:
+                break
+            kind = self.children.pop(pid, None)
+            if kind and respawn:
+                logger.error(
+                    "%s process %s exited with status %s, starting it again",
+                    kind, pid, status)
+                self.spawn(kind)
+
+    def stop(self):
+        logger.info("Stopping worker processes...")
+        for pid in self.children:
+            self.kill(pid, signal.SIGTERM)
+
+        deadline = time.time() + self.stop_timeout
+        while self.children and time.time() < deadline:
+            self.reap(respawn=False)
+            time.sleep(0.1)
+
+        for pid, kind in self.children.items():
+            logger.warning(
+                "%s process %s didn't stop in %s seconds, killing it",
+                kind, pid, self.stop_timeout)
+            self.kill(pid, signal.SIGKILL)
+        self.socket.close()
+
+    def kill(self, pid, signum):
+        try:
+            os.kill(pid, signum)
+        except OSError:
+            pass
@@ -15,10 +15,14 @@
 #    under the License.
 
 import json
+import logging
+import threading
 
 from kombu import Connection
 from kombu import Exchange
+from kombu import pools
 from kombu import Queue
+from kombu.pools import producers
 
 from nailgun.logger import logger
 from nailgun.settings import settings
@@ -59,14 +63,42 @@ nailgun_queue = Queue(
 )
 
 
+# connection is created on first cast and shared by all threads,
+# producers with their own channels are taken from pool
+_connection = None
+_connection_lock = threading.Lock()
+
+
+def get_connection():
+    global _connection
+    with _connection_lock:
+        if _connection is None:
+            _connection = Connection(
+                conn_str,
+                transport_options={
+                    'confirm_publish': bool(int(
+                        settings.RABBITMQ.get('confirm_publish', 0)))
+                }
+            )
+            pools.set_limit(int(settings.RABBITMQ.get('producers', 10)))
+    return _connection
+
+
 def cast(name, message):
-    logger.debug(
-        "RPC cast to orchestrator:\n{0}".format(
-            json.dumps(message, indent=4)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "RPC cast to orchestrator:\n{0}".format(
+                json.dumps(message, indent=4)
+            )
+        )
+    with producers[get_connection()].acquire(block=True) as producer:
+        # reconnects and republishes message if connection was lost
+        publish = producer.connection.ensure(
+            producer,
+            producer.publish,
+            max_retries=int(settings.RABBITMQ.get('max_retries', 3))
         )
-    )
-    with Connection(conn_str) as conn:
-        with conn.Producer(serializer='json') as producer:
-            producer.publish(message,
-                             exchange=naily_exchange, routing_key=name,
-                             declare=[naily_queue])
+        publish(message,
+                serializer='json',
+                exchange=naily_exchange, routing_key=name,
+                declare=[naily_queue])
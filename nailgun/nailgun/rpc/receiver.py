@@ -22,6 +22,7 @@ import os
 import traceback
 
 from sqlalchemy import or_
+from sqlalchemy.orm import defer
 
 from nailgun import notifier
 
@@ -44,6 +45,27 @@ def get_task_by_uuid(uuid):
     return task
 
 
+def get_nodes_by_uids(uids):
+    """Loads nodes with one query. Meta of nodes isn't loaded
+    until it's accessed, because responses update only statuses.
+
+    :param uids: list of nodes uids
+    :returns: dict {uid as string: Node}
+    """
+    ids = set()
+    for uid in uids:
+        try:
+            ids.add(int(uid))
+        except (TypeError, ValueError):
+            continue
+    if not ids:
+        return {}
+    return dict(
+        (node.uid, node) for node in
+        db().query(Node).filter(Node.id.in_(ids)).options(defer('meta'))
+    )
+
+
 class NailgunReceiver(object):
 
     @classmethod
@@ -188,8 +210,9 @@ class NailgunReceiver(object):
             status = task.status
 
         # First of all, let's update nodes in database
+        nodes_by_uid = get_nodes_by_uids([node['uid'] for node in nodes])
         for node in nodes:
-            node_db = db().query(Node).get(node['uid'])
+            node_db = nodes_by_uid.get(str(node['uid']))
 
             if not node_db:
                 logger.warning(
@@ -235,11 +258,12 @@ class NailgunReceiver(object):
                             ),
                             cluster_id=task.cluster_id,
                             node_id=node['uid'],
-                            task_uuid=task_uuid
+                            task_uuid=task_uuid,
+                            summary=u"Failed to deploy {0} nodes"
                         )
 
             db().add(node_db)
-            db().commit()
+        db().commit()
 
         # We should calculate task progress by nodes info
         task = get_task_by_uuid(task_uuid)
@@ -269,9 +293,10 @@ class NailgunReceiver(object):
 
         task = get_task_by_uuid(task_uuid)
 
+        nodes_by_uid = get_nodes_by_uids([node.get('uid') for node in nodes])
         for node in nodes:
             uid = node.get('uid')
-            node_db = db().query(Node).get(uid)
+            node_db = nodes_by_uid.get(str(uid))
 
             if not node_db:
                 logger.warn('Task with uid "{0}" not found'.format(uid))
@@ -306,7 +331,7 @@ class NailgunReceiver(object):
             )
         ).filter(
             Node.error_type.in_(error_types)
-        ).all()
+        ).options(defer('meta')).all()
         for n in error_nodes:
             if names_only:
                 nodes_info.append(u"'{0}'".format(n.name))
@@ -458,7 +483,7 @@ class NailgunReceiver(object):
             if forgotten_uids:
                 absent_nodes = db().query(Node).filter(
                     Node.id.in_(forgotten_uids)
-                ).all()
+                ).options(defer('meta')).all()
                 absent_node_names = []
                 for n in absent_nodes:
                     if n.name:
@@ -819,3 +844,5 @@ class NailgunReceiver(object):
             TaskHelper.update_task_status(
                 task_uuid, status, progress,
                 '/dump/{0}'.format(dumpfile))
+        elif status == 'running':
+            TaskHelper.update_task_status(task_uuid, status, progress)
@@ -14,33 +14,138 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from collections import OrderedDict
+import Queue
 import threading
+import time
 import traceback
 
 from kombu import Connection
 from kombu.mixins import ConsumerMixin
 
 from nailgun.db import db
+from nailgun.db.sqlalchemy.models import Task
 from nailgun.errors import errors
 from nailgun.logger import logger
+from nailgun import notifier
 import nailgun.rpc as rpc
 from nailgun.rpc.receiver import NailgunReceiver
+from nailgun.settings import settings
 
 
 class RPCConsumer(ConsumerMixin):
 
-    def __init__(self, connection, receiver):
+    # progress messages which can be merged per task
+    batchable_methods = ('deploy_resp', 'provision_resp')
+
+    def __init__(self, connection, receiver, batch_window=0, batch_size=100):
+        """:param batch_window: how long (in seconds) to collect progress
+                             messages before applying them, 0 disables
+                             batching
+        :param batch_size: max number of messages in one batch
+        """
         self.connection = connection
         self.receiver = receiver
+        self.batch_window = batch_window
+        self.batch_size = batch_size
+        self.batch = []
+        self.batch_started = None
+
+        # if set messages are processed by pool of worker threads
+        self.pool = None
+        self.prefetch_count = 0
 
     def get_consumers(self, Consumer, channel):
-        return [Consumer(queues=[rpc.nailgun_queue],
-                         callbacks=[self.consume_msg])]
+        consumer = Consumer(queues=[rpc.nailgun_queue],
+                            callbacks=[self.consume_msg])
+        if self.prefetch_count:
+            consumer.qos(prefetch_count=self.prefetch_count)
+        return [consumer]
+
+    def on_iteration(self):
+        # called by kombu between draining events, so batch
+        # is applied even if no new messages come
+        if self.pool:
+            self.pool.ack_processed()
+        elif self.batch_expired():
+            self.flush_batch()
+
+    def batch_expired(self):
+        return bool(self.batch) and \
+            time.time() - self.batch_started >= self.batch_window
 
     def consume_msg(self, body, msg):
+        if self.pool:
+            self.pool.dispatch(body, msg)
+            return
+
+        if self.batch_window and body.get("method") in self.batchable_methods:
+            if not self.batch:
+                self.batch_started = time.time()
+            self.batch.append((body, msg))
+            if len(self.batch) >= self.batch_size or self.batch_expired():
+                self.flush_batch()
+            return
+
+        # all previous messages should be applied before
+        # this one to keep messages order
+        self.flush_batch()
+        self.process_msg(body, [msg])
+
+    def flush_batch(self):
+        """Merges collected messages per method and task and applies
+        every merged message with one callback call. Messages are
+        acknowledged after they are applied.
+        """
+        if not self.batch:
+            return
+
+        batch, self.batch = self.batch, []
+        groups = OrderedDict()
+        for body, msg in batch:
+            key = (body["method"], body["args"].get("task_uuid"))
+            groups.setdefault(key, []).append((body, msg))
+
+        logger.debug(
+            "Applying batch of %s RPC messages as %s messages",
+            len(batch), len(groups))
+        for group in groups.itervalues():
+            bodies, msgs = zip(*group)
+            self.process_msg(self.merge_bodies(bodies), msgs)
+
+    @classmethod
+    def merge_bodies(cls, bodies):
+        """Merges progress messages of one task into one message.
+        The latest value wins for every node field and for task
+        status and error, task progress is taken from the latest
+        message which has it unless nodes were reported after it
+        (in this case progress is recalculated by nodes).
+        """
+        if len(bodies) == 1:
+            return bodies[0]
+
+        nodes = OrderedDict()
+        args = {}
+        for body in bodies:
+            body_args = body["args"]
+            for node in body_args.get("nodes") or []:
+                nodes.setdefault(node.get("uid"), {}).update(node)
+            for key, value in body_args.iteritems():
+                if key not in ("nodes", "progress") and value is not None:
+                    args[key] = value
+            if body_args.get("progress") is not None:
+                args["progress"] = body_args["progress"]
+            elif body_args.get("nodes"):
+                args.pop("progress", None)
+        args["nodes"] = nodes.values()
+        return {"method": bodies[0]["method"], "args": args}
+
+    def process_msg(self, body, msgs):
         callback = getattr(self.receiver, body["method"])
         try:
-            callback(**body["args"])
+            # notifications of nodes are summarized per message
+            with notifier.batch():
+                callback(**body["args"])
             db().commit()
         except errors.CannotFindTask as e:
             logger.warn(str(e))
@@ -49,17 +154,163 @@ class RPCConsumer(ConsumerMixin):
             logger.error(traceback.format_exc())
             db().rollback()
         finally:
+            for msg in msgs:
+                msg.ack()
+            # every message is processed with empty session
+            db().close()
+
+
+class ProcessedMessage(object):
+    """Wrapper for message passed to worker thread.
+    Channel can't be used from several threads, so
+    worker only marks message as processed and it's
+    acknowledged later by consumer thread.
+    """
+
+    def __init__(self, msg, processed):
+        self.msg = msg
+        self.processed = processed
+        self.received_at = time.time()
+
+    def ack(self):
+        self.processed.put(self.msg)
+
+
+class RPCWorker(threading.Thread):
+    """Thread which processes messages of its partition
+    in the order they were received. Every worker thread
+    has its own scoped db session.
+    """
+
+    def __init__(self, index, receiver, processed,
+                 prefetch=100, batch_window=0, batch_size=100):
+        super(RPCWorker, self).__init__(name='rpc-worker-%s' % index)
+        self.daemon = True
+        self.index = index
+        self.queue = Queue.Queue(maxsize=prefetch)
+        self.processed = processed
+        self.stoprequest = threading.Event()
+        self.processor = RPCConsumer(
+            None,
+            receiver,
+            batch_window=batch_window,
+            batch_size=batch_size
+        )
+        self.messages_count = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+
+    def put(self, body, msg):
+        # blocks consumer thread if worker has too many
+        # unprocessed messages
+        self.queue.put((body, ProcessedMessage(msg, self.processed)))
+
+    def join(self, timeout=None):
+        self.stoprequest.set()
+        super(RPCWorker, self).join(timeout)
+
+    def run(self):
+        while not (self.stoprequest.isSet() and self.queue.empty()):
+            try:
+                body, msg = self.queue.get(timeout=0.1)
+            except Queue.Empty:
+                self.processor.on_iteration()
+                continue
+            self.last_lag = time.time() - msg.received_at
+            self.max_lag = max(self.max_lag, self.last_lag)
+            self.messages_count += 1
+            self.processor.consume_msg(body, msg)
+        self.processor.flush_batch()
+        db.remove()
+
+    def stats(self):
+        return {
+            'worker': self.index,
+            'queue_size': self.queue.qsize(),
+            'messages': self.messages_count,
+            'last_lag': self.last_lag,
+            'max_lag': self.max_lag
+        }
+
+
+class RPCWorkerPool(object):
+    """Pool of RPC workers. Messages are partitioned by
+    cluster of the task (or task uuid if task has no cluster),
+    so messages of one task are processed in order while
+    messages of different clusters are processed in parallel.
+    """
+
+    # number of cached task partitions
+    partitions_cache_size = 1000
+
+    def __init__(self, receiver, workers=2, prefetch=100,
+                 batch_window=0, batch_size=100):
+        self.processed = Queue.Queue()
+        self.partitions = {}
+        self.workers = [
+            RPCWorker(
+                i,
+                receiver,
+                self.processed,
+                prefetch=prefetch,
+                batch_window=batch_window,
+                batch_size=batch_size
+            ) for i in xrange(workers)
+        ]
+
+    def start(self):
+        for worker in self.workers:
+            worker.start()
+
+    def stop(self):
+        for worker in self.workers:
+            worker.join()
+        self.ack_processed()
+
+    def partition_key(self, task_uuid):
+        if task_uuid not in self.partitions:
+            if len(self.partitions) >= self.partitions_cache_size:
+                self.partitions.clear()
+            task = db().query(Task.cluster_id).filter_by(
+                uuid=task_uuid).first()
+            db().commit()
+            if task and task.cluster_id:
+                self.partitions[task_uuid] = 'cluster-%s' % task.cluster_id
+            else:
+                self.partitions[task_uuid] = task_uuid
+        return self.partitions[task_uuid]
+
+    def dispatch(self, body, msg):
+        self.ack_processed()
+        task_uuid = (body.get("args") or {}).get("task_uuid")
+        key = self.partition_key(task_uuid) if task_uuid else None
+        worker = self.workers[hash(key) % len(self.workers)]
+        worker.put(body, msg)
+
+    def ack_processed(self):
+        while True:
+            try:
+                msg = self.processed.get_nowait()
+            except Queue.Empty:
+                break
             msg.ack()
-            db().expire_all()
+
+    def stats(self):
+        return [worker.stats() for worker in self.workers]
 
 
 class RPCKombuThread(threading.Thread):
 
+    # consumer thread running in this process, its stats
+    # are exposed by metrics handler
+    current = None
+
     def __init__(self, rcvr_class=NailgunReceiver):
         super(RPCKombuThread, self).__init__()
         self.stoprequest = threading.Event()
         self.receiver = rcvr_class
         self.connection = None
+        self.pool = None
 
     def join(self, timeout=None):
         self.stoprequest.set()
@@ -68,7 +319,41 @@ class RPCKombuThread(threading.Thread):
         self.consumer.should_stop = True
         super(RPCKombuThread, self).join(timeout)
 
+    def stats(self):
+        """Returns list of workers stats or empty
+        list if messages are processed by one thread
+        """
+        return self.pool.stats() if self.pool else []
+
     def run(self):
+        consumer_settings = settings.RPC_CONSUMER or {}
+        batch_window = float(consumer_settings.get('batch_window', 0))
+        batch_size = int(consumer_settings.get('batch_size', 100))
+        workers = int(consumer_settings.get('workers', 1))
+
+        RPCKombuThread.current = self
         with Connection(rpc.conn_str) as conn:
-            self.consumer = RPCConsumer(conn, self.receiver)
+            self.consumer = RPCConsumer(
+                conn,
+                self.receiver,
+                batch_window=batch_window,
+                batch_size=batch_size
+            )
+            if workers > 1:
+                prefetch = int(consumer_settings.get('prefetch', 100))
+                self.pool = RPCWorkerPool(
+                    self.receiver,
+                    workers=workers,
+                    prefetch=prefetch,
+                    batch_window=batch_window,
+                    batch_size=batch_size
+                )
+                self.pool.start()
+                self.consumer.pool = self.pool
+                # messages are acknowledged only after they are
+                # processed, so don't take more than workers can hold
+                self.consumer.prefetch_count = workers * prefetch
             self.consumer.run()
+            if self.pool:
+                self.pool.stop()
+            self.consumer.flush_batch()
@@ -17,7 +17,10 @@
 import os
 import shutil
 
+from sqlalchemy import case
+from sqlalchemy import func
 from sqlalchemy import or_
+from sqlalchemy.orm import defer
 
 from nailgun.db import db
 from nailgun.db.sqlalchemy.models import IPAddr
@@ -257,7 +260,8 @@ class TaskHelper(object):
         cls.__set_cluster_status(cluster, 'error')
         nodes_to_error = db().query(Node).\
             filter(Node.cluster == cluster).\
-            filter(Node.status.in_(['provisioning']))
+            filter(Node.status.in_(['provisioning'])).\
+            options(defer('meta'))
 
         cls.__set_nodes_status_to_error(nodes_to_error, 'provision')
 
@@ -266,7 +270,8 @@ class TaskHelper(object):
         cls.__set_cluster_status(cluster, 'error')
         nodes_to_error = db().query(Node).\
             filter(Node.cluster == cluster).\
-            filter(Node.status.in_(['provisioned', 'deploying']))
+            filter(Node.status.in_(['provisioned', 'deploying'])).\
+            options(defer('meta'))
 
         cls.__set_nodes_status_to_error(nodes_to_error, 'deploy')
 
@@ -289,38 +294,46 @@ class TaskHelper(object):
             node.progress = 0
             node.error_type = error_type
 
+    @classmethod
+    def _count_nodes(cls, condition):
+        return func.coalesce(
+            func.sum(case([(condition, 1)], else_=0)), 0)
+
+    @classmethod
+    def _sum_progress(cls, condition):
+        return func.coalesce(
+            func.sum(case([(condition, Node.progress)], else_=0)), 0)
+
     @classmethod
     def recalculate_deployment_task_progress(cls, task):
-        cluster_nodes = db().query(Node).filter_by(cluster_id=task.cluster_id)
-        nodes_progress = []
-        nodes_progress.extend(
-            cluster_nodes.filter_by(status='discover').count() * [0])
-        nodes_progress.extend(
-            cluster_nodes.filter_by(online=False).count() * [100])
-
-        # Progress of provisioned node is 0
-        # because deployment not started yet
-        nodes_progress.extend(
-            cluster_nodes.filter_by(status='provisioned').count() * [0])
-
-        nodes_progress.extend([
-            n.progress for n in
-            cluster_nodes.filter(
-                Node.status.in_(['deploying', 'ready']))])
-
-        if nodes_progress:
-            return int(float(sum(nodes_progress)) / len(nodes_progress))
+        """Calculates average progress of nodes of cluster with one
+        aggregate query, so nodes aren't loaded on every message.
+        Progress of discovered and provisioned nodes is 0, because
+        deployment isn't started yet, progress of offline nodes is 100.
+        """
+        in_deployment = Node.status.in_(['deploying', 'ready'])
+        discover, offline, provisioned, deploying, progress = db().query(
+            cls._count_nodes(Node.status == 'discover'),
+            cls._count_nodes(False == Node.online),
+            cls._count_nodes(Node.status == 'provisioned'),
+            cls._count_nodes(in_deployment),
+            cls._sum_progress(in_deployment)
+        ).filter(Node.cluster_id == task.cluster_id).one()
+
+        nodes_count = discover + offline + provisioned + deploying
+        if nodes_count:
+            return int(float(offline * 100 + progress) / nodes_count)
 
     @classmethod
     def recalculate_provisioning_task_progress(cls, task):
-        cluster_nodes = db().query(Node).filter_by(cluster_id=task.cluster_id)
-        nodes_progress = [
-            n.progress for n in
-            cluster_nodes.filter(
-                Node.status.in_(['provisioning', 'provisioned']))]
+        provisioning = Node.status.in_(['provisioning', 'provisioned'])
+        nodes_count, progress = db().query(
+            cls._count_nodes(provisioning),
+            cls._sum_progress(provisioning)
+        ).filter(Node.cluster_id == task.cluster_id).one()
 
-        if nodes_progress:
-            return int(float(sum(nodes_progress)) / len(nodes_progress))
+        if nodes_count:
+            return int(float(progress) / nodes_count)
 
     @classmethod
     def nodes_to_delete(cls, cluster):
@@ -430,9 +443,9 @@ class TaskHelper(object):
         update fqdns, assign admin ips
         """
         cls.update_slave_nodes_fqdn(nodes)
-        for node in nodes:
-            NetworkManager.assign_admin_ips(
-                node.id, len(node.meta.get('interfaces', [])))
+        NetworkManager.assign_admin_ips_to_nodes(dict(
+            (node.id, len(node.meta.get('interfaces', [])))
+            for node in nodes))
 
     @classmethod
     def prepare_for_deployment(cls, nodes):
@@ -447,10 +460,9 @@ class TaskHelper(object):
             netmanager.assign_ips(nodes_ids, 'management')
             netmanager.assign_ips(nodes_ids, 'public')
             netmanager.assign_ips(nodes_ids, 'storage')
-
-            for node in nodes:
-                netmanager.assign_admin_ips(
-                    node.id, len(node.meta.get('interfaces', [])))
+            netmanager.assign_admin_ips_to_nodes(dict(
+                (node.id, len(node.meta.get('interfaces', [])))
+                for node in nodes))
 
     @classmethod
     def raise_if_node_offline(cls, nodes):
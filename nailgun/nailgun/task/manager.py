@@ -155,7 +155,8 @@ class ApplyChangesTaskManager(TaskManager):
                 task_provision,
                 tasks.ProvisionTask,
                 nodes_to_provision,
-                method_name='message'
+                method_name='message',
+                parallel=True
             )
             db().refresh(task_provision)
 
@@ -178,7 +179,8 @@ class ApplyChangesTaskManager(TaskManager):
                 task_deployment,
                 tasks.DeploymentTask,
                 nodes_to_deploy,
-                method_name='message'
+                method_name='message',
+                parallel=True
             )
 
             # if failed to generate task message for orchestrator
@@ -102,7 +102,7 @@ class DeploymentTask(object):
 #   those which are prepared for removal.
 
     @classmethod
-    def message(cls, task, nodes):
+    def message(cls, task, nodes, parallel=False):
         logger.debug("DeploymentTask.message(task=%s)" % task.uuid)
         TaskHelper.raise_if_node_offline(nodes)
 
@@ -126,7 +126,7 @@ class DeploymentTask(object):
 
         # here we replace provisioning data if user redefined them
         serialized_cluster = task.cluster.replaced_deployment_info or \
-            deployment_serializers.serialize(task.cluster, nodes)
+            deployment_serializers.serialize(task.cluster, nodes, parallel)
 
         # After searilization set pending_addition to False
         for node in nodes:
@@ -144,12 +144,12 @@ class DeploymentTask(object):
 class ProvisionTask(object):
 
     @classmethod
-    def message(cls, task, nodes_to_provisioning):
+    def message(cls, task, nodes_to_provisioning, parallel=False):
         logger.debug("ProvisionTask.message(task=%s)" % task.uuid)
         TaskHelper.raise_if_node_offline(nodes_to_provisioning)
         serialized_cluster = task.cluster.replaced_provisioning_info or \
             provisioning_serializers.serialize(
-                task.cluster, nodes_to_provisioning)
+                task.cluster, nodes_to_provisioning, parallel)
 
         for node in nodes_to_provisioning:
             if settings.FAKE_TASKS or settings.FAKE_TASKS_AMQP:
@@ -659,5 +659,8 @@ def dump():
     from shotgun.manager import Manager as ShotgunManager
     logger.debug("Starting snapshot procedure")
     conf = ShotgunConfig(DumpTask.conf())
-    manager = ShotgunManager(conf)
+    # stdout is read by caller, so progress is written to log
+    manager = ShotgunManager(
+        conf,
+        lambda progress: logger.info("Snapshot progress: %s%%", progress))
     print(manager.snapshot())
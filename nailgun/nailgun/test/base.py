@@ -337,8 +337,10 @@ class Environment(object):
                 ip_addr=interface.get('ip'),
                 netmask=interface.get('netmask'))
 
-            self.db.add(interface)
+            # interface is attached before it's added to session,
+            # so autoflush doesn't insert it without node_id
             node.interfaces.append(interface)
+            self.db.add(interface)
 
         # If node in a cluster then add
         # allowed_networks for all interfaces
@@ -553,6 +555,8 @@ class Environment(object):
                     )
                 )
             time.sleep(1)
+        # objects changed by task threads are loaded again
+        self.db.expire_all()
         self.tester.assertEquals(task.progress, 100)
         if isinstance(message, type(re.compile("regexp"))):
             self.tester.assertIsNotNone(re.match(message, task.message))
@@ -589,6 +593,7 @@ class Environment(object):
         while True:
             result = check(*args, **kwargs)
             if result:
+                self.db.expire_all()
                 return result
             if time.time() - start_time > timeout:
                 raise TimeoutError(error_message)
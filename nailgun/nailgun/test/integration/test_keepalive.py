@@ -14,8 +14,11 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from datetime import datetime
+from datetime import timedelta
 import time
 
+from nailgun.db.sqlalchemy.models import Notification
 from nailgun.keepalive.watcher import KeepAliveThread
 from nailgun.test.base import BaseIntegrationTest
 
@@ -58,3 +61,30 @@ class TestKeepalive(BaseIntegrationTest):
         time.sleep(self.watcher.interval + 2)
         self.env.refresh_nodes()
         self.assertEqual(node.online, True)
+
+    def test_offline_node_notification(self):
+        node = self.env.create_node(status="discover",
+                                    roles=["controller"],
+                                    name="Dead or alive")
+
+        self.env.wait_for_true(
+            self.check_online,
+            args=[node, False],
+            timeout=self.timeout)
+        notifications = self.db.query(Notification).filter_by(
+            node_id=node.id
+        ).all()
+        self.assertEquals(len(notifications), 1)
+        self.assertEquals(notifications[0].topic, "error")
+        self.assertEquals(
+            notifications[0].message,
+            u"Node 'Dead or alive' has gone away")
+
+    def test_check_skipped_before_expiration(self):
+        watcher = KeepAliveThread(interval=2, timeout=60)
+        now = datetime.now()
+        self.assertTrue(watcher.need_check(now))
+
+        watcher.update_status_nodes()
+        self.assertFalse(watcher.need_check(now + timedelta(seconds=30)))
+        self.assertTrue(watcher.need_check(now + timedelta(seconds=61)))
@@ -231,6 +231,39 @@ class TestNetworkManager(BaseIntegrationTest):
         self.assertEqual(sorted(networks_keys),
                          sorted(NetworkGroup.NAMES[1:6]))
 
+    def test_network_group_grouping_by_cluster_scoped(self):
+        cluster = self.env.create_cluster(api=True)
+        self.env.create_cluster(api=True)
+        networks = self.env.network_manager.get_networks_grouped_by_cluster(
+            [cluster['id']])
+        self.assertEqual(networks.keys(), [cluster['id']])
+
+    def test_nodes_networks_cached_until_ips_changed(self):
+        self.env.create(
+            cluster_kwargs={},
+            nodes_kwargs=[{"pending_addition": True}]
+        )
+        node = self.env.nodes[0]
+        network_manager = self.env.network_manager
+
+        networks = network_manager.get_nodes_networks([node])[node.id]
+        management = filter(
+            lambda n: n['name'] == 'management', networks)[0]
+        self.assertNotIn('ip', management)
+
+        with patch.object(network_manager,
+                          'get_grouped_ips_by_node') as ips_mock:
+            self.assertEqual(
+                network_manager.get_nodes_networks([node])[node.id],
+                networks)
+            self.assertFalse(ips_mock.called)
+
+        network_manager.assign_ips([node.id], "management")
+        networks = network_manager.get_nodes_networks([node])[node.id]
+        management = filter(
+            lambda n: n['name'] == 'management', networks)[0]
+        self.assertIn('ip', management)
+
     def test_group_by_key_and_history_util(self):
         """Verifies that grouping util will return defaultdict(list) with
         items grouped by user provided func
@@ -311,6 +344,21 @@ class TestNetworkManager(BaseIntegrationTest):
                           filter_by(network=admin_net_id).all()])
         self.assertEquals(admin_ips, admin_ips2)
 
+    def test_assign_admin_ips_to_nodes(self):
+        n1 = self.env.create_node()
+        n2 = self.env.create_node()
+        self.env.network_manager.assign_admin_ips(n1.id, 1)
+        self.env.network_manager.assign_admin_ips_to_nodes(
+            {n1.id: 2, n2.id: 3})
+
+        admin_net_id = self.env.network_manager.get_admin_network_group_id()
+        ips = self.db.query(IPAddr).filter_by(network=admin_net_id).all()
+        self.assertEquals(
+            len(filter(lambda ip: ip.node == n1.id, ips)), 2)
+        self.assertEquals(
+            len(filter(lambda ip: ip.node == n2.id, ips)), 3)
+        self.assertEquals(len(set(ip.ip_addr for ip in ips)), 5)
+
     def test_assign_admin_ips_only_one(self):
         map(self.db.delete, self.db.query(IPAddrRange).all())
         admin_net_id = self.env.network_manager.get_admin_network_group_id()
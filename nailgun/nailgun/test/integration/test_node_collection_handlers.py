@@ -14,12 +14,18 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from datetime import datetime
 import json
 
+from mock import patch
+
+from nailgun.db.sqlalchemy.models import ClusterChanges
 from nailgun.db.sqlalchemy.models import Node
 from nailgun.db.sqlalchemy.models import Notification
 from nailgun.test.base import BaseIntegrationTest
 from nailgun.test.base import reverse
+from nailgun.volumes.cache import VolumeLayoutCache
+from nailgun.volumes.manager import VolumeManager
 
 
 class TestHandlers(BaseIntegrationTest):
@@ -294,6 +300,186 @@ class TestHandlers(BaseIntegrationTest):
         self.assertNotEquals(node.timestamp, timestamp)
         self.assertEquals('new', node.manufacturer)
 
+    def test_agent_batch_update(self):
+        self.env.create_node(api=True)
+        self.env.create_node(api=True, online=False)
+        node1, node2 = self.env.nodes
+        resp = self.app.put(
+            reverse('NodeCollectionHandler'),
+            json.dumps([
+                {'mac': node1.mac, 'manufacturer': 'man1',
+                 'is_agent': True},
+                {'mac': node2.mac, 'manufacturer': 'man2',
+                 'is_agent': True}
+            ]),
+            headers=self.default_headers)
+        self.assertEquals(resp.status, 200)
+        response = json.loads(resp.body)
+        self.assertEquals(
+            sorted([node1.id, node2.id]),
+            sorted([n['id'] for n in response])
+        )
+
+        self.env.refresh_nodes()
+        self.assertEquals(node1.manufacturer, 'man1')
+        self.assertEquals(node2.manufacturer, 'man2')
+        self.assertTrue(node2.online)
+        self.assertEquals(
+            self.db.query(Notification).filter_by(
+                node_id=node2.id,
+                topic='discover'
+            ).filter(
+                Notification.message.like('%back online%')
+            ).count(),
+            1
+        )
+
+    def test_agent_same_meta_skips_interfaces_update(self):
+        meta = self.env.default_metadata()
+        node = self.env.create_node(api=True, meta=meta)
+        node_db = self.db.query(Node).get(node['id'])
+
+        def agent_put():
+            return self.app.put(
+                reverse('NodeCollectionHandler'),
+                json.dumps([{'mac': node_db.mac, 'meta': meta,
+                             'is_agent': True}]),
+                headers=self.default_headers)
+
+        with patch('nailgun.api.handlers.node.NetworkManager.'
+                   'update_interfaces_info') as update_mock:
+            self.assertEquals(agent_put().status, 200)
+            self.assertEquals(update_mock.call_count, 1)
+            self.assertEquals(agent_put().status, 200)
+            self.assertEquals(update_mock.call_count, 1)
+
+        self.db.refresh(node_db)
+        self.assertEquals(node_db.meta_hash, Node.calc_meta_hash(meta))
+
+        # meta updated not by agent resets hash
+        node_db.meta = meta
+        self.db.commit()
+        self.assertIsNone(node_db.meta_hash)
+
+    def test_nodes_membership_batch_update(self):
+        cluster = self.env.create_cluster(api=True)
+        for i in xrange(3):
+            self.env.create_node(api=True)
+        nodes_ids = [node.id for node in self.env.nodes]
+
+        VolumeLayoutCache.clear()
+        generated = []
+        gen_volumes_info = VolumeManager._gen_volumes_info
+
+        def gen_volumes_info_mock(vm):
+            generated.append(vm)
+            return gen_volumes_info(vm)
+
+        with patch.object(VolumeManager, '_gen_volumes_info',
+                          gen_volumes_info_mock):
+            resp = self.app.put(
+                reverse('NodeCollectionHandler'),
+                json.dumps([
+                    {'id': node_id, 'cluster_id': cluster['id'],
+                     'pending_roles': ['compute'], 'pending_addition': True}
+                    for node_id in nodes_ids]),
+                headers=self.default_headers)
+        self.assertEquals(resp.status, 200)
+        self.assertEquals(
+            sorted(nodes_ids), sorted(n['id'] for n in json.loads(resp.body)))
+        # nodes have the same hardware
+        self.assertEquals(len(generated), 1)
+
+        self.env.refresh_nodes()
+        cluster_db = self.env.clusters[0]
+        for node in self.env.nodes:
+            self.assertEquals(node.cluster_id, cluster['id'])
+            self.assertEquals(node.pending_roles, ['compute'])
+            self.assertTrue(node.pending_addition)
+
+            network_manager = cluster_db.network_manager
+            assignment = dict(
+                (nic['id'], sorted(
+                    ng['id'] for ng in nic.get('assigned_networks', [])))
+                for nic in network_manager.get_default_networks_assignment(
+                    node))
+            for nic in node.interfaces:
+                self.assertEquals(
+                    sorted(ng.id for ng in nic.assigned_networks_list),
+                    assignment[nic.id])
+                self.assertEquals(
+                    sorted(ng.id for ng in nic.allowed_networks_list),
+                    sorted(ng.id for ng in
+                           network_manager.get_allowed_nic_networkgroups(
+                               node, nic)))
+
+        changes = self.db.query(ClusterChanges).filter_by(
+            cluster_id=cluster['id'], name='disks').all()
+        self.assertEquals(
+            sorted(ch.node_id for ch in changes), sorted(nodes_ids))
+
+        resp = self.app.put(
+            reverse('NodeCollectionHandler'),
+            json.dumps([
+                {'id': node_id, 'cluster_id': None,
+                 'pending_roles': [], 'pending_addition': False}
+                for node_id in nodes_ids]),
+            headers=self.default_headers)
+        self.assertEquals(resp.status, 200)
+
+        self.env.refresh_nodes()
+        for node in self.env.nodes:
+            self.assertIsNone(node.cluster_id)
+            self.assertEquals(node.pending_roles, [])
+            for nic in node.interfaces:
+                self.assertEquals(nic.assigned_networks_list, [])
+                self.assertEquals(nic.allowed_networks_list, [])
+        self.assertEquals(
+            self.db.query(ClusterChanges).filter(
+                ClusterChanges.node_id.in_(nodes_ids)).count(),
+            0)
+
+    def test_nodes_membership_update_with_unknown_cluster(self):
+        cluster = self.env.create_cluster(api=True)
+        node = self.env.create_node(
+            api=False, cluster_id=cluster['id'], roles=['controller'])
+
+        resp = self.app.put(
+            reverse('NodeCollectionHandler'),
+            json.dumps([{'id': node.id, 'cluster_id': cluster['id'] + 1}]),
+            headers=self.default_headers,
+            expect_errors=True)
+        self.assertEquals(resp.status, 400)
+
+        self.db.refresh(node)
+        self.assertEquals(node.cluster_id, cluster['id'])
+        self.assertEquals(node.roles, ['controller'])
+
+    def test_nodes_membership_update_moves_node_between_clusters(self):
+        cluster_a = self.env.create_cluster(api=True)
+        cluster_b = self.env.create_cluster(api=True)
+        node = self.env.create_node(api=False)
+
+        for data in (
+            {'id': node.id, 'cluster_id': cluster_a['id'],
+             'pending_roles': ['compute'], 'pending_addition': True},
+            {'id': node.id, 'cluster_id': cluster_b['id'],
+             'pending_roles': ['controller']}
+        ):
+            resp = self.app.put(
+                reverse('NodeCollectionHandler'),
+                json.dumps([data]),
+                headers=self.default_headers)
+            self.assertEquals(resp.status, 200)
+
+        self.db.refresh(node)
+        self.assertEquals(node.cluster_id, cluster_b['id'])
+        self.assertEquals(node.pending_roles, ['controller'])
+        changes = self.db.query(ClusterChanges).filter_by(
+            node_id=node.id, name='disks').all()
+        self.assertIn(
+            cluster_b['id'], [ch.cluster_id for ch in changes])
+
     def test_node_create_ext_mac(self):
         node1 = self.env.create_node(
             api=False
@@ -364,3 +550,75 @@ class TestHandlers(BaseIntegrationTest):
             headers=self.default_headers,
             expect_errors=True)
         self.assertEquals(resp.status, 403)
+
+    def test_node_collection_etag(self):
+        node = self.env.create_node(api=False)
+
+        def get_nodes(etag=None):
+            headers = dict(self.default_headers)
+            if etag:
+                headers['If-None-Match'] = etag
+            return self.app.get(
+                reverse('NodeCollectionHandler'),
+                headers=headers,
+                expect_errors=True
+            )
+
+        resp = get_nodes()
+        self.assertEquals(200, resp.status)
+        etag = resp.header('ETag')
+        self.assertEquals(304, get_nodes(etag).status)
+
+        # timestamp isn't rendered, so it doesn't change ETag
+        self.db.query(Node).update({'timestamp': datetime.now()})
+        self.db.commit()
+        self.assertEquals(304, get_nodes(etag).status)
+
+        node.name = 'New name'
+        self.db.commit()
+        resp = get_nodes(etag)
+        self.assertEquals(200, resp.status)
+        self.assertNotEquals(etag, resp.header('ETag'))
+        self.assertEquals(json.loads(resp.body)[0]['name'], 'New name')
+
+    def test_node_collection_filters_and_pagination(self):
+        self.env.create(
+            cluster_kwargs={},
+            nodes_kwargs=[
+                {'roles': ['controller'], 'pending_addition': True},
+                {'roles': ['compute'], 'status': 'ready'},
+                {'roles': ['cinder'], 'online': False},
+            ]
+        )
+        nodes = sorted(self.env.nodes, key=lambda n: n.id)
+
+        def get_nodes(**params):
+            return self.app.get(
+                reverse('NodeCollectionHandler'),
+                params=params,
+                headers=self.default_headers,
+                expect_errors=True
+            )
+
+        resp = get_nodes(roles='controller,cinder', online='true')
+        self.assertEquals(200, resp.status)
+        response = json.loads(resp.body)
+        self.assertEquals([n['id'] for n in response], [nodes[0].id])
+
+        resp = get_nodes(status='ready', pending_addition='false')
+        response = json.loads(resp.body)
+        self.assertEquals([n['id'] for n in response], [nodes[1].id])
+
+        resp = get_nodes(limit=1, marker=nodes[0].id, fields='id,status')
+        self.assertEquals(resp.header('X-Total-Count'), '3')
+        self.assertEquals(
+            json.loads(resp.body), [{'id': nodes[1].id, 'status': 'ready'}])
+
+        resp = get_nodes(fields='id,network_data', offset=2)
+        response = json.loads(resp.body)
+        self.assertEquals(len(response), 1)
+        self.assertEquals(sorted(response[0]), ['id', 'network_data'])
+
+        self.assertEquals(400, get_nodes(online='maybe').status)
+        self.assertEquals(400, get_nodes(fields='id,timestamp').status)
+        self.assertEquals(400, get_nodes(limit='-1').status)
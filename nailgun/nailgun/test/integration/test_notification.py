@@ -163,3 +163,65 @@ class TestNotification(BaseIntegrationTest):
             notifications[0].message,
             "Cluster deletion fake error"
         )
+
+    def test_notifications_of_nodes_are_summarized_in_batch(self):
+        cluster = self.env.create_cluster(api=False)
+        for i in xrange(3):
+            self.env.create_node(cluster_id=cluster.id)
+        task = self.env.create_task(
+            uuid=str(uuid.uuid4()), name="deploy", cluster_id=cluster.id)
+        nodes = self.env.nodes
+
+        with notifier.batch():
+            for node in nodes:
+                notifier.notify(
+                    "error", u"Node {0} failed".format(node.id),
+                    cluster_id=cluster.id, node_id=node.id,
+                    task_uuid=task.uuid, summary=u"{0} nodes failed")
+            # the same notification of node is created once
+            notifier.notify(
+                "error", u"Node {0} failed".format(nodes[0].id),
+                cluster_id=cluster.id, node_id=nodes[0].id,
+                task_uuid=task.uuid, summary=u"{0} nodes failed")
+            notifier.notify("done", "Other message", cluster_id=cluster.id)
+            # nothing is written until batch is finished
+            self.assertEquals(self.db.query(Notification).count(), 0)
+
+        resp = self.app.get(
+            reverse('NotificationCollectionHandler'),
+            headers=self.default_headers)
+        self.assertEquals(resp.status, 200)
+        response = sorted(json.loads(resp.body), key=lambda n: n['message'])
+        self.assertEquals(
+            [n['message'] for n in response],
+            [u"3 nodes failed", u"Other message"])
+        summary = response[0]
+        self.assertEquals(summary['task_id'], task.id)
+        self.assertIsNone(summary['node_id'])
+
+        resp = self.app.get(
+            reverse('NotificationCollectionHandler'),
+            params={'parent_id': summary['id']},
+            headers=self.default_headers)
+        self.assertEquals(resp.status, 200)
+        details = json.loads(resp.body)
+        self.assertEquals(
+            sorted(n['node_id'] for n in details),
+            sorted(node.id for node in nodes))
+        for n in details:
+            self.assertEquals(n['message'], u"Node {0} failed".format(
+                n['node_id']))
+            self.assertEquals(n['task_id'], task.id)
+
+    def test_single_notification_isnt_summarized_in_batch(self):
+        node = self.env.create_node()
+        with notifier.batch():
+            notifier.notify(
+                "error", "Node failed", node_id=node.id,
+                summary=u"{0} nodes failed")
+
+        notifications = self.db.query(Notification).all()
+        self.assertEquals(len(notifications), 1)
+        self.assertEquals(notifications[0].message, "Node failed")
+        self.assertEquals(notifications[0].node_id, node.id)
+        self.assertIsNone(notifications[0].parent_id)
@@ -16,13 +16,17 @@
 
 import json
 
+from mock import patch
 from netaddr import IPRange
+from sqlalchemy import event
 
 from nailgun.db import db
+from nailgun.db.sqlalchemy import engine
 from nailgun.db.sqlalchemy.models import Cluster
 from nailgun.db.sqlalchemy.models import IPAddrRange
 from nailgun.db.sqlalchemy.models import NetworkGroup
 from nailgun.db.sqlalchemy.models import Node
+from nailgun.orchestrator.context import SerializationContext
 from nailgun.orchestrator.deployment_serializers \
     import DeploymentHASerializer
 from nailgun.orchestrator.deployment_serializers \
@@ -34,6 +38,27 @@ from nailgun.test.base import reverse
 from nailgun.volumes import manager
 
 
+class QueriesCounter(object):
+    """Counts SQL statements executed inside of with block
+    """
+
+    active = None
+
+    def __enter__(self):
+        self.count = 0
+        QueriesCounter.active = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        QueriesCounter.active = None
+
+
+@event.listens_for(engine, 'before_cursor_execute')
+def count_query(conn, cursor, statement, parameters, context, executemany):
+    if QueriesCounter.active is not None:
+        QueriesCounter.active.count += 1
+
+
 class OrchestratorSerializerTestBase(BaseIntegrationTest):
     """Class containts helpers."""
 
@@ -100,6 +125,16 @@ class TestNovaOrchestratorSerializer(OrchestratorSerializerTestBase):
                 node_db, serialized_node['role'])
             self.assertEquals(serialized_node, expected_node)
 
+    def test_parallel_serialization(self):
+        serialized = self.serializer.serialize(
+            self.cluster, self.cluster.nodes)
+        with patch.dict(settings.SERIALIZATION,
+                        {'processes': 2, 'min_items': 0}):
+            serialized_in_parallel = self.serializer.serialize(
+                self.cluster, self.cluster.nodes, parallel=True)
+
+        self.assertEquals(serialized, serialized_in_parallel)
+
     def test_serialize_node(self):
         node = self.env.create_node(
             api=True, cluster_id=self.cluster.id, pending_addition=True)
@@ -378,6 +413,16 @@ class TestNeutronOrchestratorSerializer(OrchestratorSerializerTestBase):
                 node_db, serialized_node['role'])
             self.assertEquals(serialized_node, expected_node)
 
+    def test_parallel_serialization(self):
+        serialized = self.serializer.serialize(
+            self.cluster, self.cluster.nodes)
+        with patch.dict(settings.SERIALIZATION,
+                        {'processes': 2, 'min_items': 0}):
+            serialized_in_parallel = self.serializer.serialize(
+                self.cluster, self.cluster.nodes, parallel=True)
+
+        self.assertEquals(serialized, serialized_in_parallel)
+
     def test_serialize_node(self):
         node = self.env.create_node(
             api=True, cluster_id=self.cluster.id, pending_addition=True)
@@ -709,3 +754,46 @@ class TestNeutronOrchestratorHASerializer(OrchestratorSerializerTestBase):
             attrs['mp'],
             [{'point': '1', 'weight': '1'},
              {'point': '2', 'weight': '2'}])
+
+    def test_context_network_data(self):
+        context = SerializationContext(self.cluster)
+        for node in self.cluster.nodes:
+            self.assertEquals(
+                context.get_network_data(node), node.network_data)
+            self.assertEquals(
+                context.get_admin_interface(node), node.admin_interface)
+
+    def test_queries_count_doesnt_depend_on_nodes_count(self):
+        cluster = self.env.create(
+            cluster_kwargs={
+                'mode': 'ha_compact',
+                'net_provider': 'neutron',
+                'net_segment_type': 'vlan'
+            },
+            nodes_kwargs=[
+                {'roles': ['controller'], 'pending_addition': True}
+                for _ in range(3)
+            ] + [
+                {'roles': ['compute', 'cinder'], 'pending_addition': True}
+                for _ in range(9)
+            ]
+        )
+        big_cluster = self.db.query(Cluster).get(cluster['id'])
+        TaskHelper.prepare_for_deployment(big_cluster.nodes)
+
+        with QueriesCounter() as small:
+            self.serializer.serialize(self.cluster, self.cluster.nodes)
+        with QueriesCounter() as big:
+            self.serializer.serialize(big_cluster, big_cluster.nodes)
+
+        self.assertEquals(small.count, big.count)
+
+    def test_parallel_serialization(self):
+        serialized = self.serializer.serialize(
+            self.cluster, self.cluster.nodes)
+        with patch.dict(settings.SERIALIZATION,
+                        {'processes': 2, 'min_items': 0}):
+            serialized_in_parallel = self.serializer.serialize(
+                self.cluster, self.cluster.nodes, parallel=True)
+
+        self.assertEquals(serialized, serialized_in_parallel)
@@ -15,10 +15,13 @@
 #    under the License.
 
 
+from mock import patch
+
 from nailgun.db import db
 from nailgun.db.sqlalchemy.models import Cluster
 from nailgun.db.sqlalchemy.models import Node
 from nailgun.orchestrator.provisioning_serializers import serialize
+from nailgun.settings import settings
 from nailgun.test.base import BaseIntegrationTest
 
 
@@ -44,3 +47,20 @@ class TestProvisioningSerializer(BaseIntegrationTest):
             self.assertEquals(
                 node['kernel_options']['netcfg/choose_interface'],
                 node_db.admin_interface.mac)
+
+    def test_parallel_serialization(self):
+        cluster = self.env.create(
+            cluster_kwargs={'mode': 'multinode'},
+            nodes_kwargs=[
+                {'roles': ['controller'], 'pending_addition': True},
+                {'roles': ['compute'], 'pending_addition': True},
+                {'roles': ['cinder'], 'pending_addition': True}])
+
+        cluster_db = self.db.query(Cluster).get(cluster['id'])
+        serialized_cluster = serialize(cluster_db, cluster_db.nodes)
+        with patch.dict(settings.SERIALIZATION,
+                        {'processes': 2, 'min_items': 0}):
+            serialized_in_parallel = serialize(
+                cluster_db, cluster_db.nodes, parallel=True)
+
+        self.assertEquals(serialized_cluster, serialized_in_parallel)
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+
+#    Copyright 2013 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Benchmark of database usage by main API handlers.
+
+Counts SQL statements and objects populated from rows per request
+with default session and with session which refreshes objects loaded
+in it by every query (NoCacheQuery), as it was done before.
+It flushes the database configured in settings.
+
+Usage: python -m nailgun.test.performance.bench_api_queries [nodes]
+"""
+
+import sys
+
+from paste.fixture import TestApp
+from sqlalchemy import event
+from sqlalchemy.orm import mapper
+from sqlalchemy.orm.query import Query
+
+from nailgun.db import db
+from nailgun.db import flush
+from nailgun.db import NoCacheQuery
+from nailgun.db import syncdb
+from nailgun.db.sqlalchemy import engine
+from nailgun.test.base import Environment
+from nailgun.test.base import reverse
+from nailgun.wsgi import build_app
+
+
+class Counters(object):
+    statements = 0
+    objects = 0
+
+    @classmethod
+    def reset(cls):
+        cls.statements = 0
+        cls.objects = 0
+
+
+@event.listens_for(engine, 'before_cursor_execute')
+def count_statement(conn, cursor, statement, parameters, context,
+                    executemany):
+    Counters.statements += 1
+
+
+@event.listens_for(mapper, 'populate_instance')
+def count_object(mapper, context, row, target, **flags):
+    Counters.objects += 1
+
+
+def get_endpoints(cluster_id):
+    return [
+        ('ReleaseCollectionHandler', {}),
+        ('ClusterCollectionHandler', {}),
+        ('ClusterHandler', {'cluster_id': cluster_id}),
+        ('ClusterAttributesHandler', {'cluster_id': cluster_id}),
+        ('NovaNetworkConfigurationHandler', {'cluster_id': cluster_id}),
+        ('NodeCollectionHandler', {}),
+        ('NodeCollectionNICsHandler', {}),
+        ('TaskCollectionHandler', {}),
+        ('NotificationCollectionHandler', {}),
+    ]
+
+
+def measure(app, endpoints, query_cls, repeat):
+    db.remove()
+    db.configure(query_cls=query_cls)
+    results = []
+    for name, kwargs in endpoints:
+        url = reverse(name, kwargs)
+        # the first request fills caches of application
+        app.get(url)
+        Counters.reset()
+        for _ in xrange(repeat):
+            app.get(url)
+        results.append((
+            name,
+            float(Counters.statements) / repeat,
+            float(Counters.objects) / repeat))
+    return results
+
+
+def main(nodes_count=100, repeat=5):
+    syncdb()
+    flush()
+    app = TestApp(build_app().wsgifunc())
+    env = Environment(app=app)
+    env.upload_fixtures(['admin_network'])
+    cluster = env.create(
+        cluster_kwargs={},
+        nodes_kwargs=[{'pending_addition': True}] * nodes_count)
+    db().commit()
+
+    endpoints = get_endpoints(cluster['id'])
+    before = measure(app, endpoints, NoCacheQuery, repeat)
+    after = measure(app, endpoints, Query, repeat)
+
+    print('{0} nodes, per request:'.format(nodes_count))
+    print('{0:<35} {1:>20} {2:>20}'.format(
+        'handler', 'statements', 'objects populated'))
+    for (name, stmts1, objs1), (_, stmts2, objs2) in zip(before, after):
+        print('{0:<35} {1:>9.1f} -> {2:<8.1f} {3:>9.1f} -> {4:<8.1f}'.format(
+            name, stmts1, stmts2, objs1, objs2))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
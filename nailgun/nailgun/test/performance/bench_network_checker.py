@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+
+#    Copyright 2013 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Benchmark of address spaces checks of network configuration.
+
+Usage: python -m nailgun.test.performance.bench_network_checker [ranges]
+"""
+
+from itertools import combinations
+import sys
+import timeit
+
+import netaddr
+
+from nailgun.network.checker import intersecting_pairs
+from nailgun.network.checker import ip_ranges_intervals
+from nailgun.network.checker import NetworkCheck
+
+
+class BenchNetworkCheck(NetworkCheck):
+    """Checker of given networks, it doesn't use database
+    """
+
+    def __init__(self, networks):
+        self.networks = networks
+        self.result = []
+        self.err_msgs = []
+        self._nodes = []
+
+
+def make_ip_ranges(cidr, ranges_count):
+    """Splits CIDR into given number of adjacent IP ranges
+    """
+    cidr = netaddr.IPNetwork(cidr)
+    size = cidr.size // (ranges_count + 1)
+    return [
+        [str(netaddr.IPAddress(cidr.first + i * size + 2)),
+         str(netaddr.IPAddress(cidr.first + (i + 1) * size))]
+        for i in xrange(ranges_count)
+    ]
+
+
+def make_networks(ranges_count):
+    networks = [
+        {'id': 1, 'name': 'admin (PXE)', 'cidr': '10.20.0.0/24',
+         'ip_ranges': [], 'vlan_start': None},
+        {'id': 2, 'name': 'public', 'cidr': '172.16.0.0/16',
+         'gateway': '172.16.0.1', 'netmask': '255.255.0.0',
+         'ip_ranges': make_ip_ranges('172.16.0.0/17', ranges_count),
+         'vlan_start': 100},
+        {'id': 3, 'name': 'floating', 'cidr': '172.16.128.0/17',
+         'ip_ranges': make_ip_ranges('172.16.128.0/17', ranges_count),
+         'vlan_start': 100},
+        {'id': 4, 'name': 'management', 'cidr': '192.168.0.0/24',
+         'ip_ranges': [], 'vlan_start': 101},
+        {'id': 5, 'name': 'storage', 'cidr': '192.168.1.0/24',
+         'ip_ranges': [], 'vlan_start': 102},
+        {'id': 6, 'name': 'fixed', 'cidr': '10.0.0.0/16',
+         'ip_ranges': [], 'vlan_start': 103},
+    ]
+    return networks
+
+
+def pairwise_intersections(intervals):
+    """Intersection of every pair of intervals, it's what checker
+    did before intervals were swept
+    """
+    return [
+        (i, j) for i, j in combinations(xrange(len(intervals)), 2)
+        if intervals[i][0] <= intervals[j][1] and
+        intervals[j][0] <= intervals[i][1]
+    ]
+
+
+def bench(name, func, number=3):
+    seconds = min(timeit.repeat(func, number=1, repeat=number))
+    print('{0:<50} {1:>10.4f} s'.format(name, seconds))
+
+
+def main(ranges_count=2000):
+    networks = make_networks(ranges_count)
+    intervals = ip_ranges_intervals(networks[2]['ip_ranges'])
+    print('{0} IP ranges in public and floating networks'.format(
+        ranges_count))
+
+    bench('sweep of floating ranges',
+          lambda: intersecting_pairs(intervals))
+    bench('pairwise comparison of floating ranges',
+          lambda: pairwise_intersections(intervals))
+    bench('check_public_floating_ranges_intersection',
+          lambda: BenchNetworkCheck(
+              make_networks(ranges_count)
+          ).check_public_floating_ranges_intersection())
+    bench('check_network_address_spaces_intersection',
+          lambda: BenchNetworkCheck(
+              networks).check_network_address_spaces_intersection())
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+#    Copyright 2013 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import json
+
+from mock import patch
+
+from nailgun.db.sqlalchemy.models import Task
+from nailgun.db.sqlalchemy.models import fields
+from nailgun.db.sqlalchemy.models.fields import CompressedJSON
+from nailgun.db.sqlalchemy.models.fields import get_json_codec
+from nailgun.db.sqlalchemy.models.fields import JSON
+from nailgun.test.base import BaseIntegrationTest
+
+
+class TestJSONCodec(BaseIntegrationTest):
+
+    def test_codec_is_imported_by_name(self):
+        self.assertIs(get_json_codec('json'), json)
+
+    def test_json_is_used_if_codec_cant_be_imported(self):
+        self.assertIs(get_json_codec('not_existing_json_codec'), json)
+
+    def test_json_field_uses_codec(self):
+        field = JSON()
+        with patch.object(fields, 'codec') as codec:
+            codec.dumps.return_value = '{}'
+            codec.loads.return_value = {}
+
+            self.assertEquals(field.process_bind_param({}, None), '{}')
+            self.assertEquals(field.process_result_value('{}', None), {})
+
+        codec.dumps.assert_called_once_with({})
+        codec.loads.assert_called_once_with('{}')
+
+
+class TestCompressedJSON(BaseIntegrationTest):
+
+    def test_small_value_is_not_compressed(self):
+        field = CompressedJSON(min_size=100)
+        value = field.process_bind_param({'a': 1}, None)
+
+        self.assertEquals(value, '{"a": 1}')
+        self.assertEquals(field.process_result_value(value, None), {'a': 1})
+
+    def test_big_value_is_compressed(self):
+        field = CompressedJSON(min_size=100)
+        data = {'nodes': [{'uid': str(i), 'role': 'compute'}
+                          for i in xrange(100)]}
+        value = field.process_bind_param(data, None)
+
+        self.assertTrue(value.startswith(CompressedJSON.prefix))
+        self.assertTrue(len(value) < len(json.dumps(data)) / 4)
+        self.assertEquals(field.process_result_value(value, None), data)
+
+    def test_task_cache_is_compressed_and_deferred(self):
+        cache = {'args': {'nodes': [{'uid': str(i), 'role': 'compute'}
+                                    for i in xrange(1000)]}}
+        task = self.env.create_task(name='deployment', cache=cache)
+        task_id = task.id
+        self.db.expunge_all()
+
+        raw = self.db.execute(
+            'SELECT cache FROM tasks WHERE id = :id', {'id': task_id}
+        ).scalar()
+        self.assertTrue(raw.startswith(CompressedJSON.prefix))
+
+        task = self.db.query(Task).get(task_id)
+        self.assertNotIn('cache', task.__dict__)
+        self.assertEquals(task.cache, cache)
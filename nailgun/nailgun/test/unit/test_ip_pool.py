@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+
+#    Copyright 2013 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from mock import Mock
+
+from nailgun.errors import errors
+from nailgun.network.ip_pool import IPPool
+from nailgun.test.base import BaseUnitTest
+
+
+class TestIPPool(BaseUnitTest):
+
+    def network_group(self, ranges, gateway=None):
+        return Mock(
+            ip_ranges=[Mock(first=first, last=last) for first, last in ranges],
+            gateway=gateway
+        )
+
+    def test_take_skips_used_and_gateway(self):
+        ng = self.network_group(
+            [('10.0.0.1', '10.0.0.5'), ('10.0.1.1', '10.0.1.3')],
+            gateway='10.0.0.1')
+        pool = IPPool(ng, used_ips=['10.0.0.2', '10.0.0.4', '192.168.0.1'])
+
+        self.assertEquals(pool.take(3), ['10.0.0.3', '10.0.0.5', '10.0.1.1'])
+        self.assertEquals(pool.take(2), ['10.0.1.2', '10.0.1.3'])
+        self.assertRaises(errors.OutOfIPs, pool.take)
+
+    def test_taking_one_by_one_gives_the_same_ips(self):
+        ranges = [('10.0.0.1', '10.0.0.20'), ('10.0.1.1', '10.0.1.20')]
+        used_ips = ['10.0.0.%d' % i for i in xrange(1, 20, 3)]
+
+        ips = IPPool(self.network_group(ranges), used_ips).take(30)
+        pool = IPPool(self.network_group(ranges), used_ips)
+        self.assertEquals([pool.take()[0] for i in xrange(30)], ips)
+
+    def test_overlapping_ranges_give_unique_ips(self):
+        ng = self.network_group(
+            [('10.0.0.1', '10.0.0.10'), ('10.0.0.5', '10.0.0.12')])
+        pool = IPPool(ng, used_ips=[])
+
+        ips = pool.take(12)
+        self.assertEquals(len(set(ips)), 12)
+        self.assertEquals(ips[-1], '10.0.0.12')
+        self.assertRaises(errors.OutOfIPs, pool.take)
+
+    def test_contains(self):
+        ng = self.network_group(
+            [('10.0.0.1', '10.0.0.1'), ('10.0.0.10', '10.0.0.20')])
+        pool = IPPool(ng, used_ips=[])
+
+        self.assertIn('10.0.0.1', pool)
+        self.assertIn('10.0.0.10', pool)
+        self.assertIn('10.0.0.20', pool)
+        self.assertNotIn('10.0.0.2', pool)
+        self.assertNotIn('10.0.0.21', pool)
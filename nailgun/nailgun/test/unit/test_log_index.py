@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+
+#    Copyright 2013 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import calendar
+import os
+import shutil
+import tempfile
+import time
+
+from nailgun.logindex.index import LogIndex
+from nailgun.test.base import BaseUnitTest
+
+
+class TestLogIndex(BaseUnitTest):
+
+    log_config = {
+        'regexp': (r'^(?P<date>\d{4}-\d{2}-\d{2}\s\d{2}:\d{2}:\d{2}):'
+                   '(?P<level>\w+):(?P<text>.+)$'),
+        'date_format': '%Y-%m-%d %H:%M:%S',
+        'skip_regexp': '^SKIP',
+        'multiline': True
+    }
+
+    def setUp(self):
+        super(TestLogIndex, self).setUp()
+        self.log_dir = tempfile.mkdtemp()
+        self.log_file = os.path.join(self.log_dir, 'test.log')
+        self.index_dir = os.path.join(self.log_dir, 'index')
+
+    def tearDown(self):
+        shutil.rmtree(self.log_dir)
+        super(TestLogIndex, self).tearDown()
+
+    def write(self, lines, mode='a'):
+        with open(self.log_file, mode) as f:
+            f.write(''.join(lines))
+
+    def entries(self, index, **kwargs):
+        found, _ = index.find(**kwargs)
+        with open(self.log_file) as f:
+            return [index.read(f, num)[1:] for num in found]
+
+    def timestamp(self, date):
+        return calendar.timegm(
+            time.strptime(date, self.log_config['date_format']))
+
+    def test_incremental_update(self):
+        self.write([
+            '2013-10-01 10:00:00:INFO:first\n',
+            'SKIP me\n',
+            '2013-10-01 10:00:01:ERROR:second\n',
+            'continued\n',
+        ], 'w')
+        index = LogIndex(self.log_file, self.log_config, self.index_dir)
+        index.update()
+        self.assertEquals(self.entries(index), [
+            ('ERROR', 'second\ncontinued'),
+            ('INFO', 'first')])
+
+        self.write([
+            'continued again\n',
+            '2013-10-01 10:00:02:DEBUG:third\n',
+            '2013-10-01 10:00:03:ERR',
+        ])
+        index.update()
+        self.assertEquals(self.entries(index), [
+            ('DEBUG', 'third'),
+            ('ERROR', 'second\ncontinued\ncontinued again'),
+            ('INFO', 'first')])
+        # last line is not finished yet
+        self.assertEquals(
+            index.size,
+            os.stat(self.log_file).st_size - len('2013-10-01 10:00:03:ERR'))
+
+        # index is loaded from storage by another instance
+        index = LogIndex(self.log_file, self.log_config, self.index_dir)
+        index.update()
+        self.assertEquals(len(index), 3)
+        self.assertEquals(
+            self.entries(index, levels=['ERROR', 'INFO'], limit=1),
+            [('ERROR', 'second\ncontinued\ncontinued again')])
+        self.assertEquals(
+            self.entries(
+                index,
+                date_after=self.timestamp('2013-10-01 10:00:00'),
+                date_before=self.timestamp('2013-10-01 10:00:02')),
+            [('ERROR', 'second\ncontinued\ncontinued again')])
+
+    def test_truncated_file_is_reindexed(self):
+        self.write([
+            '2013-10-01 10:00:00:INFO:first\n',
+            '2013-10-01 10:00:01:INFO:second\n',
+        ], 'w')
+        index = LogIndex(self.log_file, self.log_config, self.index_dir)
+        index.update()
+        self.assertEquals(len(index), 2)
+
+        self.write(['2013-10-01 11:00:00:ERROR:rotated\n'], 'w')
+        index.update()
+        self.assertEquals(self.entries(index), [('ERROR', 'rotated')])
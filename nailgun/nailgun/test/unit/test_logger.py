@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+#    Copyright 2013 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import logging
+import re
+from StringIO import StringIO
+
+from mock import Mock
+from mock import patch
+
+from nailgun.logger import BufferedHandler
+from nailgun.logger import HTTPLoggerMiddleware
+from nailgun.logger import PeekedInput
+from nailgun.test.base import BaseUnitTest
+
+
+class TestPeekedInput(BaseUnitTest):
+
+    def test_read_returns_whole_body(self):
+        stream = PeekedInput('line1\nli', StringIO('ne2\nline3'))
+        self.assertEquals(stream.read(4), 'line')
+        self.assertEquals(stream.readline(), '1\n')
+        self.assertEquals(stream.readline(), 'line2\n')
+        self.assertEquals(stream.read(), 'line3')
+
+
+class TestBufferedHandler(BaseUnitTest):
+
+    def test_records_are_written_by_target(self):
+        target = Mock()
+        handler = BufferedHandler(target)
+        record = logging.makeLogRecord({'msg': 'message'})
+        handler.handle(record)
+        handler.flush()
+
+        target.handle.assert_called_once_with(record)
+
+
+class TestHTTPLoggerMiddleware(BaseUnitTest):
+
+    def make_env(self, method, path, body=''):
+        return {
+            'REQUEST_METHOD': method,
+            'PATH_INFO': path,
+            'REQUEST_URI': path,
+            'REMOTE_ADDR': '10.20.0.2',
+            'REMOTE_PORT': '40000',
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.input': StringIO(body)
+        }
+
+    def call(self, env, status='200 OK', sampling=()):
+        def application(env, start_response):
+            self.body = env['wsgi.input'].read(
+                int(env['CONTENT_LENGTH']))
+            start_response(status, [])
+            return ['response']
+
+        with patch('nailgun.logger.make_api_logger') as make_api_logger:
+            make_api_logger.return_value = logging.getLogger('test-api')
+            make_api_logger.return_value.setLevel(logging.DEBUG)
+            middleware = HTTPLoggerMiddleware(application)
+        middleware.body_size = 4
+        middleware.sampling = sampling
+        middleware.api_logger = Mock(wraps=middleware.api_logger)
+
+        result = middleware(env, Mock())
+        self.assertEquals(list(result), ['response'])
+        result.close()
+        return middleware.api_logger
+
+    def test_body_is_truncated_in_log(self):
+        api_logger = self.call(self.make_env('PUT', '/api/nodes', '123456'))
+
+        self.assertEquals(self.body, '123456')
+        args = api_logger.log.call_args[0]
+        self.assertEquals(args[0], logging.DEBUG)
+        self.assertEquals(args[7], len('response'))
+        self.assertEquals(args[-1], '1234... (6 bytes)')
+
+    def test_not_sampled_request_is_logged_only_if_failed(self):
+        sampling = [(re.compile('^PUT /api/nodes$'), 0)]
+        env = self.make_env('PUT', '/api/nodes', '123456')
+        api_logger = self.call(env, sampling=sampling)
+        self.assertFalse(api_logger.log.called)
+
+        env = self.make_env('PUT', '/api/nodes', '123456')
+        api_logger = self.call(
+            env, status='500 Internal Server Error', sampling=sampling)
+        args = api_logger.log.call_args[0]
+        self.assertEquals(args[0], logging.ERROR)
+        self.assertEquals(args[-1], '')
@@ -65,7 +65,11 @@ class TestLogs(BaseIntegrationTest):
                     'levels': [],
                     'path': 'test-syslog.log'
                 }
-            ]
+            ],
+            'LOG_INDEX': dict(
+                settings.LOG_INDEX,
+                dir=os.path.join(self.log_dir, 'index')
+            )
         })
 
     def tearDown(self):
@@ -177,6 +181,69 @@ class TestLogs(BaseIntegrationTest):
         self.assertEquals(response['entries'], log_entries)
         settings.LOGS[0]['multiline'] = False
 
+    def test_log_entries_filtered_by_level(self):
+        settings.LOGS[0]['levels'] = ['DEBUG', 'INFO', 'ERROR']
+        date = time.strftime(settings.UI_LOG_DATE_FORMAT)
+        log_entries = [
+            [date, 'INFO', 'text1'],
+            [date, 'DEBUG', 'text2'],
+            [date, 'ERROR', 'text3'],
+            [date, 'DEBUG', 'text4'],
+        ]
+        self._create_logfile_for_node(settings.LOGS[0], log_entries)
+
+        resp = self.app.get(
+            reverse('LogEntryCollectionHandler'),
+            params={'source': settings.LOGS[0]['id'], 'level': 'INFO'},
+            headers=self.default_headers
+        )
+        self.assertEquals(200, resp.status)
+        response = json.loads(resp.body)
+        response['entries'].reverse()
+        self.assertEquals(
+            response['entries'], [log_entries[0], log_entries[2]])
+        settings.LOGS[0]['levels'] = []
+
+    def test_log_entries_appended_to_file(self):
+        date = time.strftime(settings.UI_LOG_DATE_FORMAT)
+        log_entries = [
+            [date, 'LEVEL111', 'text1'],
+            [date, 'LEVEL222', 'text2'],
+        ]
+        self._create_logfile_for_node(settings.LOGS[0], log_entries[:1])
+
+        resp = self.app.get(
+            reverse('LogEntryCollectionHandler'),
+            params={'source': settings.LOGS[0]['id'], 'truncate_log': 1},
+            headers=self.default_headers
+        )
+        response = json.loads(resp.body)
+        self.assertEquals(response['entries'], log_entries[:1])
+        self.assertFalse(response['has_more'])
+
+        with open(settings.LOGS[0]['path'], 'a') as f:
+            f.write(':'.join(log_entries[1]) + '\n')
+        resp = self.app.get(
+            reverse('LogEntryCollectionHandler'),
+            params={'source': settings.LOGS[0]['id'],
+                    'to': response['to']},
+            headers=self.default_headers
+        )
+        response = json.loads(resp.body)
+        self.assertEquals(response['entries'], log_entries[1:])
+        self.assertEquals(
+            response['to'], os.stat(settings.LOGS[0]['path']).st_size)
+
+        # log file is truncated and written again
+        self._create_logfile_for_node(settings.LOGS[0], log_entries[1:])
+        resp = self.app.get(
+            reverse('LogEntryCollectionHandler'),
+            params={'source': settings.LOGS[0]['id'], 'truncate_log': 1},
+            headers=self.default_headers
+        )
+        response = json.loads(resp.body)
+        self.assertEquals(response['entries'], log_entries[1:])
+
     def test_backward_reader(self):
         f = tempfile.TemporaryFile(mode='r+')
         forward_lines = []
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+
+#    Copyright 2013 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import json
+from mock import patch
+
+from nailgun.db.sqlalchemy.models import Node
+from nailgun.db.sqlalchemy.statements import StatementsStats
+from nailgun.test.base import BaseIntegrationTest
+from nailgun.test.base import reverse
+
+
+class TestMetricsHandler(BaseIntegrationTest):
+
+    def test_metrics_handler(self):
+        resp = self.app.get(
+            reverse('MetricsHandler'),
+            headers=self.default_headers
+        )
+        self.assertEqual(200, resp.status)
+        metrics = json.loads(resp.body)
+        self.assertGreater(metrics['database']['statements'], 0)
+        self.assertEqual(
+            sorted(metrics['database']['pool']),
+            ['checked_in', 'checked_out', 'overflow', 'size'])
+        self.assertEqual(metrics['rpc_workers'], [])
+
+    def test_statements_of_thread_are_counted(self):
+        self.db.commit()
+        StatementsStats.start()
+        self.db.query(Node).all()
+        self.db.query(Node).count()
+        count, _ = StatementsStats.current()
+        self.assertEqual(count, 2)
+
+    @patch('nailgun.db.sqlalchemy.statements.logger')
+    @patch('nailgun.db.sqlalchemy.statements.settings.DATABASE_METRICS',
+           {'slow_statement_time': 0.000001})
+    def test_slow_statements_are_logged(self, logger):
+        self.db.commit()
+        slow_count = StatementsStats.slow_count
+        self.db.query(Node).all()
+        self.assertEqual(StatementsStats.slow_count, slow_count + 1)
+        self.assertTrue(logger.warning.called)
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+
+#    Copyright 2013 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from itertools import combinations
+
+from nailgun.network.checker import intersecting_pairs
+from nailgun.network.checker import ip_ranges_intervals
+from nailgun.network.checker import ranges_pairs_to_check
+from nailgun.test.base import BaseUnitTest
+
+
+class TestIntervals(BaseUnitTest):
+
+    intervals = [(10, 20), (0, 5), (15, 30), (5, 5), (40, 50), (20, 20)]
+
+    def test_intersecting_pairs(self):
+        expected = [
+            (i, j) for i, j in combinations(range(len(self.intervals)), 2)
+            if self.intervals[i][0] <= self.intervals[j][1] and
+            self.intervals[j][0] <= self.intervals[i][1]
+        ]
+        self.assertEquals(intersecting_pairs(self.intervals), expected)
+        self.assertEquals(
+            expected, [(0, 2), (0, 5), (1, 3), (2, 5)])
+
+    def test_ranges_pairs_to_check(self):
+        pairs = ranges_pairs_to_check([(0, 5), (3, 8), (10, 20)], 15)
+        self.assertEquals(pairs, [
+            (0, 1, True, False),
+            (0, 2, False, True),
+            (1, 2, False, True)])
+
+    def test_ip_ranges_intervals(self):
+        self.assertEquals(
+            ip_ranges_intervals([['10.0.0.1', '10.0.0.10']]),
+            [(167772161, 167772170)])
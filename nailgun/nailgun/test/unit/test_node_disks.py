@@ -22,10 +22,12 @@ import string
 from nailgun.errors import errors
 from nailgun.test.base import BaseIntegrationTest
 from nailgun.test.base import reverse
+from nailgun.volumes.cache import VolumeLayoutCache
 from nailgun.volumes.manager import Disk
 from nailgun.volumes.manager import DisksFormatConvertor
 from nailgun.volumes.manager import only_disks
 from nailgun.volumes.manager import only_vg
+from nailgun.volumes.manager import VolumeManager
 
 
 class TestNodeDisksHandlers(BaseIntegrationTest):
@@ -243,7 +245,7 @@ class TestNodeDefaultsDisksHandler(BaseIntegrationTest):
         response = self.get(node_db.id)
         self.assertEquals(len(response), 6)
 
-        new_meta = node_db.meta.copy()
+        new_meta = deepcopy(node_db.meta)
         new_meta['disks'].append({
             'size': 1000022933376,
             'model': 'SAMSUNG B00B135',
@@ -559,7 +561,7 @@ class TestVolumeManager(BaseIntegrationTest):
         return node, min_installation_size
 
     def update_node_with_single_disk(self, node, size):
-        new_meta = node.meta.copy()
+        new_meta = deepcopy(node.meta)
         new_meta['disks'] = [{
             # convert mbytes to bytes
             'size': size * (1024 ** 2),
@@ -576,7 +578,7 @@ class TestVolumeManager(BaseIntegrationTest):
             headers=self.default_headers)
 
     def add_disk_to_node(self, node, size):
-        new_meta = node.meta.copy()
+        new_meta = deepcopy(node.meta)
         last_disk = [d['name'][-1] for d in new_meta['disks']][-1]
         new_disk = string.letters.index(last_disk) + 1
 
@@ -689,6 +691,66 @@ class TestVolumeManager(BaseIntegrationTest):
         self.update_ram_and_assert_swap_size(node, 81920, 4096)
 
 
+class TestVolumeLayoutCache(BaseIntegrationTest):
+
+    def setUp(self):
+        super(TestVolumeLayoutCache, self).setUp()
+        VolumeLayoutCache.clear()
+
+    def test_layout_is_generated_once_for_identical_nodes(self):
+        generated = []
+        gen_volumes_info = VolumeManager._gen_volumes_info
+
+        def gen_volumes_info_mock(vm):
+            generated.append(vm)
+            return gen_volumes_info(vm)
+
+        with patch.object(VolumeManager, '_gen_volumes_info',
+                          gen_volumes_info_mock):
+            self.env.create(
+                cluster_kwargs={},
+                nodes_kwargs=[{'roles': ['compute']} for i in xrange(10)])
+
+        self.assertEquals(len(generated), 1)
+        volumes = [node.attributes.volumes for node in self.env.nodes]
+        self.assertTrue(all(v == volumes[0] for v in volumes))
+
+    def test_layout_depends_on_roles_and_hardware(self):
+        self.env.create(
+            cluster_kwargs={},
+            nodes_kwargs=[{'roles': ['compute']},
+                          {'roles': ['cinder']}])
+        compute, cinder = self.env.nodes
+        self.assertNotEquals(compute.attributes.volumes,
+                             cinder.attributes.volumes)
+
+        # swap of nodes with more than 64 GB of RAM is 4 GB,
+        # for 6 GB of RAM it's 6 GB
+        meta = deepcopy(compute.meta)
+        meta['memory']['total'] = 6 * 1024 ** 3
+        compute.meta = meta
+        self.db.commit()
+        self.assertNotEquals(compute.volume_manager.gen_volumes_info(),
+                             compute.attributes.volumes)
+
+    def test_cached_layout_isnt_changed_by_callers(self):
+        node = self.env.create_node(roles=['compute'])
+        volumes = node.volume_manager.gen_volumes_info()
+        only_disks(volumes)[0]['volumes'] = []
+
+        self.assertEquals(node.volume_manager.gen_volumes_info(),
+                          node.attributes.volumes)
+
+    def test_cache_is_cleared_when_release_volumes_changed(self):
+        cluster = self.env.create_cluster(api=False)
+        self.env.create_node(cluster_id=cluster.id, roles=['compute'])
+        self.assertTrue(VolumeLayoutCache.cache)
+
+        cluster.release.volumes_metadata = deepcopy(
+            cluster.release.volumes_metadata)
+        self.assertFalse(VolumeLayoutCache.cache)
+
+
 class TestDisks(BaseIntegrationTest):
 
     def get_boot(self, volumes):
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+
+#    Copyright 2013 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from mock import patch
+
+from nailgun.errors import errors
+from nailgun.orchestrator import parallel
+from nailgun.settings import settings
+from nailgun.test.base import BaseUnitTest
+
+
+class Calls(object):
+
+    @classmethod
+    def double(cls, value):
+        return value * 2
+
+    @classmethod
+    def get_key(cls, key):
+        return {}[key]
+
+    @classmethod
+    def check_space(cls, space):
+        raise errors.NotEnoughFreeSpace(
+            "Not enough free space: {0}".format(space))
+
+
+class TestParallel(BaseUnitTest):
+
+    def map_method(self, method_name, items):
+        with patch.dict(settings.SERIALIZATION, {'processes': 2}):
+            return parallel.map_method(Calls, method_name, items)
+
+    def test_results_are_in_order_of_items(self):
+        self.assertEquals(
+            self.map_method('double', [(i,) for i in range(10)]),
+            [i * 2 for i in range(10)])
+
+    def test_nailgun_error_of_worker_is_raised(self):
+        self.assertRaisesRegexp(
+            errors.NotEnoughFreeSpace,
+            "Not enough free space: 10",
+            self.map_method, 'check_space', [(10,)])
+
+    def test_builtin_error_of_worker_is_raised_as_unknown(self):
+        self.assertRaisesRegexp(
+            errors.UnknownError,
+            "KeyError: 'volumes'",
+            self.map_method, 'get_key', [('volumes',)])
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+
+#    Copyright 2013 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import signal
+
+from mock import call
+from mock import Mock
+from mock import patch
+
+from nailgun.prefork import PreforkServer
+from nailgun.test.base import BaseUnitTest
+
+
+class TestPreforkServer(BaseUnitTest):
+
+    def make_server(self):
+        server = PreforkServer(
+            Mock(), ('127.0.0.1', 8000), 2, Mock(), Mock(), stop_timeout=0)
+        server.socket = Mock()
+        server.children = {10: server.WORKER, 11: server.SERVICES}
+        return server
+
+    @patch('nailgun.prefork.os.waitpid', side_effect=[(10, 256), (0, 0)])
+    def test_exited_child_is_started_again(self, waitpid):
+        server = self.make_server()
+        with patch.object(server, 'spawn') as spawn:
+            server.reap()
+
+        spawn.assert_called_once_with(server.WORKER)
+        self.assertEquals(server.children, {11: server.SERVICES})
+
+    @patch('nailgun.prefork.os.kill')
+    def test_children_which_dont_stop_are_killed(self, kill):
+        server = self.make_server()
+        server.stop()
+
+        self.assertEquals(sorted(kill.call_args_list), sorted([
+            call(10, signal.SIGTERM), call(11, signal.SIGTERM),
+            call(10, signal.SIGKILL), call(11, signal.SIGKILL)]))
+        self.assertTrue(server.socket.close.called)
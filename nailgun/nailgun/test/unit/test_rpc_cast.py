@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+
+#    Copyright 2013 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from mock import MagicMock
+from mock import patch
+
+import nailgun.rpc as rpc
+from nailgun.test.base import BaseUnitTest
+
+
+class TestRPCCast(BaseUnitTest):
+
+    def setUp(self):
+        super(TestRPCCast, self).setUp()
+        rpc._connection = None
+
+    def tearDown(self):
+        rpc._connection = None
+        super(TestRPCCast, self).tearDown()
+
+    @patch('nailgun.rpc.producers', new_callable=MagicMock)
+    @patch('nailgun.rpc.Connection')
+    def test_connection_is_reused(self, conn_mock, producers_mock):
+        rpc.cast('naily', {'method': 'deploy'})
+        rpc.cast('naily', {'method': 'provision'})
+
+        self.assertEquals(conn_mock.call_count, 1)
+        producer = producers_mock.__getitem__.return_value.\
+            acquire.return_value.__enter__.return_value
+        publish = producer.connection.ensure.return_value
+        self.assertEquals(publish.call_count, 2)
+        self.assertEquals(
+            publish.call_args[0][0], {'method': 'provision'})
+        self.assertEquals(publish.call_args[1]['routing_key'], 'naily')
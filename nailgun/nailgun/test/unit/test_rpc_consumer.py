@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+
+#    Copyright 2013 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from mock import Mock
+
+from nailgun.rpc.threaded import RPCConsumer
+from nailgun.rpc.threaded import RPCWorkerPool
+from nailgun.test.base import BaseUnitTest
+
+
+class TestRPCConsumerBatching(BaseUnitTest):
+
+    def deploy_msg(self, task_uuid, nodes=None, **kwargs):
+        args = {'task_uuid': task_uuid, 'nodes': nodes or []}
+        args.update(kwargs)
+        return {'method': 'deploy_resp', 'args': args}
+
+    def test_merge_bodies_latest_value_wins(self):
+        merged = RPCConsumer.merge_bodies([
+            self.deploy_msg(
+                'uuid',
+                [{'uid': 1, 'progress': 10, 'status': 'deploying'},
+                 {'uid': 2, 'progress': 20}],
+                progress=15),
+            self.deploy_msg('uuid', [{'uid': 1, 'progress': 50}]),
+            self.deploy_msg('uuid', [], status='running', error=None),
+        ])
+
+        self.assertEquals(merged['method'], 'deploy_resp')
+        self.assertEquals(merged['args']['status'], 'running')
+        self.assertEquals(merged['args']['nodes'], [
+            {'uid': 1, 'progress': 50, 'status': 'deploying'},
+            {'uid': 2, 'progress': 20}])
+        # nodes were reported after task progress,
+        # so it should be recalculated by receiver
+        self.assertNotIn('progress', merged['args'])
+        self.assertNotIn('error', merged['args'])
+
+    def test_batch_is_applied_once_per_task(self):
+        receiver = Mock()
+        consumer = RPCConsumer(None, receiver, batch_window=10)
+        msgs = [Mock() for _ in range(4)]
+
+        consumer.consume_msg(
+            self.deploy_msg('uuid1', [{'uid': 1, 'progress': 10}]), msgs[0])
+        consumer.consume_msg(
+            self.deploy_msg('uuid2', [{'uid': 2, 'progress': 10}]), msgs[1])
+        consumer.consume_msg(
+            self.deploy_msg('uuid1', [{'uid': 1, 'progress': 30}]), msgs[2])
+        self.assertFalse(receiver.deploy_resp.called)
+        self.assertFalse(any(msg.ack.called for msg in msgs))
+
+        # not batchable message flushes batch before it's applied
+        consumer.consume_msg(
+            {'method': 'remove_nodes_resp', 'args': {'task_uuid': 'uuid3'}},
+            msgs[3])
+
+        self.assertEquals(receiver.deploy_resp.call_count, 2)
+        first_call = receiver.deploy_resp.call_args_list[0]
+        self.assertEquals(first_call[1]['task_uuid'], 'uuid1')
+        self.assertEquals(first_call[1]['nodes'], [{'uid': 1, 'progress': 30}])
+        self.assertEquals(receiver.remove_nodes_resp.call_count, 1)
+        self.assertTrue(all(msg.ack.called for msg in msgs))
+
+    def test_batching_disabled(self):
+        receiver = Mock()
+        consumer = RPCConsumer(None, receiver)
+        msg = Mock()
+
+        consumer.consume_msg(self.deploy_msg('uuid1'), msg)
+
+        self.assertEquals(receiver.deploy_resp.call_count, 1)
+        self.assertTrue(msg.ack.called)
+
+
+class TestRPCWorkerPool(BaseUnitTest):
+
+    def test_messages_of_one_task_processed_in_order(self):
+        calls = []
+        receiver = Mock()
+        receiver.deploy_resp.side_effect = \
+            lambda **kwargs: calls.append(
+                (kwargs['task_uuid'], kwargs['progress']))
+
+        pool = RPCWorkerPool(receiver, workers=3, prefetch=5)
+        consumer = RPCConsumer(None, receiver)
+        consumer.pool = pool
+        pool.start()
+
+        msgs = []
+        for progress in range(10):
+            for task_uuid in ('uuid1', 'uuid2', 'uuid3'):
+                msg = Mock()
+                msgs.append(msg)
+                consumer.consume_msg({
+                    'method': 'deploy_resp',
+                    'args': {'task_uuid': task_uuid, 'progress': progress}
+                }, msg)
+        pool.stop()
+
+        for task_uuid in ('uuid1', 'uuid2', 'uuid3'):
+            self.assertEquals(
+                [p for uuid, p in calls if uuid == task_uuid],
+                range(10))
+        self.assertTrue(all(msg.ack.called for msg in msgs))
+        self.assertEquals(
+            sum(stats['messages'] for stats in pool.stats()), 30)
@@ -18,6 +18,7 @@ from nailgun.test.base import BaseTestCase
 
 from nailgun.db import db
 from nailgun.db.sqlalchemy.models import Task
+from nailgun.rpc.receiver import get_nodes_by_uids
 from nailgun.rpc.receiver import get_task_by_uuid
 
 
@@ -34,3 +35,14 @@ class TestUtils(BaseTestCase):
         self.assertRaises(errors.CannotFindTask,
                           get_task_by_uuid,
                           'not_found_uuid')
+
+    def test_get_nodes_by_uids_doesnt_load_meta(self):
+        node = self.env.create_node(api=False)
+        uid = node.uid
+        db().expunge_all()
+
+        nodes = get_nodes_by_uids([uid, 'not_a_number'])
+        self.assertEquals(nodes.keys(), [uid])
+        self.assertNotIn('meta', nodes[uid].__dict__)
+        # meta is loaded on access
+        self.assertTrue(nodes[uid].meta)
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+
+#    Copyright 2013 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import json
+
+from nailgun.db.sqlalchemy import engine
+from nailgun.db.sqlalchemy.models import Task
+from nailgun.test.base import BaseIntegrationTest
+from nailgun.test.base import reverse
+
+
+class TestHandlers(BaseIntegrationTest):
+
+    def get_tasks(self, expect_errors=False, **params):
+        return self.app.get(
+            reverse('TaskCollectionHandler'),
+            params=params,
+            headers=self.default_headers,
+            expect_errors=expect_errors
+        )
+
+    def test_filter_by_status_and_name(self):
+        cluster = self.env.create_cluster(api=False)
+        self.env.create_task(name='deploy', status='ready')
+        error_task = self.env.create_task(
+            name='deploy', status='error', cluster_id=cluster.id)
+        self.env.create_task(name='dump', status='error')
+
+        resp = self.get_tasks(status='error', name='deploy,provision')
+        self.assertEquals(200, resp.status)
+        response = json.loads(resp.body)
+        self.assertEquals([t['id'] for t in response], [error_task.id])
+        self.assertEquals(response[0]['cluster'], cluster.id)
+
+        resp = self.get_tasks(status='unknown', expect_errors=True)
+        self.assertEquals(400, resp.status)
+
+    def test_pagination_and_fields(self):
+        tasks = [self.env.create_task(name='dump') for _ in xrange(5)]
+
+        resp = self.get_tasks(limit=2, offset=1, fields='id,status')
+        self.assertEquals(200, resp.status)
+        self.assertEquals(resp.header('X-Total-Count'), '5')
+        self.assertEquals(json.loads(resp.body), [
+            {'id': task.id, 'status': task.status} for task in tasks[1:3]])
+
+        resp = self.get_tasks(marker=tasks[3].id, fields='id')
+        self.assertEquals(
+            json.loads(resp.body), [{'id': tasks[4].id}])
+
+        resp = self.get_tasks(fields='id,cache', expect_errors=True)
+        self.assertEquals(400, resp.status)
+
+    def test_task_changed_by_other_thread_is_reloaded(self):
+        task = self.env.create_task(name='deploy', status='running')
+        # task is loaded in session
+        self.assertEquals(task.status, 'running')
+        engine.execute(
+            Task.__table__.update().where(
+                Task.__table__.c.id == task.id
+            ).values(status='ready', progress=100))
+
+        resp = self.app.get(
+            reverse('TaskHandler', kwargs={'task_id': task.id}),
+            headers=self.default_headers)
+        self.assertEquals(200, resp.status)
+        self.assertEquals(json.loads(resp.body)['status'], 'ready')
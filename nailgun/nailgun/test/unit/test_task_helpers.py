@@ -133,3 +133,34 @@ class TestTaskHelpers(BaseUnitTest):
 
         progress = TaskHelper.recalculate_provisioning_task_progress(task)
         self.assertEquals(progress, 50)
+
+    def test_recalculate_deployment_task_progress_with_offline_node(self):
+        cluster = self.create_env([
+            {'roles': ['controller'],
+             'status': 'deploying',
+             'progress': 50},
+            {'roles': ['compute'],
+             'status': 'deploying',
+             'online': False,
+             'progress': 0}])
+
+        task = Task(name='deploy', cluster_id=cluster.id)
+        self.db.add(task)
+        self.db.commit()
+
+        # offline node is counted twice: with progress 100
+        # as offline node and with its own progress as deploying one
+        progress = TaskHelper.recalculate_deployment_task_progress(task)
+        self.assertEquals(progress, 50)
+
+    def test_recalculate_task_progress_without_nodes(self):
+        cluster = self.create_env([])
+
+        task = Task(name='deploy', cluster_id=cluster.id)
+        self.db.add(task)
+        self.db.commit()
+
+        self.assertIsNone(
+            TaskHelper.recalculate_deployment_task_progress(task))
+        self.assertIsNone(
+            TaskHelper.recalculate_provisioning_task_progress(task))
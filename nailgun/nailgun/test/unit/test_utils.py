@@ -16,6 +16,7 @@
 
 from nailgun.test.base import BaseIntegrationTest
 from nailgun.utils import dict_merge
+from nailgun.utils import shared_dict_merge
 
 
 class TestUtils(BaseIntegrationTest):
@@ -38,3 +39,49 @@ class TestUtils(BaseIntegrationTest):
                                            "transparency": 100,
                                            "dict": {"stuff": "hz",
                                                     "another_stuff": "hz"}}})
+
+    def test_shared_dict_merge(self):
+        custom = {"coord": [10, 10],
+                  "dict": {"body": "solid",
+                           "dict": {"stuff": "hz"}}}
+        common = {"parent": {"name": "parent"},
+                  "dict": {"transparency": 100,
+                           "dict": {"another_stuff": "hz"}}}
+        result = shared_dict_merge(custom, common)
+
+        self.assertEqual(result, dict_merge(custom, common))
+        # merged dicts are new, other values are shared
+        self.assertIsNot(result["dict"], custom["dict"])
+        self.assertIs(result["coord"], custom["coord"])
+        self.assertIs(result["parent"], common["parent"])
+        self.assertEqual(custom["dict"], {"body": "solid",
+                                          "dict": {"stuff": "hz"}})
+
+    def count_containers(self, obj):
+        seen = set()
+        stack = [obj]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, (dict, list)) and id(item) not in seen:
+                seen.add(id(item))
+                stack.extend(
+                    item.values() if isinstance(item, dict) else item)
+        return len(seen)
+
+    def test_shared_dict_merge_memory_is_linear(self):
+        counts = {}
+        for nodes_count in (100, 500, 1000):
+            common = {
+                "nodes": [{"uid": str(i), "role": "compute"}
+                          for i in xrange(nodes_count)],
+                "settings": {"mode": "ha_compact"}}
+            facts = [
+                shared_dict_merge(
+                    {"uid": str(i), "settings": {"role": "compute"}},
+                    common)
+                for i in xrange(nodes_count)]
+            counts[nodes_count] = self.count_containers(facts)
+
+        # every node adds the same number of objects
+        self.assertEqual((counts[1000] - counts[500]) / 500,
+                         (counts[500] - counts[100]) / 400)
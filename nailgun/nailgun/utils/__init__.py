@@ -29,3 +29,22 @@ def dict_merge(a, b):
         else:
             result[k] = deepcopy(v)
     return result
+
+
+def shared_dict_merge(a, b):
+    '''merges dict's like dict_merge, but doesn't copy values. Only
+    dicts which are present in both a and b are merged into new dicts,
+    all other values are shared with a and b. So merging of the same
+    big dict into many small ones takes memory proportional to size
+    of small ones, but result and its values should not be changed
+    in place.
+    '''
+    if not isinstance(b, dict):
+        return b
+    result = dict(a)
+    for k, v in b.iteritems():
+        if k in result and isinstance(result[k], dict):
+            result[k] = shared_dict_merge(result[k], v)
+        else:
+            result[k] = v
+    return result
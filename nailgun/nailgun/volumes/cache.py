@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+
+#    Copyright 2013 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import json
+import threading
+
+
+class VolumeLayoutCache(object):
+    """Cache of generated volumes of nodes.
+
+    Layout depends only on disks, RAM and spaces allowed for roles
+    of node, so nodes with the same hardware and roles get the same
+    volumes. Allowed spaces are a part of key, so changed volumes
+    metadata of release doesn't give old layout, but cache is cleared
+    when it's changed anyway. Revision of releases table is a part of
+    key too, because release could be changed by other process.
+    """
+
+    # cache is cleared when it has so many layouts
+    max_size = 1000
+
+    cache = {}
+    lock = threading.Lock()
+
+    @classmethod
+    def key(cls, disks, ram, allowed_volumes):
+        """Returns key of volumes layout
+
+        :param disks: list of disks from node meta
+        :param ram: total RAM of node
+        :param allowed_volumes: spaces allowed for roles of node
+        """
+        # revisions are counted for tables of all models,
+        # so they can't be imported while models are imported
+        from nailgun.db.sqlalchemy.revisions import TableRevisions
+
+        return (
+            TableRevisions.get('releases'),
+            tuple((d['disk'], d['name'], d['size']) for d in disks),
+            ram,
+            json.dumps(allowed_volumes, sort_keys=True)
+        )
+
+    @classmethod
+    def get(cls, key):
+        return cls.cache.get(key)
+
+    @classmethod
+    def set(cls, key, volumes):
+        with cls.lock:
+            if len(cls.cache) >= cls.max_size:
+                cls.cache.clear()
+            cls.cache[key] = volumes
+
+    @classmethod
+    def clear(cls):
+        with cls.lock:
+            cls.cache.clear()
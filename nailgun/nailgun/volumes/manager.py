@@ -25,6 +25,7 @@ from copy import deepcopy
 from functools import partial
 from nailgun.errors import errors
 from nailgun.logger import logger
+from nailgun.volumes.cache import VolumeLayoutCache
 
 
 def is_service(space):
@@ -551,8 +552,11 @@ class VolumeManager(object):
         if node.cluster:
             self.allowed_volumes = get_node_spaces(node)
 
+        self.generators = self._get_generators()
+
         self.disks = []
-        for d in sorted(node.meta['disks'], key=lambda i: i['name']):
+        self.disks_meta = sorted(node.meta['disks'], key=lambda i: i['name'])
+        for d in self.disks_meta:
             disks_count = len(node.meta["disks"])
             boot_is_raid = True if disks_count > 1 else False
 
@@ -575,9 +579,12 @@ class VolumeManager(object):
 
             self.disks.append(disk)
 
-        self.__logger('Initialized with node: %s' % node.full_name)
-        self.__logger('Initialized with volumes: %s' % self.volumes)
-        self.__logger('Initialized with disks: %s' % self.disks)
+        logger.debug('VolumeManager %s: Initialized with node: %s',
+                     id(self), node.full_name)
+        logger.debug('VolumeManager %s: Initialized with volumes: %s',
+                     id(self), self.volumes)
+        logger.debug('VolumeManager %s: Initialized with disks: %s',
+                     id(self), self.disks)
 
     def set_volume_size(self, disk_id, volume_name, size):
         """Set size of volume
@@ -645,7 +652,7 @@ class VolumeManager(object):
 
         return size
 
-    def call_generator(self, generator, *args):
+    def _get_generators(self):
         generators = {
             # Calculate swap space based on total RAM
             'calc_swap_size': self._calc_swap_size,
@@ -676,14 +683,16 @@ class VolumeManager(object):
 
         generators['calc_os_vg_size'] = generators['calc_os_size']
         generators['calc_min_os_size'] = generators['calc_os_size']
+        return generators
 
-        if generator not in generators:
+    def call_generator(self, generator, *args):
+        if generator not in self.generators:
             raise errors.CannotFindGenerator(
                 u'Cannot find generator %s' % generator)
 
-        result = generators[generator](*args)
-        self.__logger('Generator %s with args %s returned result: %s' %
-                      (generator, args, result))
+        result = self.generators[generator](*args)
+        logger.debug('VolumeManager %s: Generator %s with args %s '
+                     'returned result: %s', id(self), generator, args, result)
         return result
 
     def _calc_root_size(self):
@@ -795,6 +804,32 @@ class VolumeManager(object):
             return partial(disk.create_partition, ptype='raid')
 
     def gen_volumes_info(self):
+        """Generates volumes of node. Nodes with the same disks, RAM
+        and roles get the same volumes, so layout is taken from cache
+        if it was generated before.
+        """
+        key = VolumeLayoutCache.key(
+            self.disks_meta, self.ram, self.allowed_volumes)
+        cached = VolumeLayoutCache.get(key)
+        if cached is not None:
+            self.__logger('Volumes info is taken from cache')
+            self.volumes = deepcopy(cached)
+            self._set_disks_volumes()
+            return self.volumes
+
+        volumes = self._gen_volumes_info()
+        VolumeLayoutCache.set(key, deepcopy(volumes))
+        return volumes
+
+    def _set_disks_volumes(self):
+        """Sets volumes of disks from volumes info
+        """
+        disks = dict((d['id'], d) for d in only_disks(self.volumes))
+        for disk in self.disks:
+            disk.free_space = disk.size
+            disk.set_volumes(disks[disk.id]['volumes'])
+
+    def _gen_volumes_info(self):
         self.__logger('Generating volumes info for node')
         self.__logger('Purging volumes info for all node disks')
 
@@ -834,7 +869,8 @@ class VolumeManager(object):
                 self._all_size_volumes[-1])
 
         self.volumes = self.expand_generators(self.volumes)
-        self.__logger('Generated volumes: %s' % self.volumes)
+        logger.debug('VolumeManager %s: Generated volumes: %s',
+                     id(self), self.volumes)
         return self.volumes
 
     @property
@@ -871,11 +907,6 @@ class VolumeManager(object):
                             val["generator"],
                             *(val.get("generator_args", []))
                         )
-                        self.__logger(
-                            'Generator %s with args %s expanded to: %s' %
-                            (val['generator'],
-                             val.get('generator_args', []),
-                             genval))
 
                         new_dict[i] = genval
                     else:
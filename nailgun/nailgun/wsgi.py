@@ -67,43 +67,72 @@ def run_server(func, server_address=('0.0.0.0', 8080)):
         server.stop()
 
 
-def appstart(keepalive=False):
-    logger.info("Fuel version: %s", str(settings.VERSION))
-    if not engine.dialect.has_table(engine.connect(), "nodes"):
-        logger.error(
-            "Database tables not created. Try './manage.py syncdb' first"
-        )
-        sys.exit(1)
-
-    app = build_app()
+def start_services(keepalive=False):
+    """Starts threads of KeepAlive watcher, RPC consumer and log indexer
 
+    :returns: list of (name, thread) of started services
+    """
     from nailgun.keepalive import keep_alive
+    from nailgun.logindex import log_indexer
     from nailgun.rpc import threaded
 
+    services = []
     if keepalive:
         logger.info("Running KeepAlive watcher...")
         keep_alive.start()
+        services.append(("KeepAlive watcher", keep_alive))
 
     if not settings.FAKE_TASKS:
         if not keep_alive.is_alive() \
                 and not settings.FAKE_TASKS_AMQP:
             logger.info("Running KeepAlive watcher...")
             keep_alive.start()
+            services.append(("KeepAlive watcher", keep_alive))
         rpc_process = threaded.RPCKombuThread()
         logger.info("Running RPC consumer...")
         rpc_process.start()
-    logger.info("Running WSGI app...")
+        services.append(("RPC consumer", rpc_process))
+    logger.info("Running log indexer...")
+    log_indexer.start()
+    services.append(("log indexer", log_indexer))
+    return services
+
+
+def stop_services(services):
+    for name, thread in services:
+        logger.info("Stopping %s...", name)
+        thread.join()
 
+
+def appstart(keepalive=False, workers=1):
+    logger.info("Fuel version: %s", str(settings.VERSION))
+    if not engine.dialect.has_table(engine.connect(), "nodes"):
+        logger.error(
+            "Database tables not created. Try './manage.py syncdb' first"
+        )
+        sys.exit(1)
+
+    app = build_app()
     wsgifunc = build_middleware(app.wsgifunc)
+    address = (settings.LISTEN_ADDRESS, int(settings.LISTEN_PORT))
+
+    if workers > 1:
+        from nailgun.prefork import PreforkServer
+        PreforkServer(
+            wsgifunc,
+            address,
+            workers,
+            start_services=lambda: start_services(keepalive),
+            stop_services=stop_services
+        ).run()
+        logger.info("Done")
+        return
+
+    services = start_services(keepalive)
+    logger.info("Running WSGI app...")
 
-    run_server(wsgifunc,
-               (settings.LISTEN_ADDRESS, int(settings.LISTEN_PORT)))
+    run_server(wsgifunc, address)
 
     logger.info("Stopping WSGI app...")
-    if keep_alive.is_alive():
-        logger.info("Stopping KeepAlive watcher...")
-        keep_alive.join()
-    if not settings.FAKE_TASKS:
-        logger.info("Stopping RPC consumer...")
-        rpc_process.join()
+    stop_services(services)
     logger.info("Done")
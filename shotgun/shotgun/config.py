@@ -39,6 +39,14 @@ class Config(object):
     def lastdump(self):
         return self.data.get("lastdump", settings.LASTDUMP)
 
+    @property
+    def workers(self):
+        return self.data.get("workers", settings.WORKERS)
+
+    @property
+    def host_timeout(self):
+        return self.data.get("host_timeout", settings.HOST_TIMEOUT)
+
     @property
     def objects(self):
         for role, hosts in self.data["dump_roles"].iteritems():
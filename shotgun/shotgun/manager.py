@@ -12,24 +12,135 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import json
+import multiprocessing
 import os
+import signal
+import time
+import traceback
+
+import fabric.network
 
 from shotgun.driver import Driver
 from shotgun.logger import logger
 from shotgun.utils import execute
 
 
+class HostTimeout(BaseException):
+    """Raised by alarm when time of dumping host is over. It isn't
+    derived from Exception, so drivers which catch Exception don't
+    swallow it
+    """
+
+
+def _raise_timeout(signum, frame):
+    raise HostTimeout()
+
+
+def snapshot_host(host, objects, conf):
+    """Dumps objects of one host one by one, so all of them are got
+    through one SSH connection. When host timeout is over, the rest
+    of objects are skipped, object which was being dumped when
+    HostTimeout was raised is failed.
+
+    :returns: dict with numbers of dumped, failed and skipped objects
+    """
+    result = {"host": host, "dumped": 0, "failed": 0, "skipped": 0}
+    deadline = None
+    if conf.host_timeout:
+        deadline = time.time() + conf.host_timeout
+    try:
+        for obj_data in objects:
+            if deadline and time.time() > deadline:
+                logger.error("Timeout of dumping host: %s", host)
+                break
+            logger.debug("Dumping: %s", obj_data)
+            try:
+                Driver.getDriver(obj_data, conf).snapshot()
+                result["dumped"] += 1
+            except HostTimeout:
+                result["failed"] += 1
+                raise
+            except Exception:
+                logger.error(traceback.format_exc())
+                result["failed"] += 1
+    except HostTimeout:
+        logger.error("Timeout of dumping host: %s", host)
+    result["skipped"] = len(objects) - result["dumped"] - result["failed"]
+    fabric.network.disconnect_all()
+    return result
+
+
+def _snapshot_host_in_worker(args):
+    host, objects, conf = args
+    if conf.host_timeout:
+        # alarm interrupts call which hangs, it's handled by snapshot_host
+        signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.alarm(int(conf.host_timeout))
+    try:
+        return snapshot_host(host, objects, conf)
+    except (Exception, HostTimeout):
+        # pool worker dies on exceptions not derived from Exception
+        logger.error(traceback.format_exc())
+        return {"host": host, "dumped": 0,
+                "failed": len(objects), "skipped": 0}
+    finally:
+        signal.alarm(0)
+
+
 class Manager(object):
-    def __init__(self, conf):
+    def __init__(self, conf, progress_callback=None):
         logger.debug("Initializing snapshot manager")
         self.conf = conf
+        self.progress_callback = progress_callback
+
+    def objects_by_host(self):
+        hosts = []
+        objects = {}
+        for obj_data in self.conf.objects:
+            # config yields the same object for every host
+            obj_data = dict(obj_data)
+            host = obj_data["host"]
+            if host not in objects:
+                hosts.append(host)
+                objects[host] = []
+            objects[host].append(obj_data)
+        return [(name, objects[name], self.conf) for name in hosts]
+
+    def report_progress(self, done, total):
+        """Calls progress callback with percent of dumped hosts
+        """
+        progress = 100 * done // total
+        logger.debug("Snapshot progress: %s%%", progress)
+        if self.progress_callback:
+            self.progress_callback(progress)
 
     def snapshot(self):
         logger.debug("Making snapshot")
-        for obj_data in self.conf.objects:
-            logger.debug("Dumping: %s", obj_data)
-            driver = Driver.getDriver(obj_data, self.conf)
-            driver.snapshot()
+        tasks = self.objects_by_host()
+        workers = min(int(self.conf.workers), len(tasks))
+        results = []
+        if workers > 1:
+            pool = multiprocessing.Pool(workers)
+            try:
+                for result in pool.imap_unordered(
+                        _snapshot_host_in_worker, tasks):
+                    results.append(result)
+                    self.report_progress(len(results), len(tasks))
+                pool.close()
+            finally:
+                pool.terminate()
+                pool.join()
+        else:
+            for task in tasks:
+                results.append(snapshot_host(*task))
+                self.report_progress(len(results), len(tasks))
+
+        execute("mkdir -p {0}".format(self.conf.target))
+        with open(os.path.join(self.conf.target, "report.json"), "w") as fo:
+            fo.write(json.dumps(
+                sorted(results, key=lambda r: r["host"]), indent=4))
+
         logger.debug("Archiving dump directory: %s", self.conf.target)
         execute("tar zcf {0}.tgz -C {1} {2}"
                 "".format(self.conf.target,
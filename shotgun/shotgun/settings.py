@@ -15,3 +15,7 @@
 TARGET = "/tmp/snapshot"
 LASTDUMP = "/tmp/snapshot_last"
 TIMESTAMP = True
+# number of processes collecting data of hosts in parallel
+WORKERS = 10
+# how long (in seconds) data of one host can be collected, 0 means unlimited
+HOST_TIMEOUT = 600
@@ -0,0 +1,99 @@
+#    Copyright 2013 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+try:
+    from unittest.case import TestCase
+except ImportError:
+    # Runing unit-tests in production environment
+    from unittest2.case import TestCase
+import time
+
+from mock import MagicMock
+from mock import patch
+
+from shotgun.config import Config
+import shotgun.manager
+
+
+class TestManager(TestCase):
+
+    def make_conf(self, **data):
+        data.update({
+            "dump_roles": {"slave": ["node-1", "node-2"]},
+            "dump_objects": {"slave": [
+                {"type": "file", "path": "/var/log/messages"},
+                {"type": "command", "command": "uptime",
+                 "to_file": "uptime.txt"}
+            ]}
+        })
+        return Config(data)
+
+    def test_objects_are_grouped_by_host(self):
+        manager = shotgun.manager.Manager(self.make_conf())
+        tasks = manager.objects_by_host()
+
+        self.assertEquals(
+            sorted((host, [o["host"] for o in objects])
+                   for host, objects, _ in tasks),
+            [("node-1", ["node-1", "node-1"]),
+             ("node-2", ["node-2", "node-2"])])
+
+    @patch('shotgun.manager.fabric.network.disconnect_all')
+    @patch('shotgun.manager.Driver.getDriver')
+    def test_failed_and_skipped_objects_are_counted(self, mdriver, _):
+        mdriver.return_value.snapshot.side_effect = [None, Exception()]
+        conf = self.make_conf(host_timeout=0)
+        _, objects, _ = shotgun.manager.Manager(conf).objects_by_host()[0]
+
+        result = shotgun.manager.snapshot_host("node-1", objects, conf)
+        self.assertEquals(result, {
+            "host": "node-1", "dumped": 1, "failed": 1, "skipped": 0})
+
+        with patch('shotgun.manager.time') as mtime:
+            mtime.time.side_effect = [0, 700]
+            result = shotgun.manager.snapshot_host(
+                "node-1", objects, self.make_conf(host_timeout=600))
+        self.assertEquals(result["skipped"], 2)
+
+    @patch('shotgun.manager.fabric.network.disconnect_all')
+    @patch('shotgun.manager.Driver.getDriver')
+    def test_timeout_interrupts_hanging_call(self, mdriver, _):
+        def hang():
+            # drivers catch all exceptions of remote calls
+            try:
+                time.sleep(10)
+            except Exception:
+                pass
+
+        mdriver.return_value.snapshot.side_effect = hang
+        conf = self.make_conf(host_timeout=1)
+        task = shotgun.manager.Manager(conf).objects_by_host()[0]
+
+        started = time.time()
+        result = shotgun.manager._snapshot_host_in_worker(task)
+        self.assertLess(time.time() - started, 5)
+        self.assertEquals(result, {
+            "host": "node-1", "dumped": 0, "failed": 1, "skipped": 1})
+
+    @patch('shotgun.manager.open', create=True)
+    @patch('shotgun.manager.execute')
+    @patch('shotgun.manager.snapshot_host')
+    def test_progress_is_reported_for_every_host(self, msnapshot, *_):
+        msnapshot.side_effect = lambda host, objects, conf: {"host": host}
+        callback = MagicMock()
+        conf = self.make_conf(workers=1, target="/tmp/dump", timestamp=False)
+        shotgun.manager.Manager(conf, callback).snapshot()
+
+        self.assertEquals(
+            [c[0][0] for c in callback.call_args_list], [50, 100])